@@ -0,0 +1,56 @@
+"""Compare per-trade and batched CDW extraction against the local stub server
+
+Run from the repository root:
+
+    python -m benchmarks.bench_cdw_batch --trades 2000 --dates 5 --duplicates 0.2 --latency-ms 5
+"""
+import argparse
+import sys
+import time
+
+from benchmarks.cdw_stub_server import CDWStubServer
+from benchmarks.generators import build_trade_list
+from libs.CDWHelper import CDWHelper
+
+
+def run(label: str, server: CDWStubServer, trades, **options):
+    server.reset_counts()
+    helper = CDWHelper(server.base_url, {}, **options)
+    start = time.perf_counter()
+    frame = helper.extract_all_trades(trades)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed:8.2f} s   {len(trades) / elapsed:9.0f} trades/s   "
+          f"requests trade={server.counts['trade']} batch={server.counts['batch']}")
+    return frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark batched CDW extraction')
+    parser.add_argument('--trades', type=int, default=2000)
+    parser.add_argument('--dates', type=int, default=5)
+    parser.add_argument('--duplicates', type=float, default=0.2, help='Share of extra repeated rows')
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--latency-ms', type=float, default=5)
+    args = parser.parse_args()
+
+    trades = build_trade_list(args.trades, args.dates, args.duplicates)
+    print(f"{len(trades)} trade rows, {args.trades} unique, {args.dates} dates")
+
+    with CDWStubServer(latency=args.latency_ms / 1000) as server:
+        single = run('per-trade', server, trades, max_workers=args.workers)
+        batched = run('batched', server, trades, max_workers=args.workers,
+                      batch_path='/trades', batch_size=args.batch_size)
+
+    with CDWStubServer(latency=args.latency_ms / 1000, batch_enabled=False) as server:
+        fallback = run('batched, endpoint missing', server, trades, max_workers=args.workers,
+                       batch_path='/trades', batch_size=args.batch_size)
+
+    identical = single.equals(batched) and single.equals(fallback)
+    print(f"Identical output: {identical}")
+    if not identical:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Measure CLI startup cost: interpreter + framework imports + argument parsing
+
+Run from the repository root:
+
+    python -m benchmarks.bench_cli_startup --runs 20
+
+Reports the wall time of `run_risk_suite.py --help` and the modules pulled
+in by constructing an Orchestrator (which must not import any task module).
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+IMPORT_PROBE = """
+import sys
+from core.orchestrator import Orchestrator
+Orchestrator()
+heavy = [m for m in ('pandas', 'numpy', 'requests', 'pyodbc', 'pymongo', 'openpyxl') if m in sys.modules]
+tasks = sorted(m for m in sys.modules if m.startswith('tasks.'))
+print(','.join(heavy) + '|' + ','.join(tasks))
+"""
+
+
+def time_command(command, runs: int):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=REPO_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def report(label: str, samples):
+    print(f"{label:<28} median {statistics.median(samples) * 1000:7.1f} ms   "
+          f"min {min(samples) * 1000:7.1f} ms   max {max(samples) * 1000:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark CLI startup time')
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    report('python -c pass', time_command([sys.executable, '-c', 'pass'], args.runs))
+    report('run_risk_suite.py --help', time_command([sys.executable, 'run_risk_suite.py', '--help'], args.runs))
+    report('Orchestrator()', time_command([sys.executable, '-c', IMPORT_PROBE], args.runs))
+
+    probe = subprocess.run([sys.executable, '-c', IMPORT_PROBE], cwd=REPO_ROOT,
+                           capture_output=True, text=True, check=True)
+    heavy, tasks = probe.stdout.strip().split('|')
+    print(f"Heavy modules imported at startup: {heavy or 'none'}")
+    print(f"Task modules imported at startup: {tasks or 'none'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Compare pandas' in-memory Excel path with the streaming ExcelIOHelper
+
+Run from the repository root:
+
+    python -m benchmarks.bench_excel_io --rows 200000 --chunksize 50000
+    python -m benchmarks.bench_excel_io --rows 20000 --max-rows 5000 --memory
+"""
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+
+from benchmarks.generators import build_result_sets
+from libs.ExcelIOHelper import ExcelIOHelper
+
+
+def run(label: str, func, trace_memory: bool = False):
+    """Time func(), optionally reporting its peak traced allocation (tracing slows it down a lot)"""
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    line = f"{label:<28} {elapsed:8.2f} s"
+    if trace_memory:
+        line += f"   peak {tracemalloc.get_traced_memory()[1] / 2**20:9.1f} MiB"
+        tracemalloc.stop()
+    print(line)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark streaming Excel I/O')
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--chunksize', type=int, default=50_000)
+    parser.add_argument('--max-rows', type=int, default=None,
+                        help='Rows per sheet for the streaming writer, to exercise sheet splitting')
+    parser.add_argument('--memory', action='store_true', help='Also report peak allocations (much slower)')
+    args = parser.parse_args()
+
+    frame, _ = build_result_sets(args.rows)
+    helper = ExcelIOHelper(args.max_rows) if args.max_rows else ExcelIOHelper()
+    print(f"{len(frame)} rows x {len(frame.columns)} columns")
+
+    with tempfile.TemporaryDirectory(prefix='excel_bench_') as workdir:
+        pandas_path = str(Path(workdir) / 'pandas.xlsx')
+        stream_path = str(Path(workdir) / 'stream.xlsx')
+
+        run('write pandas.to_excel', lambda: frame.to_excel(pandas_path, index=False), args.memory)
+        sheets = run('write streaming', lambda: helper.write(frame, stream_path), args.memory)
+        print(f"streaming file sheets: {sheets}")
+
+        expected = run('read pandas.read_excel', lambda: pd.read_excel(pandas_path), args.memory)
+        streamed = run('read streaming (whole)', lambda: helper.read(stream_path), args.memory)
+        rows = run('read streaming (chunks)',
+                   lambda: sum(len(chunk) for chunk in helper.iter_chunks(stream_path, args.chunksize)), args.memory)
+
+    identical = expected.equals(streamed) and rows == len(frame)
+    print(f"Identical output: {identical}")
+    if not identical:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Compare CDWHelper.flatten_xml with the streaming flatten_xml_stream
+
+Run from the repository root:
+
+    python -m benchmarks.bench_flatten_xml --legs 200 --cashflows 50 --repeat 3
+"""
+import argparse
+import io
+import sys
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+from benchmarks.generators import build_trade_xml
+from libs.CDWHelper import CDWHelper
+
+
+def measure(label: str, func, repeat: int):
+    best = float('inf')
+    peak = 0
+    result = None
+    for _ in range(repeat):
+        tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            result = func()
+        except RecursionError:
+            tracemalloc.stop()
+            print(f"{label:<22} RecursionError")
+            return None
+        best = min(best, time.perf_counter() - start)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    print(f"{label:<22} best {best * 1000:9.1f} ms   peak {peak / 2**20:8.1f} MiB   keys {len(result)}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark CDW XML flattening')
+    parser.add_argument('--legs', type=int, default=200)
+    parser.add_argument('--cashflows', type=int, default=50)
+    parser.add_argument('--depth', type=int, default=50, help='Depth of an extra nested chain')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    helper = CDWHelper('http://localhost', {})
+    payload = build_trade_xml(args.legs, args.cashflows, args.depth)
+    print(f"Payload: {len(payload) / 2**20:.2f} MiB, depth chain {args.depth}")
+
+    recursive = measure('flatten_xml', lambda: helper.flatten_xml(ET.fromstring(payload)), args.repeat)
+    streaming = measure('flatten_xml_stream', lambda: helper.flatten_xml_stream(io.BytesIO(payload)), args.repeat)
+
+    if recursive is not None:
+        identical = list(recursive.items()) == list(streaming.items())
+        print(f"Identical output (keys, order, values): {identical}")
+        if not identical:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""Local HTTP stand-in for the CDW trade API
+
+Serves the per-trade endpoint /trade/<id>?on=<date> and, unless disabled,
+the batch endpoint /trades?on=<date>&ids=<id,id,...>. Every request sleeps
+for a fixed latency to mimic network round-trips, and requests are counted
+per endpoint so benchmarks can report how many calls were made.
+
+    python -m benchmarks.cdw_stub_server --port 8099 --latency-ms 20
+"""
+import argparse
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def trade_xml(trade_id: str, trade_date: str, legs: int = 2) -> str:
+    """Deterministic trade document for one id and date"""
+    parts = [f'<trade id="{trade_id}" version="1"><header><book>RATES</book><asOf>{trade_date}</asOf></header>']
+    for leg in range(legs):
+        parts.append(f'<leg index="{leg}"><notional ccy="USD">{len(trade_id) * 1000 + leg}</notional></leg>')
+    parts.append('</trade>')
+    return ''.join(parts)
+
+
+class _QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients dropping idle keep-alive connections is expected, not an error
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+
+class CDWStubServer:
+    """Threaded stub server; use as a context manager or call start()/stop()"""
+
+    def __init__(self, port: int = 0, latency: float = 0.0, batch_enabled: bool = True,
+                 missing_ids=(), legs: int = 2):
+        self.latency = latency
+        self.batch_enabled = batch_enabled
+        self.missing_ids = set(str(i) for i in missing_ids)  # Left out of batch responses
+        self.legs = legs
+        self.counts = {'trade': 0, 'batch': 0}
+        self._lock = threading.Lock()
+        self._server = _QuietServer(('127.0.0.1', port), self._handler())
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def reset_counts(self):
+        with self._lock:
+            self.counts = {'trade': 0, 'batch': 0}
+
+    def _count(self, endpoint: str):
+        with self._lock:
+            self.counts[endpoint] += 1
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body are separate writes; avoid Nagle/delayed-ACK stalls
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                trade_date = query.get('on', [''])[0]
+                if stub.latency:
+                    time.sleep(stub.latency)
+
+                if url.path == '/trades':
+                    # Refused batch requests count too, so fallbacks show up
+                    stub._count('batch')
+                if url.path.startswith('/trade/'):
+                    stub._count('trade')
+                    self._send(200, trade_xml(url.path[len('/trade/'):], trade_date, stub.legs))
+                elif url.path == '/trades' and stub.batch_enabled:
+                    ids = [i for i in query.get('ids', [''])[0].split(',') if i and i not in stub.missing_ids]
+                    body = ''.join(trade_xml(i, trade_date, stub.legs) for i in ids)
+                    self._send(200, f'<trades>{body}</trades>')
+                else:
+                    self._send(404, '<error>not found</error>')
+
+            def _send(self, status: int, body: str):
+                payload = body.encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/xml')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the CDW stub server')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--latency-ms', type=float, default=20)
+    parser.add_argument('--no-batch', action='store_true', help='Answer the batch endpoint with 404')
+    args = parser.parse_args()
+
+    server = CDWStubServer(args.port, args.latency_ms / 1000, not args.no_batch)
+    print(f"CDW stub listening on {server.base_url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
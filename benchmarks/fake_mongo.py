@@ -0,0 +1,181 @@
+"""In-process stand-in for the parts of pymongo the helpers use
+
+Supports find (equality, $in, $gte/$gt/$lte/$lt, $and; inclusion or
+exclusion projections; sort) and aggregate ($match, $sort, $project,
+$limit, and $group with $sum/$max/$min). mongomock is used instead when it is installed.
+"""
+import copy
+from typing import Dict, Any, List
+
+
+def _get(document: Dict[str, Any], field: str):
+    value = document
+    for part in field.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+_OPERATORS = {
+    '$in': lambda value, arg: value in arg,
+    '$nin': lambda value, arg: value not in arg,
+    '$ne': lambda value, arg: value != arg,
+    '$gt': lambda value, arg: value is not None and value > arg,
+    '$gte': lambda value, arg: value is not None and value >= arg,
+    '$lt': lambda value, arg: value is not None and value < arg,
+    '$lte': lambda value, arg: value is not None and value <= arg,
+}
+
+
+def matches(document: Dict[str, Any], query: Dict[str, Any]) -> bool:
+    for field, condition in query.items():
+        if field == '$and':
+            if not all(matches(document, sub) for sub in condition):
+                return False
+        elif field == '$or':
+            if not any(matches(document, sub) for sub in condition):
+                return False
+        elif isinstance(condition, dict) and condition and all(op.startswith('$') for op in condition):
+            value = _get(document, field)
+            if not all(_OPERATORS[op](value, arg) for op, arg in condition.items()):
+                return False
+        elif _get(document, field) != condition:
+            return False
+    return True
+
+
+def project(document: Dict[str, Any], projection) -> Dict[str, Any]:
+    if not projection:
+        return document
+    if isinstance(projection, (list, tuple)):
+        projection = {field: 1 for field in projection}
+    included = [f for f, v in projection.items() if v and f != '_id']
+    if included:
+        result = {f: document[f] for f in included if f in document}
+        if projection.get('_id', 1) and '_id' in document:
+            result['_id'] = document['_id']
+        return result
+    return {f: v for f, v in document.items() if projection.get(f, 1)}
+
+
+def sort_documents(documents: List[Dict[str, Any]], sort) -> List[Dict[str, Any]]:
+    keys = list(sort.items()) if isinstance(sort, dict) else (
+        [sort] if isinstance(sort, tuple) else [(s, 1) if isinstance(s, str) else s for s in sort]
+    )
+    for field, direction in reversed(keys):
+        documents = sorted(documents, key=lambda d: (_get(d, field) is None, _get(d, field)),
+                           reverse=direction < 0)
+    return documents
+
+
+def _value(document: Dict[str, Any], expression):
+    """Aggregation expression: "$field" paths and constants"""
+    if isinstance(expression, str) and expression.startswith('$'):
+        return _get(document, expression[1:])
+    return expression
+
+
+def group_documents(documents: List[Dict[str, Any]], spec: Dict[str, Any]) -> List[Dict[str, Any]]:
+    groups: Dict[Any, Dict[str, Any]] = {}
+    for document in documents:
+        group_id = _value(document, spec['_id'])
+        group = groups.setdefault(repr(group_id), {'_id': group_id})
+        for field, accumulator in spec.items():
+            if field == '_id':
+                continue
+            (operator, expression), = accumulator.items()
+            value = _value(document, expression)
+            current = group.get(field)
+            if operator == '$sum':
+                number = value if isinstance(value, (int, float)) and not isinstance(value, bool) else 0
+                group[field] = (current or 0) + number
+            elif operator in ('$max', '$min'):
+                if value is None:
+                    group.setdefault(field, None)
+                elif current is None:
+                    group[field] = value
+                else:
+                    group[field] = max(current, value) if operator == '$max' else min(current, value)
+            else:
+                raise NotImplementedError(f"Fake Mongo does not support {operator} in $group")
+    return list(groups.values())
+
+
+class FakeCursor:
+    def __init__(self, documents: List[Dict[str, Any]]):
+        self._documents = documents
+        self._iterator = None
+
+    def sort(self, key_or_list, direction=None):
+        sort = [(key_or_list, direction or 1)] if isinstance(key_or_list, str) else key_or_list
+        self._documents = sort_documents(self._documents, sort)
+        return self
+
+    def __iter__(self):
+        if self._iterator is None:
+            self._iterator = iter(self._documents)
+        return self._iterator
+
+    def __next__(self):
+        return next(iter(self))
+
+    def close(self):
+        self._documents = []
+
+
+class FakeCollection:
+    def __init__(self):
+        self.documents: List[Dict[str, Any]] = []
+
+    def insert_many(self, documents):
+        self.documents.extend(copy.deepcopy(list(documents)))
+
+    def find(self, query=None, projection=None, batch_size=0, **kwargs):
+        query = query or {}
+        return FakeCursor([project(copy.deepcopy(d), projection) for d in self.documents if matches(d, query)])
+
+    def aggregate(self, pipeline, **kwargs):
+        documents = [copy.deepcopy(d) for d in self.documents]
+        for stage in pipeline:
+            (operator, argument), = stage.items()
+            if operator == '$match':
+                documents = [d for d in documents if matches(d, argument)]
+            elif operator == '$sort':
+                documents = sort_documents(documents, argument)
+            elif operator == '$project':
+                documents = [project(d, argument) for d in documents]
+            elif operator == '$limit':
+                documents = documents[:argument]
+            elif operator == '$group':
+                documents = group_documents(documents, argument)
+            else:
+                raise NotImplementedError(f"Fake Mongo does not support {operator}")
+        return FakeCursor(documents)
+
+
+class FakeDatabase(dict):
+    def __missing__(self, name):
+        self[name] = FakeCollection()
+        return self[name]
+
+
+class FakeMongoClient(dict):
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+
+    def __missing__(self, name):
+        self[name] = FakeDatabase()
+        return self[name]
+
+    def close(self):
+        pass
+
+
+def mongo_client():
+    """mongomock client when available, otherwise the in-process fake"""
+    try:
+        import mongomock
+    except ImportError:
+        return FakeMongoClient()
+    return mongomock.MongoClient()
@@ -0,0 +1,99 @@
+"""Synthetic, seeded data for the benchmarks
+
+Every generator is deterministic for a given seed so that runs are
+comparable with stored baselines.
+"""
+import random
+from pathlib import Path
+from typing import Dict, Any, List, Tuple
+
+
+def build_trade_list(trades: int, dates: int = 5, duplicates: float = 0.0, seed: int = 7) -> List[Dict[str, Any]]:
+    """Trade list spread over a few dates, with a share of repeated rows"""
+    rng = random.Random(seed)
+    unique = [{'trade_id': f"T{i:06d}", 'trade_date': f"2024-01-{i % dates + 1:02d}"} for i in range(trades)]
+    repeats = [dict(rng.choice(unique)) for _ in range(int(trades * duplicates))]
+    rows = unique + repeats
+    rng.shuffle(rows)
+    return rows
+
+
+def build_trade_xml(legs: int, cashflows: int, depth: int = 0) -> bytes:
+    """Synthetic trade payload with leg/cashflow trees and an optional deep chain"""
+    parts = ['<trade id="T1" version="3"><header><book>RATES</book><ccy>USD</ccy></header>']
+    for leg in range(legs):
+        parts.append(f'<leg index="{leg}" type="{"fixed" if leg % 2 else "float"}">')
+        parts.append(f'<notional ccy="USD">{1_000_000 + leg}</notional>')
+        for flow in range(cashflows):
+            parts.append(
+                f'<cashflow seq="{flow}"><payDate>2024-{flow % 12 + 1:02d}-15</payDate>'
+                f'<amount>{leg * 1000 + flow}.25</amount><rate fixing="LIBOR">0.0{flow % 9}</rate></cashflow>'
+            )
+        parts.append('</leg>')
+    parts.append('<nested>' * depth + 'bottom' + '</nested>' * depth)
+    parts.append('</trade>')
+    return ''.join(parts).encode()
+
+
+def build_result_sets(rows: int, value_columns: int = 4, mismatch_rate: float = 0.01,
+                      missing_rate: float = 0.005, seed: int = 11):
+    """Source and target frames keyed by (trade_id, trade_date) with injected differences
+
+    The target misses about missing_rate of the source rows and has about
+    mismatch_rate of its rows altered in one value column.
+    """
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    source = pd.DataFrame({
+        'trade_id': [f"T{i:07d}" for i in range(rows)],
+        'trade_date': pd.Timestamp('2024-01-01') + pd.to_timedelta(np.arange(rows) % 20, unit='D'),
+        'book': rng.choice(['RATES', 'FX', 'CREDIT', 'EQUITY'], rows),
+    })
+    for column in range(value_columns):
+        source[f"value_{column}"] = rng.normal(1_000_000, 250_000, rows).round(2)
+
+    target = source.sample(frac=1 - missing_rate, random_state=seed).sort_index()
+    altered = target.sample(frac=mismatch_rate, random_state=seed + 1).index
+    target.loc[altered, 'value_0'] += 1.0
+    return source.reset_index(drop=True), target.reset_index(drop=True)
+
+
+def build_documents(rows: int, seed: int = 13) -> List[Dict[str, Any]]:
+    """Mongo-style documents with a nested sub-document per trade"""
+    rng = random.Random(seed)
+    return [
+        {
+            '_id': i,
+            'trade_id': f"T{i:07d}",
+            'trade_date': f"2024-01-{i % 20 + 1:02d}",
+            'book': rng.choice(['RATES', 'FX', 'CREDIT', 'EQUITY']),
+            'risk': {'pv': round(rng.gauss(1_000_000, 250_000), 2), 'delta': round(rng.gauss(0, 1), 6)}
+        }
+        for i in range(rows)
+    ]
+
+
+def build_file_tree(root: str, files: int, depth: int = 2, fanout: int = 4,
+                    missing_rate: float = 0.01, seed: int = 17) -> Tuple[Path, List[str]]:
+    """Create files under root in a tree of the given depth; return (root, expected names)
+
+    The expected list also names about missing_rate files that were not created.
+    """
+    rng = random.Random(seed)
+    root = Path(root)
+    directories = [root]
+    for _ in range(depth):
+        directories = [d / f"d{i}" for d in directories for i in range(fanout)]
+    for directory in directories:
+        directory.mkdir(parents=True, exist_ok=True)
+
+    expected = []
+    for i in range(files):
+        directory = directories[i % len(directories)]
+        name = f"risk_{i:07d}.csv"
+        (directory / name).write_bytes(b'x' * rng.randint(1, 512))
+        expected.append(name)
+    expected.extend(f"absent_{i:07d}.csv" for i in range(int(files * missing_rate)))
+    return root, expected
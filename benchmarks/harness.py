@@ -0,0 +1,108 @@
+"""Timing, reporting and baseline comparison shared by the benchmarks"""
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, Any, List
+
+# A median this much slower than the baseline counts as a regression
+DEFAULT_TOLERANCE = 0.25
+
+
+def measure(name: str, func: Callable[[], Any], items: int = 1, unit: str = 'calls',
+            repeat: int = 5, warmup: int = 1) -> Dict[str, Any]:
+    """Time func() repeat times after warmup runs
+
+    items is the amount of work one call does (trades, rows, bytes...),
+    so throughput is items per second at the median latency.
+    """
+    for _ in range(warmup):
+        func()
+
+    samples = []
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+
+    median = statistics.median(samples)
+    p95 = statistics.quantiles(samples, n=20)[-1] if len(samples) > 1 else samples[0]
+    return {
+        'name': name,
+        'repeat': len(samples),
+        'items': items,
+        'unit': unit,
+        'min_ms': round(min(samples) * 1000, 3),
+        'median_ms': round(median * 1000, 3),
+        'p95_ms': round(p95 * 1000, 3),
+        'max_ms': round(max(samples) * 1000, 3),
+        'throughput_per_s': round(items / median, 1) if median else None
+    }
+
+
+def print_results(results: List[Dict[str, Any]]):
+    print(f"{'benchmark':<48} {'median ms':>11} {'p95 ms':>11} {'throughput':>16}")
+    for result in results:
+        throughput = f"{result['throughput_per_s']:,.0f} {result['unit']}/s" if result['throughput_per_s'] else '-'
+        print(f"{result['name']:<48} {result['median_ms']:>11,.1f} {result['p95_ms']:>11,.1f} {throughput:>16}")
+
+
+def save_baseline(results: List[Dict[str, Any]], path: str, scale: float):
+    """Store results with enough context to tell whether a later comparison is fair"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    baseline = {
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'scale': scale,
+        'results': {result['name']: result for result in results}
+    }
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2)
+
+
+def compare_to_baseline(results: List[Dict[str, Any]], path: str, scale: float,
+                        tolerance: float = DEFAULT_TOLERANCE) -> List[Dict[str, Any]]:
+    """Compare median latencies with a stored baseline, one row per benchmark"""
+    with open(path) as f:
+        baseline = json.load(f)
+    if baseline.get('scale') != scale:
+        print(f"Warning: baseline was recorded at scale {baseline.get('scale')}, this run uses {scale}")
+    if baseline.get('platform') != platform.platform():
+        print(f"Warning: baseline was recorded on {baseline.get('platform')}")
+
+    rows = []
+    for result in results:
+        previous = baseline['results'].get(result['name'])
+        if previous is None:
+            rows.append({'name': result['name'], 'status': 'NEW', 'median_ms': result['median_ms']})
+            continue
+        change = result['median_ms'] / previous['median_ms'] - 1 if previous['median_ms'] else 0.0
+        if change > tolerance:
+            status = 'REGRESSION'
+        elif change < -tolerance:
+            status = 'IMPROVED'
+        else:
+            status = 'OK'
+        rows.append({
+            'name': result['name'],
+            'status': status,
+            'baseline_median_ms': previous['median_ms'],
+            'median_ms': result['median_ms'],
+            'change_pct': round(change * 100, 1)
+        })
+    return rows
+
+
+def print_comparison(rows: List[Dict[str, Any]]):
+    print(f"\n{'benchmark':<48} {'baseline ms':>12} {'now ms':>11} {'change':>8}  status")
+    for row in rows:
+        if row['status'] == 'NEW':
+            print(f"{row['name']:<48} {'-':>12} {row['median_ms']:>11,.1f} {'-':>8}  NEW")
+        else:
+            print(f"{row['name']:<48} {row['baseline_median_ms']:>12,.1f} {row['median_ms']:>11,.1f} "
+                  f"{row['change_pct']:>+7.1f}%  {row['status']}")
@@ -0,0 +1,306 @@
+"""Benchmark the helpers and a whole suite run against local stand-ins
+
+Run from the repository root:
+
+    python -m benchmarks.run_benchmarks --scale 1 --save-baseline benchmarks/baselines/local.json
+    python -m benchmarks.run_benchmarks --scale 1 --baseline benchmarks/baselines/local.json
+
+CDW is served by benchmarks.cdw_stub_server, SQL Server by SQLite and
+MongoDB by mongomock or benchmarks.fake_mongo. --only limits the run to
+benchmarks whose name starts with one of the given prefixes. The exit
+code is 1 when a comparison against a baseline finds a regression.
+"""
+import argparse
+import io
+import json
+import logging
+import sys
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+from benchmarks.cdw_stub_server import CDWStubServer
+from benchmarks.fake_mongo import mongo_client
+from benchmarks.generators import (
+    build_documents, build_file_tree, build_result_sets, build_trade_list, build_trade_xml
+)
+from benchmarks.harness import (
+    DEFAULT_TOLERANCE, compare_to_baseline, measure, print_comparison, print_results, save_baseline
+)
+from benchmarks.standins import create_sqlite_database, patched_backends, sqlite_connect
+from libs.CDWHelper import CDWHelper
+from libs.ColumnarFrameBuilder import ColumnarFrameBuilder
+from libs.ComparisonHelper import ComparisonHelper
+from libs.ExcelIOHelper import ExcelIOHelper
+from libs.FileSystemHelper import FileSystemHelper
+from libs.FingerprintHelper import FingerprintHelper, FingerprintStore
+from libs.MongoDBHelper import MongoDBHelper
+from libs.SQLServerHelper import SQLServerHelper
+
+
+def bench_cdw(scale: float, repeat: int, workdir: Path):
+    trades = build_trade_list(int(500 * scale), dates=5, duplicates=0.1)
+    payload = build_trade_xml(legs=100, cashflows=20)
+    results = []
+
+    with CDWStubServer(latency=0.002) as server:
+        helper = CDWHelper(server.base_url, {})
+        calls = iter(range(10**9))
+        results.append(measure(
+            'cdw.fetch_trade_data', lambda: helper.fetch_trade_data(f"T{next(calls)}", '2024-01-01'),
+            repeat=repeat * 10
+        ))
+        helper.close()
+
+        for label, options in (('per_trade', {}), ('batched', {'batch_path': '/trades'})):
+            helper = CDWHelper(server.base_url, {}, max_workers=8, **options)
+            results.append(measure(
+                f'cdw.extract_all_trades[{label}]', lambda: helper.extract_all_trades(trades),
+                items=len(trades), unit='trades', repeat=repeat
+            ))
+            helper.close()
+
+    helper = CDWHelper('http://localhost', {})
+    results.append(measure(
+        'cdw.flatten_xml_stream', lambda: helper.flatten_xml_stream(io.BytesIO(payload)),
+        items=len(payload), unit='bytes', repeat=repeat
+    ))
+
+    # Frame construction from flattened records: plain DataFrame vs the typed columnar builder
+    flattened = helper.flatten_xml_stream(io.BytesIO(build_trade_xml(legs=20, cashflows=5)))
+    records = [dict(flattened, trade_id=t['trade_id'], trade_date=t['trade_date']) for t in trades]
+
+    def build_typed():
+        builder = ColumnarFrameBuilder()
+        builder.extend(records)
+        return builder.build()
+
+    results.append(measure('cdw.frame_build[dataframe]', lambda: pd.DataFrame(records),
+                           items=len(records), unit='trades', repeat=repeat))
+    results.append(measure('cdw.frame_build[columnar]', build_typed,
+                           items=len(records), unit='trades', repeat=repeat))
+    return results
+
+
+def bench_sql(scale: float, repeat: int, workdir: Path):
+    source, target = build_result_sets(int(100_000 * scale))
+    target = target.assign(trade_date=target['trade_date'].dt.strftime('%Y-%m-%d'))
+    source = source.assign(trade_date=source['trade_date'].dt.strftime('%Y-%m-%d'))
+    database = create_sqlite_database(str(workdir / 'bench.sqlite'), {'positions': target})
+
+    helper = SQLServerHelper(database, connect=sqlite_connect(database), fetch_size=20_000)
+    query = {'query': 'SELECT * FROM positions', 'key_columns': ['trade_id', 'trade_date']}
+    results = [
+        measure('sql.execute_query', lambda: helper.execute_query(query['query']),
+                items=len(target), unit='rows', repeat=repeat),
+        measure('sql.validate_data', lambda: helper.validate_data(source, {'positions': query}),
+                items=len(source), unit='rows', repeat=repeat),
+        measure('sql.validate_data[partitioned]',
+                lambda: helper.validate_data(source, {'positions': dict(query, partitioned={'num_partitions': 8})}),
+                items=len(source), unit='rows', repeat=repeat),
+    ]
+    helper.close()
+
+    # Change detection: once the state exists, an unchanged validation only fingerprints
+    fingerprints = FingerprintHelper(FingerprintStore(str(workdir / 'fingerprints.json')))
+    helper = SQLServerHelper(database, connect=sqlite_connect(database), fetch_size=20_000,
+                             fingerprints=fingerprints)
+    fingerprinted = {'positions': dict(query, fingerprint_query='SELECT COUNT(*), SUM(value_0) FROM positions')}
+    results.append(measure('sql.validate_data[fingerprint unchanged]',
+                           lambda: helper.validate_data(source, fingerprinted),
+                           items=len(source), unit='rows', repeat=repeat))
+    helper.close()
+    return results
+
+
+def bench_mongo(scale: float, repeat: int, workdir: Path):
+    documents = build_documents(int(20_000 * scale))
+    client = mongo_client()
+    client['risk']['positions'].insert_many(documents)
+    source = pd.DataFrame([{k: d[k] for k in ('trade_id', 'trade_date', 'book')} for d in documents])
+
+    helper = MongoDBHelper('mongodb://stand-in', 'risk', client=client)
+    validation = {'positions': {'collection': 'positions', 'key_columns': ['trade_id'],
+                                'compare_columns': ['book'], 'projection': ['trade_id', 'book']}}
+    return [
+        measure('mongo.query_collection', lambda: helper.query_collection('positions', {}),
+                items=len(documents), unit='docs', repeat=repeat),
+        measure('mongo.validate_data', lambda: helper.validate_data(source, validation),
+                items=len(documents), unit='docs', repeat=repeat),
+        measure('mongo.validate_stream', lambda: helper.validate_stream(source, validation),
+                items=len(documents), unit='docs', repeat=repeat),
+    ]
+
+
+def bench_files(scale: float, repeat: int, workdir: Path):
+    root, expected = build_file_tree(str(workdir / 'tree'), int(2_000 * scale), depth=2, fanout=4)
+    expected_path = workdir / 'expected.csv'
+    pd.DataFrame({'filename': expected}).to_csv(expected_path, index=False)
+
+    helper = FileSystemHelper(max_workers=8)
+    results = [
+        measure('files.validate_files_exist[recursive]',
+                lambda: helper.validate_files_exist(str(expected_path), str(root), recursive=True),
+                items=len(expected), unit='files', repeat=repeat),
+    ]
+
+    # Excel report I/O: pandas' in-memory openpyxl path vs the streaming helper
+    report, _ = build_result_sets(int(5_000 * scale))
+    excel = ExcelIOHelper()
+    pandas_path, stream_path = str(workdir / 'pandas.xlsx'), str(workdir / 'stream.xlsx')
+    results.extend([
+        measure('files.excel_write[pandas]', lambda: report.to_excel(pandas_path, index=False),
+                items=len(report), unit='rows', repeat=repeat),
+        measure('files.excel_write[streaming]', lambda: excel.write(report, stream_path),
+                items=len(report), unit='rows', repeat=repeat),
+        measure('files.excel_read[pandas]', lambda: pd.read_excel(pandas_path),
+                items=len(report), unit='rows', repeat=repeat),
+        measure('files.excel_read[streaming]', lambda: excel.read(stream_path),
+                items=len(report), unit='rows', repeat=repeat),
+    ])
+    return results
+
+
+def bench_comparison(scale: float, repeat: int, workdir: Path):
+    source, target = build_result_sets(int(200_000 * scale))
+    comparator = ComparisonHelper()
+    keys = ['trade_id', 'trade_date']
+    return [
+        measure('comparison.compare', lambda: comparator.compare(source, target, keys),
+                items=len(source), unit='rows', repeat=repeat),
+        measure('comparison.compare_partitioned',
+                lambda: comparator.compare_partitioned([source], [target], keys, num_partitions=8,
+                                                       work_dir=str(workdir)),
+                items=len(source), unit='rows', repeat=repeat),
+    ]
+
+
+def bench_suite(scale: float, repeat: int, workdir: Path):
+    """Whole suite run through the Orchestrator: CDW extraction feeding a SQL validation, plus files"""
+    from core.orchestrator import Orchestrator
+
+    trades = build_trade_list(int(300 * scale), dates=5)
+    trade_list = workdir / 'suite_trades.csv'
+    pd.DataFrame(trades).to_csv(trade_list, index=False)
+    root, expected = build_file_tree(str(workdir / 'suite_tree'), int(500 * scale), depth=1, missing_rate=0)
+    expected_path = workdir / 'suite_expected.csv'
+    pd.DataFrame({'filename': expected}).to_csv(expected_path, index=False)
+    database = create_sqlite_database(str(workdir / 'suite.sqlite'), {
+        'trades': pd.DataFrame(trades).assign(trade_header_book='RATES')
+    })
+
+    config_dir = workdir / 'config'
+    (config_dir / 'tasks').mkdir(parents=True, exist_ok=True)
+    output_dir = workdir / 'output'
+    suite = {
+        'suite_name': 'benchmark', 'max_parallel_tasks': 2, 'write_reports': False,
+        'tasks': [
+            {'task_name': 'files_in_folder_task', 'config_file': 'files.json'},
+            {'task_name': 'cdw_extraction_task', 'config_file': 'cdw.json'},
+            {'task_name': 'sql_validation_task', 'config_file': 'sql.json', 'depends_on': ['cdw_extraction_task']}
+        ]
+    }
+
+    with CDWStubServer(latency=0.002) as server:
+        task_configs = {
+            'files.json': {'output_format': 'csv', 'scan': {'recursive': True}, 'paths': {'UAT': {
+                'expected_files': str(expected_path), 'target_directory': str(root),
+                'output_report': str(output_dir / 'files.csv')}}},
+            'cdw.json': {'publish_as': 'cdw_trades', 'output_format': 'csv', 'environments': {'UAT': {
+                'base_url': server.base_url, 'credentials': {}, 'trade_list_path': str(trade_list),
+                'output_path': str(output_dir / 'cdw.csv'), 'fetch': {'max_workers': 8}}}},
+            'sql.json': {'source_artifact': 'cdw_trades', 'output_format': 'csv', 'environments': {'UAT': {
+                'connection_string': 'benchmark', 'output_path': str(output_dir / 'sql.csv'),
+                'validation_queries': {'trades': {
+                    'query': 'SELECT * FROM trades', 'key_columns': ['trade_id', 'trade_date'],
+                    'compare_columns': ['trade_header_book']}}}}},
+        }
+        for name, task_config in task_configs.items():
+            with open(config_dir / 'tasks' / name, 'w') as f:
+                json.dump(task_config, f)
+        suite_path = config_dir / 'suite.json'
+        with open(suite_path, 'w') as f:
+            json.dump(suite, f)
+
+        orchestrator = Orchestrator(str(config_dir))
+        runs = []
+
+        def run_suite():
+            results = orchestrator.execute_suite(str(suite_path), 'UAT')
+            failed = [t for t in results['tasks'] if t['status'] != 'SUCCESS']
+            if failed:
+                raise RuntimeError(f"Benchmark suite tasks failed: {failed}")
+            runs.append(results)
+
+        with patched_backends(sqlite_path=database):
+            results = [measure('suite.execute_suite', run_suite, items=len(suite['tasks']),
+                               unit='tasks', repeat=repeat)]
+
+    # Per-task latency within the suite, from the run profiles
+    for task in suite['tasks']:
+        task_id = task['task_name']
+        samples = [p['wall_seconds'] for run in runs for p in run['profile'] if p['task_id'] == task_id]
+        series = pd.Series(samples) * 1000
+        rows = next(p.get('rows') for p in runs[-1]['profile'] if p['task_id'] == task_id) or 0
+        results.append({
+            'name': f'suite.task.{task_id}', 'repeat': len(samples), 'items': rows, 'unit': 'rows',
+            'min_ms': round(series.min(), 3), 'median_ms': round(series.median(), 3),
+            'p95_ms': round(series.quantile(0.95), 3), 'max_ms': round(series.max(), 3),
+            'throughput_per_s': round(rows / (series.median() / 1000), 1) if rows else None
+        })
+    return results
+
+
+BENCHMARKS = {
+    'cdw': bench_cdw,
+    'sql': bench_sql,
+    'mongo': bench_mongo,
+    'files': bench_files,
+    'comparison': bench_comparison,
+    'suite': bench_suite,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the framework benchmarks')
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiplier for all data sizes')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--only', nargs='*', default=None, help='Benchmark name prefixes to run')
+    parser.add_argument('--output', help='Write the raw results as JSON')
+    parser.add_argument('--save-baseline', help='Store the results as a baseline file')
+    parser.add_argument('--baseline', help='Compare against a stored baseline')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='Allowed median slowdown before a benchmark counts as a regression')
+    args = parser.parse_args()
+
+    # Per-call INFO logging would dominate the timings
+    logging.disable(logging.INFO)
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix='risk_bench_') as workdir:
+        for group, bench in BENCHMARKS.items():
+            if args.only and not any(group.startswith(p) or p.startswith(group) for p in args.only):
+                continue
+            group_dir = Path(workdir) / group
+            group_dir.mkdir()
+            results.extend(bench(args.scale, args.repeat, group_dir))
+    if args.only:
+        results = [r for r in results if any(r['name'].startswith(p) for p in args.only)]
+
+    print_results(results)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        save_baseline(results, args.save_baseline, args.scale)
+        print(f"\nBaseline saved to {args.save_baseline}")
+    if args.baseline:
+        comparison = compare_to_baseline(results, args.baseline, args.scale, args.tolerance)
+        print_comparison(comparison)
+        if any(row['status'] == 'REGRESSION' for row in comparison):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
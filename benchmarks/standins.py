@@ -0,0 +1,48 @@
+"""Local stand-ins for the external systems: SQLite for pyodbc and a fake MongoClient
+
+The HTTP stand-in for CDW lives in benchmarks.cdw_stub_server.
+"""
+import sqlite3
+import types
+from contextlib import contextmanager
+from typing import Dict
+
+import pandas as pd
+
+import libs.MongoDBHelper as mongo_module
+import libs.SQLServerHelper as sql_module
+
+
+def create_sqlite_database(path: str, tables: Dict[str, pd.DataFrame]) -> str:
+    """Write each frame to a table of a SQLite file (dates are stored as ISO text)"""
+    conn = sqlite3.connect(path)
+    try:
+        for table, frame in tables.items():
+            frame.to_sql(table, conn, index=False, if_exists='replace')
+        conn.commit()
+    finally:
+        conn.close()
+    return path
+
+
+def sqlite_connect(path: str):
+    """connect(connection_string) callable for SQLServerHelper backed by a SQLite file"""
+    return lambda connection_string: sqlite3.connect(path, check_same_thread=False)
+
+
+@contextmanager
+def patched_backends(sqlite_path: str = None, mongo_client=None):
+    """Route the tasks' pyodbc and pymongo connections to the local stand-ins
+
+    Tasks build their own helpers from config, so whole-suite benchmarks
+    swap the driver modules instead of injecting connections.
+    """
+    saved = (sql_module.pyodbc, mongo_module.pymongo)
+    try:
+        if sqlite_path is not None:
+            sql_module.pyodbc = types.SimpleNamespace(connect=sqlite_connect(sqlite_path))
+        if mongo_client is not None:
+            mongo_module.pymongo = types.SimpleNamespace(MongoClient=lambda *args, **kwargs: mongo_client)
+        yield
+    finally:
+        sql_module.pyodbc, mongo_module.pymongo = saved
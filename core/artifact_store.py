@@ -0,0 +1,83 @@
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+
+class ArtifactStore:
+    """Named in-memory DataFrames shared between the tasks of a suite run
+
+    Tasks publish their output frames here so downstream tasks can consume
+    them without a disk round-trip. Excel reports can be registered for
+    deferred writing once the whole suite has finished.
+    """
+
+    def __init__(self):
+        self._artifacts: Dict[str, Any] = {}
+        self._owners: Dict[str, Optional[str]] = {}  # Artifact name -> publishing task id
+        self._reports: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def publish(self, name: str, frame, owner: Optional[str] = None):
+        """Publish (or replace) a named artifact, optionally tagged with the publishing task"""
+        with self._lock:
+            if name in self._artifacts:
+                self.logger.warning(f"Replacing existing artifact: {name}")
+            self._artifacts[name] = frame
+            self._owners[name] = owner
+        self.logger.info(f"Published artifact {name} ({len(frame)} rows)")
+
+    def get(self, name: str, default=None):
+        """Return a published artifact, or default if it does not exist"""
+        with self._lock:
+            return self._artifacts.get(name, default)
+
+    def __contains__(self, name: str) -> bool:
+        with self._lock:
+            return name in self._artifacts
+
+    def names(self, owner: Optional[str] = None) -> List[str]:
+        """Names of all published artifacts, or only those published by owner"""
+        with self._lock:
+            if owner is None:
+                return list(self._artifacts)
+            return [name for name, published_by in self._owners.items() if published_by == owner]
+
+    def add_report(self, output_path: str, frame, task_name: Optional[str] = None, owner: Optional[str] = None):
+        """Register a frame to be written as an Excel report at the end of the suite"""
+        with self._lock:
+            self._reports.append({
+                'output_file': str(output_path),
+                'frame': frame,
+                'task_name': task_name,
+                'owner': owner
+            })
+
+    def reports(self, owner: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Deferred reports not yet written, or only those registered by owner"""
+        with self._lock:
+            return [dict(report) for report in self._reports if owner is None or report['owner'] == owner]
+
+    def write_reports(self) -> List[Dict[str, Any]]:
+        """Write every deferred report and return one status record per file"""
+        with self._lock:
+            reports, self._reports = self._reports, []
+
+        from libs.DataIOHelper import DataIOHelper
+        io_helper = DataIOHelper()
+
+        written = []
+        for report in reports:
+            output_path = report['output_file']
+            try:
+                Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+                io_helper.write(report['frame'], output_path, 'excel')
+                written.append({'task_name': report['task_name'], 'output_file': output_path,
+                                'status': 'SUCCESS'})
+                self.logger.info(f"Wrote deferred report: {output_path}")
+            except Exception as e:
+                self.logger.error(f"Failed to write deferred report {output_path}: {e}")
+                written.append({'task_name': report['task_name'], 'output_file': output_path,
+                                'status': 'FAIL', 'error': str(e)})
+        return written
@@ -0,0 +1,226 @@
+import hashlib
+import json
+import logging
+import pickle
+import shutil
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+# Where the command line keeps checkpoints unless told otherwise
+DEFAULT_STATE_DIR = '.checkpoints'
+
+# Checkpointed trade records are committed in groups of this size
+DEFAULT_FLUSH_EVERY = 200
+
+
+class CheckpointStore:
+    """Durable progress of one suite run (suite + environment) for --resume
+
+    Task outcomes and fetched trade records live in a SQLite file under
+    state_dir; artifacts and deferred reports of completed tasks are
+    pickled next to it so that a resumed run still has them.
+
+    Every run that is not resumed starts a new attempt: progress of earlier
+    attempts is ignored (and replaced task by task) but not deleted, and
+    the whole state is only reset once a run completes successfully.
+    """
+
+    def __init__(self, state_dir: str, suite_name: str, env: str, resume: bool = False):
+        self.state_dir = Path(state_dir)
+        self.run_key = f"{suite_name}|{env}"
+        self.resume = resume
+        self.logger = logging.getLogger(__name__)
+
+        run_digest = hashlib.sha256(self.run_key.encode()).hexdigest()[:16]
+        self.artifact_dir = self.state_dir / 'artifacts' / run_digest
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.state_dir / 'checkpoints.sqlite'),
+                                     check_same_thread=False, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                run_key TEXT NOT NULL,
+                task_id TEXT NOT NULL,
+                config_digest TEXT NOT NULL,
+                outcome TEXT NOT NULL,
+                artifacts TEXT NOT NULL,
+                finished_at REAL NOT NULL,
+                PRIMARY KEY (run_key, task_id)
+            );
+            CREATE TABLE IF NOT EXISTS trades (
+                run_key TEXT NOT NULL,
+                scope TEXT NOT NULL,
+                trade_id TEXT NOT NULL,
+                trade_date TEXT NOT NULL,
+                record TEXT NOT NULL,
+                PRIMARY KEY (run_key, scope, trade_id, trade_date)
+            );
+            CREATE TABLE IF NOT EXISTS attempts (
+                run_key TEXT PRIMARY KEY,
+                started_at REAL NOT NULL
+            );
+        """)
+        # State directories created before deferred reports were checkpointed
+        columns = [row[1] for row in self._conn.execute('PRAGMA table_info(tasks)')]
+        if 'reports' not in columns:
+            self._conn.execute("ALTER TABLE tasks ADD COLUMN reports TEXT NOT NULL DEFAULT '[]'")
+        self.started_at = self._start_attempt()
+        self._conn.commit()
+
+    def _start_attempt(self) -> float:
+        """Start time of the attempt whose progress counts: the last one when resuming, else now"""
+        row = self._conn.execute('SELECT started_at FROM attempts WHERE run_key = ?', (self.run_key,)).fetchone()
+        if self.resume:
+            return row[0] if row is not None else 0.0
+        unfinished = self._conn.execute('SELECT COUNT(*) FROM tasks WHERE run_key = ?', (self.run_key,)).fetchone()[0]
+        if unfinished:
+            self.logger.warning(f"Starting a new attempt of {self.run_key}; the progress of an interrupted "
+                                f"run ({unfinished} completed tasks) is kept but no longer resumable")
+        started_at = time.time()
+        self._conn.execute('INSERT OR REPLACE INTO attempts (run_key, started_at) VALUES (?, ?)',
+                           (self.run_key, started_at))
+        return started_at
+
+    @staticmethod
+    def config_digest(task_params: Dict[str, Any]) -> str:
+        """Fingerprint of a task's configuration; a changed config is never resumed"""
+        return hashlib.sha256(json.dumps(task_params, sort_keys=True, default=str).encode()).hexdigest()
+
+    def reset(self):
+        """Forget all progress of this run (once it has completed)"""
+        with self._lock:
+            self._conn.execute('DELETE FROM tasks WHERE run_key = ?', (self.run_key,))
+            self._conn.execute('DELETE FROM trades WHERE run_key = ?', (self.run_key,))
+            self._conn.execute('DELETE FROM attempts WHERE run_key = ?', (self.run_key,))
+            self._conn.commit()
+        shutil.rmtree(self.artifact_dir, ignore_errors=True)
+
+    def completed_task(self, task_id: str,
+                       config_digest: str) -> Optional[Tuple[Dict[str, Any], Dict[str, Any], List[Dict[str, Any]]]]:
+        """Outcome, artifacts and deferred reports of a task finished with this config, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT config_digest, outcome, artifacts, reports, finished_at FROM tasks '
+                'WHERE run_key = ? AND task_id = ?',
+                (self.run_key, task_id)
+            ).fetchone()
+        if row is None or row[4] < self.started_at:
+            return None
+        if row[0] != config_digest:
+            self.logger.info(f"Configuration of task {task_id} changed since its checkpoint, running it again")
+            return None
+
+        try:
+            artifacts = {name: self._load_pickle(path) for name, path in json.loads(row[2]).items()}
+            reports = [dict(report, frame=self._load_pickle(report.pop('path'))) for report in json.loads(row[3])]
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            self.logger.warning(f"Checkpointed output of task {task_id} is unusable ({e}), running it again")
+            return None
+        return json.loads(row[1]), artifacts, reports
+
+    def complete_task(self, task_id: str, config_digest: str, outcome: Dict[str, Any], artifacts: Dict[str, Any],
+                      reports: Optional[List[Dict[str, Any]]] = None):
+        """Record a successful task with the artifacts it published and the reports it deferred"""
+        task_dir = self.artifact_dir / hashlib.sha256(task_id.encode()).hexdigest()[:16]
+        task_dir.mkdir(parents=True, exist_ok=True)
+        paths = {name: self._save_pickle(frame, task_dir / f"{number}.pkl")
+                 for number, (name, frame) in enumerate(artifacts.items())}
+        saved_reports = [
+            {'output_file': report['output_file'], 'task_name': report.get('task_name'),
+             'path': self._save_pickle(report['frame'], task_dir / f"report_{number}.pkl")}
+            for number, report in enumerate(reports or [])
+        ]
+
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO tasks (run_key, task_id, config_digest, outcome, artifacts, reports, '
+                'finished_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (self.run_key, task_id, config_digest, json.dumps(outcome, default=str),
+                 json.dumps(paths), json.dumps(saved_reports), time.time())
+            )
+            # The task output now exists, so its partial progress is no longer needed
+            self._conn.execute('DELETE FROM trades WHERE run_key = ? AND scope = ?', (self.run_key, task_id))
+            self._conn.commit()
+
+    def _save_pickle(self, value, path: Path) -> str:
+        # Write then rename, so a crash never leaves a truncated pickle behind
+        partial = path.with_suffix('.tmp')
+        with open(partial, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        partial.replace(path)
+        return str(path)
+
+    def _load_pickle(self, path: str):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+    def trade_checkpoint(self, scope: str, flush_every: int = DEFAULT_FLUSH_EVERY) -> 'TradeCheckpoint':
+        """Checkpoint for the trade records fetched by one task
+
+        A new attempt starts the task's extraction from scratch, so records
+        an earlier attempt fetched for it are dropped.
+        """
+        if not self.resume:
+            with self._lock:
+                self._conn.execute('DELETE FROM trades WHERE run_key = ? AND scope = ?', (self.run_key, scope))
+                self._conn.commit()
+        return TradeCheckpoint(self, scope, flush_every)
+
+    def _load_trades(self, scope: str) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT trade_id, trade_date, record FROM trades WHERE run_key = ? AND scope = ?',
+                (self.run_key, scope)
+            ).fetchall()
+        return {(trade_id, trade_date): json.loads(record) for trade_id, trade_date, record in rows}
+
+    def _save_trades(self, scope: str, records: Dict[Tuple, Dict[str, Any]]):
+        with self._lock:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO trades (run_key, scope, trade_id, trade_date, record) VALUES (?, ?, ?, ?, ?)',
+                [(self.run_key, scope, str(trade_id), str(trade_date), json.dumps(record, default=str))
+                 for (trade_id, trade_date), record in records.items()]
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class TradeCheckpoint:
+    """Buffered, thread-safe store of fetched trade records for one task
+
+    Keys are (trade_id, trade_date) pairs, matched by their string form.
+    """
+
+    def __init__(self, store: CheckpointStore, scope: str, flush_every: int = DEFAULT_FLUSH_EVERY):
+        self.store = store
+        self.scope = scope
+        self.flush_every = max(1, int(flush_every))
+        self._pending: Dict[Tuple, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def load(self) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """Records saved by an earlier, interrupted attempt"""
+        return self.store._load_trades(self.scope)
+
+    def save(self, key: Tuple, record: Dict[str, Any]):
+        with self._lock:
+            self._pending[key] = record
+            if len(self._pending) < self.flush_every:
+                return
+            pending, self._pending = self._pending, {}
+        self.store._save_trades(self.scope, pending)
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if pending:
+            self.store._save_trades(self.scope, pending)
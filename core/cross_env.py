@@ -0,0 +1,65 @@
+import json
+import logging
+from typing import Dict, Any, List
+
+logger = logging.getLogger(__name__)
+
+
+def compare_environments(specs: List[Dict[str, Any]], artifacts_by_env: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Compare published artifacts of the first environment with every other one
+
+    Each spec names an artifact plus key_columns and, optionally,
+    compare_columns, tolerances and sample_size (as for validations).
+    Returns one result row per spec and target environment.
+    """
+    # pandas is only needed once a multi-environment run gets this far
+    from libs.ComparisonHelper import ComparisonHelper
+
+    envs = list(artifacts_by_env)
+    baseline = envs[0]
+    rows = []
+    for spec in specs:
+        artifact = spec['artifact']
+        for env in envs[1:]:
+            row = {
+                'comparison_name': spec.get('name', artifact),
+                'artifact': artifact,
+                'source_env': baseline,
+                'target_env': env
+            }
+            try:
+                source = artifacts_by_env[baseline].get(artifact)
+                target = artifacts_by_env[env].get(artifact)
+                missing = [e for e, frame in ((baseline, source), (env, target)) if frame is None]
+                if missing:
+                    raise ValueError(f"Artifact {artifact} was not published in {missing}")
+
+                result = ComparisonHelper(sample_size=spec.get('sample_size', 10)).compare(
+                    source, target, spec['key_columns'],
+                    compare_columns=spec.get('compare_columns'),
+                    tolerances=spec.get('tolerances')
+                )
+                row.update({
+                    'status': 'PASS' if result['all_match'] else 'FAIL',
+                    'mismatch_count': result['mismatch_count'],
+                    'missing_in_source': result['missing_in_source'],
+                    'missing_in_target': result['missing_in_target'],
+                    'column_mismatches': json.dumps(result['column_mismatches']),
+                    'sample_keys': json.dumps(result['sample_keys'], default=str),
+                    'details': result['details']
+                })
+            except Exception as e:
+                logger.error(f"Cross-environment comparison of {artifact} ({baseline} vs {env}) failed: {e}")
+                row.update({'status': 'ERROR', 'error': str(e)})
+
+            logger.info(f"Cross-environment {row['comparison_name']} {baseline} vs {env}: {row['status']}")
+            rows.append(row)
+    return rows
+
+
+def write_cross_env_report(rows: List[Dict[str, Any]], output_path: str) -> str:
+    """Write the comparison rows in the format implied by output_path"""
+    import pandas as pd
+    from libs.DataIOHelper import DataIOHelper
+
+    return DataIOHelper().write(pd.DataFrame(rows), output_path)
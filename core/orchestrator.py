@@ -1,8 +1,16 @@
 import json
 import logging
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Dict, Any, List, Optional
 from pathlib import Path
 from .task_registry import TaskRegistry
+from .run_context import RunContext
+from .profiler import RunProfiler, peak_rss_mb
+from .checkpoint import CheckpointStore
+from .cross_env import compare_environments, write_cross_env_report
+
+# Task statuses that cause dependent tasks to be skipped
+BLOCKING_STATUSES = ('FAIL', 'SKIPPED')
 
 class Orchestrator:
     def __init__(self, config_dir: str = "config"):
@@ -32,50 +40,276 @@ class Orchestrator:
             self.logger.error(f"Failed to load suite config: {e}")
             raise
     
-    def execute_suite(self, suite_path: str, env: str = "UAT") -> Dict[str, Any]:
-        """Execute a test suite"""
+    def _task_id(self, task_config: Dict[str, Any]) -> str:
+        """Identifier used for depends_on edges (defaults to the task name)"""
+        return task_config.get('task_id', task_config['task_name'])
+    
+    def resolve_dependencies(self, task_configs: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+        """Build the task dependency graph and reject unknown ids and cycles"""
+        dependencies = {}
+        for task_config in task_configs:
+            task_id = self._task_id(task_config)
+            if task_id in dependencies:
+                raise ValueError(f"Duplicate task id in suite: {task_id}")
+            depends_on = task_config.get('depends_on', [])
+            if isinstance(depends_on, str):
+                depends_on = [depends_on]
+            dependencies[task_id] = list(depends_on)
+        
+        for task_id, depends_on in dependencies.items():
+            unknown = [dep for dep in depends_on if dep not in dependencies]
+            if unknown:
+                raise ValueError(f"Task {task_id} depends on unknown tasks: {unknown}")
+        
+        # Kahn's algorithm: anything left unresolved sits on a cycle
+        remaining = {task_id: set(deps) for task_id, deps in dependencies.items()}
+        while True:
+            ready = [task_id for task_id, deps in remaining.items() if not deps]
+            if not ready:
+                break
+            for task_id in ready:
+                del remaining[task_id]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        if remaining:
+            raise ValueError(f"Dependency cycle between tasks: {sorted(remaining)}")
+        
+        return dependencies
+    
+    def execute_suite(self, suite_path: str, env: str = "UAT", max_parallel: Optional[int] = None,
+                      refresh: bool = False, cprofile_dir: Optional[str] = None,
+                      state_dir: Optional[str] = None, resume: bool = False) -> Dict[str, Any]:
+        """Execute a test suite, running independent tasks concurrently
+        
+        With state_dir set, progress is checkpointed there until the run
+        completes successfully; resume then skips tasks that already
+        succeeded with an unchanged configuration and lets interrupted
+        extractions continue where they stopped.
+        """
+        suite_config = self.load_suite_config(suite_path)
+        results, _ = self._execute_suite_config(
+            suite_config, env, max_parallel, refresh, cprofile_dir, state_dir=state_dir, resume=resume
+        )
+        return results
+    
+    def execute_multi_env(self, suite_path: str, envs: List[str], max_parallel: Optional[int] = None,
+                          refresh: bool = False, cprofile_dir: Optional[str] = None,
+                          state_dir: Optional[str] = None, resume: bool = False) -> Dict[str, Any]:
+        """Run a suite for several environments at once, then diff their published artifacts
+        
+        Each environment gets its own run context (artifacts, shared
+        resources, profile) and writes its outputs into an <env>
+        subdirectory. The first environment is the baseline for the
+        suite's cross_env_compare entries.
+        """
         suite_config = self.load_suite_config(suite_path)
-        self.logger.info(f"Executing suite: {suite_config['suite_name']}")
+        envs = list(dict.fromkeys(envs))
+        
+        def run(env):
+            env_cprofile_dir = str(Path(cprofile_dir) / env) if cprofile_dir else None
+            return self._execute_suite_config(
+                suite_config, env, max_parallel, refresh, env_cprofile_dir, output_subdir=env,
+                state_dir=state_dir, resume=resume
+            )
+        
+        with ThreadPoolExecutor(max_workers=len(envs)) as executor:
+            runs = list(executor.map(run, envs))
+        
+        cross_env = compare_environments(
+            suite_config.get('cross_env_compare', []),
+            {env: context.artifacts for env, (_, context) in zip(envs, runs)}
+        )
+        results = {
+            'suite_name': suite_config['suite_name'],
+            'environments': envs,
+            'runs': [env_results for env_results, _ in runs],
+            'cross_env': cross_env
+        }
+        if cross_env and suite_config.get('cross_env_output'):
+            results['cross_env_output'] = write_cross_env_report(cross_env, suite_config['cross_env_output'])
+        return results
+    
+    def _execute_suite_config(self, suite_config: Dict[str, Any], env: str, max_parallel: Optional[int],
+                              refresh: bool, cprofile_dir: Optional[str], output_subdir: Optional[str] = None,
+                              state_dir: Optional[str] = None, resume: bool = False):
+        """Run a loaded suite for one environment; returns (results, run context)"""
+        self.logger.info(f"Executing suite: {suite_config['suite_name']} ({env})")
+        
+        task_configs = suite_config['tasks']
+        dependencies = self.resolve_dependencies(task_configs)
+        max_parallel = max(1, int(max_parallel or suite_config.get('max_parallel_tasks', 1)))
         
         results = {
             'suite_name': suite_config['suite_name'],
             'environment': env,
             'tasks': []
         }
+        checkpoints = None
+        if state_dir:
+            checkpoints = CheckpointStore(state_dir, suite_config['suite_name'], env, resume=resume)
+        context = RunContext(env, refresh=refresh, profiler=RunProfiler(cprofile_dir),
+                             output_subdir=output_subdir, checkpoints=checkpoints,
+                             sampling=self._create_sampler(suite_config))
         
-        for task_config in suite_config['tasks']:
-            task_name = task_config['task_name']
-            task_config_path = self.config_dir / 'tasks' / task_config['config_file']
-            
+        outcomes: Dict[str, Dict[str, Any]] = {}
+        try:
             try:
-                self.logger.info(f"Executing task: {task_name}")
+                self._run_task_graph(task_configs, dependencies, outcomes, max_parallel, env, context)
+            finally:
+                # Sessions, clients and pools are shared by the tasks of this run only
+                context.resources.close()
+            
+            # Report in declaration order regardless of completion order
+            task_ids = [self._task_id(task_config) for task_config in task_configs]
+            results['tasks'] = [outcomes[task_id] for task_id in task_ids]
+            results['profile'] = context.profiler.records(task_ids)
+            results['run_peak_rss_mb'] = peak_rss_mb()
+            
+            # Deferred Excel reports are written once, after every task has run
+            if suite_config.get('write_reports', True):
+                results['reports'] = context.artifacts.write_reports()
+            
+            # Only a run that completed, reports included, has nothing left to resume
+            completed = all(task['status'] == 'SUCCESS' for task in results['tasks']) and \
+                all(report['status'] == 'SUCCESS' for report in results.get('reports', []))
+            if checkpoints is not None and completed:
+                checkpoints.reset()
+        finally:
+            if checkpoints is not None:
+                checkpoints.close()
+        return results, context
+    
+    def _create_sampler(self, suite_config: Dict[str, Any]):
+        """SamplingHelper for the suite's 'sampling' section, if it has one"""
+        sampling_config = suite_config.get('sampling')
+        if not sampling_config or sampling_config.get('enabled') is False:
+            return None
+        from libs.SamplingHelper import SamplingHelper
+        sampler = SamplingHelper.from_config(sampling_config)
+        self.logger.info(f"Sampling enabled: rate={sampler.rate}, stratify_by={sampler.stratify_by}")
+        return sampler
+    
+    def _run_task_graph(self, task_configs: List[Dict[str, Any]], dependencies: Dict[str, List[str]],
+                        outcomes: Dict[str, Dict[str, Any]], max_parallel: int, env: str, context: RunContext):
+        """Run every task once its dependencies finish, recording results in outcomes"""
+        pending = list(task_configs)
+        
+        with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+            running: Dict[Future, str] = {}
+            
+            while pending or running:
+                # Start or skip every task whose dependencies have finished,
+                # in declaration order so a parallelism of 1 stays sequential
+                progressed = True
+                while progressed:
+                    progressed = False
+                    for task_config in list(pending):
+                        task_id = self._task_id(task_config)
+                        depends_on = dependencies[task_id]
+                        if not all(dep in outcomes for dep in depends_on):
+                            continue
+                        
+                        blocked_by = [dep for dep in depends_on
+                                      if outcomes[dep]['status'] in BLOCKING_STATUSES]
+                        if blocked_by:
+                            self.logger.warning(f"Skipping task {task_id}: dependencies did not succeed: {blocked_by}")
+                            outcomes[task_id] = {
+                                'task_id': task_id,
+                                'task_name': task_config['task_name'],
+                                'status': 'SKIPPED',
+                                'error': f"Skipped because dependencies did not succeed: {blocked_by}"
+                            }
+                        elif len(running) < max_parallel:
+                            future = executor.submit(self._run_task, task_config, env, context)
+                            running[future] = task_id
+                        else:
+                            continue
+                        
+                        pending.remove(task_config)
+                        progressed = True
                 
-                # Load task-specific configuration
-                with open(task_config_path, 'r') as f:
-                    task_params = json.load(f)
+                if not running:
+                    break
                 
-                # Execute task
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    outcomes[running.pop(future)] = future.result()
+    
+    def _run_task(self, task_config: Dict[str, Any], env: str, context: RunContext) -> Dict[str, Any]:
+        """Run a single suite task and normalise its result"""
+        task_id = self._task_id(task_config)
+        task_name = task_config['task_name']
+        task_config_path = self.config_dir / 'tasks' / task_config['config_file']
+        
+        try:
+            self.logger.info(f"Executing task: {task_id}")
+            
+            # Load task-specific configuration
+            with open(task_config_path, 'r') as f:
+                task_params = json.load(f)
+            # Suite-level params (e.g. publish_as/source_artifact wiring) override the task file
+            task_params.update(task_config.get('params', {}))
+            
+            config_digest = None
+            if context.checkpoints is not None:
+                # A different sample must not reuse a task completed for the old one
+                digest_input = task_params if context.sampling is None else {
+                    'task': task_params, 'sampling': context.sampling.settings()
+                }
+                config_digest = CheckpointStore.config_digest(digest_input)
+                resumed = self._resume_task(task_id, config_digest, context)
+                if resumed is not None:
+                    return resumed
+            
+            # Execute task, recording timings under its own id
+            with context.profiler.profile_task(task_id, task_name) as profile:
                 task_result = self.task_registry.execute_task(
                     task_name, 
                     task_params, 
-                    env
+                    env,
+                    context.for_task(task_id)
                 )
-                
-                results['tasks'].append({
-                    'task_name': task_name,
-                    'status': task_result['status'],
-                    'output_file': task_result.get('output_file'),
-                    'error': task_result.get('error')
-                })
-                
-                self.logger.info(f"Task {task_name} completed with status: {task_result['status']}")
-                
-            except Exception as e:
-                self.logger.error(f"Task {task_name} failed: {e}")
-                results['tasks'].append({
-                    'task_name': task_name,
-                    'status': 'FAIL',
-                    'error': str(e)
-                })
+                profile['status'] = task_result['status']
+                profile['rows'] = task_result.get('rows')
+            
+            self.logger.info(
+                f"Task {task_id} completed with status: {task_result['status']} "
+                f"in {profile['wall_seconds']:.2f}s"
+            )
+            
+            outcome = {
+                'task_id': task_id,
+                'task_name': task_name,
+                'status': task_result['status'],
+                'output_file': task_result.get('output_file'),
+                'error': task_result.get('error')
+            }
+            if context.checkpoints is not None and outcome['status'] == 'SUCCESS':
+                artifacts = {name: context.artifacts.get(name) for name in context.artifacts.names(owner=task_id)}
+                context.checkpoints.complete_task(task_id, config_digest, outcome, artifacts,
+                                                  context.artifacts.reports(owner=task_id))
+            return outcome
+            
+        except Exception as e:
+            self.logger.error(f"Task {task_id} failed: {e}")
+            return {
+                'task_id': task_id,
+                'task_name': task_name,
+                'status': 'FAIL',
+                'error': str(e)
+            }
+    
+    def _resume_task(self, task_id: str, config_digest: str, context: RunContext) -> Optional[Dict[str, Any]]:
+        """Restore a task completed by an earlier attempt of this run, if there is one"""
+        completed = context.checkpoints.completed_task(task_id, config_digest)
+        if completed is None:
+            return None
         
-        return results
\ No newline at end of file
+        outcome, artifacts, reports = completed
+        for name, frame in artifacts.items():
+            context.artifacts.publish(name, frame, owner=task_id)
+        for report in reports:
+            context.artifacts.add_report(report['output_file'], report['frame'],
+                                         task_name=report.get('task_name'), owner=task_id)
+        self.logger.info(f"Task {task_id} already completed in an earlier attempt, skipping")
+        return dict(outcome, resumed=True)
\ No newline at end of file
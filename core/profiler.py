@@ -0,0 +1,130 @@
+import cProfile
+import json
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from libs.StageRecorder import StageRecorder
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Process high-water mark of resident memory, in MiB
+
+    The mark covers the whole process so far, so it cannot be attributed to
+    one task of a run; it is reported once per run as run_peak_rss_mb.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux KiB
+    return round(peak / (2**20 if sys.platform == 'darwin' else 1024), 1)
+
+
+class RunProfiler:
+    """Per-task and per-stage performance records for one suite run
+
+    Each task gets wall time, CPU time (the task thread and the whole
+    process), row count and its stage breakdown. Peak RSS is process-wide
+    and is reported for the run as a whole (see peak_rss_mb).
+    With cprofile_dir set, every task is also run under cProfile and its
+    stats are dumped to <cprofile_dir>/<task_id>.prof (viewable with
+    snakeviz, or as a flame graph with flameprof).
+    """
+
+    def __init__(self, cprofile_dir: Optional[str] = None):
+        self.cprofile_dir = Path(cprofile_dir) if cprofile_dir else None
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._stages: Dict[str, StageRecorder] = {}
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def stages(self, task_id: str) -> StageRecorder:
+        """Stage recorder for a task (created on first use)"""
+        with self._lock:
+            if task_id not in self._stages:
+                self._stages[task_id] = StageRecorder()
+            return self._stages[task_id]
+
+    @contextmanager
+    def profile_task(self, task_id: str, task_name: str):
+        """Measure the enclosed task execution; the yielded dict takes extra fields"""
+        record = {'task_id': task_id, 'task_name': task_name}
+        profiler = self._start_cprofile(task_id)
+
+        started_at = time.time()
+        wall_start = time.perf_counter()
+        thread_cpu_start = time.thread_time()
+        process_cpu_start = time.process_time()
+        try:
+            yield record
+        finally:
+            record.update({
+                'started_at': started_at,
+                'wall_seconds': round(time.perf_counter() - wall_start, 6),
+                'cpu_seconds': round(time.thread_time() - thread_cpu_start, 6),
+                'process_cpu_seconds': round(time.process_time() - process_cpu_start, 6),
+                'stages': self.stages(task_id).summary()
+            })
+            if profiler is not None:
+                record['cprofile'] = self._dump_cprofile(profiler, task_id)
+            with self._lock:
+                self._records[task_id] = record
+
+    def _start_cprofile(self, task_id: str):
+        if self.cprofile_dir is None:
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e:
+            # Only one profiler can be active at a time on newer Pythons
+            self.logger.warning(f"cProfile unavailable for task {task_id}: {e}")
+            return None
+        return profiler
+
+    def _dump_cprofile(self, profiler: cProfile.Profile, task_id: str) -> str:
+        profiler.disable()
+        self.cprofile_dir.mkdir(parents=True, exist_ok=True)
+        path = self.cprofile_dir / f"{task_id}.prof"
+        profiler.dump_stats(str(path))
+        return str(path)
+
+    def records(self, task_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Task records, in task_ids order when given"""
+        with self._lock:
+            if task_ids is None:
+                return list(self._records.values())
+            return [self._records[task_id] for task_id in task_ids if task_id in self._records]
+
+
+def write_profile_report(results: Dict[str, Any], output_path: str):
+    """Write the run profile as JSON (whole report) or JSONL (one line per task)
+
+    Multi-environment results (with 'runs') produce one section, or one set
+    of lines, per environment. The run-wide peak RSS goes in each section
+    header (and on every JSONL line), not in the task records.
+    """
+    path = Path(output_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    runs = results.get('runs', [results])
+    headers = [{key: run[key] for key in ('suite_name', 'environment', 'run_peak_rss_mb') if key in run} for run in runs]
+
+    with open(path, 'w') as f:
+        if path.suffix == '.jsonl':
+            for header, run in zip(headers, runs):
+                for record in run.get('profile', []):
+                    f.write(json.dumps({**header, **record}, default=str) + '\n')
+        elif 'runs' in results:
+            sections = [{**header, 'tasks': run.get('profile', [])} for header, run in zip(headers, runs)]
+            json.dump({'suite_name': results.get('suite_name'), 'runs': sections}, f, indent=2, default=str)
+        else:
+            json.dump({**headers[0], 'tasks': results.get('profile', [])}, f, indent=2, default=str)
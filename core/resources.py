@@ -0,0 +1,93 @@
+import hashlib
+import json
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Tuple
+
+
+class ResourceContext:
+    """Clients and connection pools shared by the tasks of one suite run
+
+    Each resource is created once per (system, env, identity, options) on
+    first use, handed to every task that asks for the same key, and closed
+    in reverse creation order when the orchestrator closes the context.
+    Creation runs outside the context's lock, so a slow connect only holds
+    up the tasks waiting for that same resource.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self._resources: Dict[Tuple, Future] = {}
+        self._order: List[Tuple] = []
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def acquire(self, system: str, env: str, identity: Any, factory: Callable[[], Any], **options) -> Any:
+        """Return the shared resource for this key, creating it with factory() on first use
+
+        identity holds what distinguishes one endpoint/login from another
+        (URL, connection string, credentials); options are any settings that
+        change how the resource is built. Both are only kept as a digest.
+        If factory() fails, callers waiting for the same key get its error
+        and the next acquire() tries again.
+        """
+        key = (system, env, self._digest(identity, options))
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Resource context is closed")
+            future = self._resources.get(key)
+            creating = future is None
+            if creating:
+                future = self._resources[key] = Future()
+        if not creating:
+            return future.result()
+
+        try:
+            resource = factory()
+        except BaseException as e:
+            with self._lock:
+                if self._resources.get(key) is future:
+                    del self._resources[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            closed = self._closed
+            if not closed:
+                self._order.append(key)
+        if closed:
+            # The context was closed while this resource was being created
+            self._close_resource(system, env, resource)
+            future.set_exception(RuntimeError("Resource context is closed"))
+            raise future.exception()
+        future.set_result(resource)
+        self.logger.info(f"Created shared {system} resource for {env}")
+        return resource
+
+    def close(self):
+        """Close every resource, newest first; failures are logged, not raised"""
+        with self._lock:
+            self._closed = True
+            # Only created resources are in _order; ones still being created close themselves
+            resources = [(key, self._resources[key].result()) for key in reversed(self._order)]
+            self._resources.clear()
+            self._order.clear()
+
+        for (system, env, _), resource in resources:
+            self._close_resource(system, env, resource)
+        if resources:
+            self.logger.info(f"Closed {len(resources)} shared resources")
+
+    def _close_resource(self, system: str, env: str, resource: Any):
+        close = getattr(resource, 'close', None)  # Plain shared objects need no cleanup
+        if close is None:
+            return
+        try:
+            close()
+        except Exception as e:
+            self.logger.warning(f"Failed to close {system} resource for {env}: {e}")
+
+    def _digest(self, identity: Any, options: Dict[str, Any]) -> str:
+        payload = json.dumps([identity, options], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
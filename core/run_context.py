@@ -0,0 +1,53 @@
+import copy
+from pathlib import Path
+
+from .artifact_store import ArtifactStore
+from .checkpoint import CheckpointStore
+from .profiler import RunProfiler
+from .resources import ResourceContext
+
+
+class RunContext:
+    """State shared by all tasks of a single suite run
+
+    Tasks receive it as an optional third argument to execute() and must
+    keep working without it when called directly.
+    """
+
+    def __init__(self, env: str, artifacts: ArtifactStore = None, refresh: bool = False,
+                 profiler: RunProfiler = None, resources: ResourceContext = None,
+                 output_subdir: str = None, checkpoints: CheckpointStore = None, sampling=None):
+        self.env = env
+        self.output_subdir = output_subdir  # Keeps concurrent runs of the same suite apart
+        self.checkpoints = checkpoints  # Set when the run records progress for --resume
+        self.sampling = sampling  # SamplingHelper when the suite validates a subset of trades
+        self.refresh = refresh  # Bypass persistent caches for this run
+        self.artifacts = artifacts if artifacts is not None else ArtifactStore()
+        self.profiler = profiler if profiler is not None else RunProfiler()
+        self.resources = resources if resources is not None else ResourceContext()  # Closed by the orchestrator
+        self.task_id = None
+        self.stages = self.profiler.stages('suite')
+
+    def output_path(self, path: str) -> str:
+        """Where a task should write path in this run (inside output_subdir, if set)"""
+        if not self.output_subdir:
+            return path
+        path = Path(path)
+        return str(path.parent / self.output_subdir / path.name)
+
+    def input_path(self, path: str) -> str:
+        """Where a task should read path in this run
+
+        Files written by this run's tasks live inside output_subdir, so a
+        source that another task produced (e.g. the CDW extraction read by
+        the validations) is read from there; any other input is read as is.
+        """
+        redirected = self.output_path(path)
+        return redirected if redirected != path and Path(redirected).exists() else path
+
+    def for_task(self, task_id: str) -> 'RunContext':
+        """View of this context for one task, with its own stage recorder"""
+        task_context = copy.copy(self)
+        task_context.task_id = task_id
+        task_context.stages = self.profiler.stages(task_id)
+        return task_context
\ No newline at end of file
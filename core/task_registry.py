@@ -1,33 +1,144 @@
 import importlib
-from typing import Dict, Any, Callable
+import inspect
+import logging
+import threading
+from typing import Dict, Any, Callable, List, Optional, Union
+
+# Built-in tasks, resolved from their import path on first use
+BUILTIN_TASKS = {
+    'files_in_folder_task': 'tasks.files_in_folder_task.execute',
+    'cdw_extraction_task': 'tasks.cdw_extraction_task.execute',
+    'sql_validation_task': 'tasks.sql_validation_task.execute',
+    'mongo_validation_task': 'tasks.mongo_validation_task.execute'
+}
+
+# Installed packages can contribute tasks through this entry-point group, e.g.
+#   [project.entry-points."risk_automation.tasks"]
+#   my_task = "my_package.my_task:execute"
+# The target is called as execute(config, env) and must return a result
+# dict with a 'status'. Tasks that want the suite's RunContext (artifacts,
+# shared resources, stage timings) declare a third positional parameter or
+# a 'context' keyword, e.g. execute(config, env, context=None); it is only
+# passed to tasks whose signature accepts it.
+ENTRY_POINT_GROUP = 'risk_automation.tasks'
 
 class TaskRegistry:
     def __init__(self):
         self.tasks: Dict[str, Callable] = {}
+        self._context_modes: Dict[str, Optional[str]] = {}  # How each resolved task takes the context
+        self._task_sources: Dict[str, Any] = {}
+        self._plugins_discovered = False
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
         self._register_tasks()
     
     def _register_tasks(self):
-        """Register all available tasks"""
-        task_mappings = {
-            'files_in_folder_task': 'tasks.files_in_folder_task.execute',
-            'cdw_extraction_task': 'tasks.cdw_extraction_task.execute',
-            'sql_validation_task': 'tasks.sql_validation_task.execute',
-            'mongo_validation_task': 'tasks.mongo_validation_task.execute'
-        }
+        """Register all available tasks
+
+        Only import paths are recorded here; task modules (and the drivers
+        they pull in) are imported when a task is first executed, so one
+        broken driver only fails the tasks that need it.
+        """
+        self._task_sources.update(BUILTIN_TASKS)
+    
+    def _discover_plugins(self):
+        """Register tasks advertised by installed packages (built-ins take precedence)"""
+        if self._plugins_discovered:
+            return
+        self._plugins_discovered = True
+        
+        try:
+            # Imported here: importlib.metadata is comparatively slow to load
+            from importlib import metadata
+            entry_points = metadata.entry_points(group=ENTRY_POINT_GROUP)
+        except Exception as e:
+            self.logger.warning(f"Task plugin discovery failed: {e}")
+            return
         
-        for task_name, import_path in task_mappings.items():
+        for entry_point in entry_points:
+            self._task_sources.setdefault(entry_point.name, entry_point)
+    
+    def register(self, task_name: str, task: Union[str, Callable]):
+        """Register a task from a callable or a 'module.function' import path"""
+        with self._lock:
+            self.tasks.pop(task_name, None)
+            self._context_modes.pop(task_name, None)
+            if callable(task):
+                self.tasks[task_name] = task
+            self._task_sources[task_name] = task
+    
+    def is_registered(self, task_name: str) -> bool:
+        with self._lock:
+            if task_name not in self._task_sources:
+                self._discover_plugins()
+            return task_name in self._task_sources
+    
+    def available_tasks(self) -> List[str]:
+        with self._lock:
+            self._discover_plugins()
+            return sorted(self._task_sources)
+    
+    def get_task(self, task_name: str) -> Callable:
+        """Resolve (importing on first use) the execute function of a task"""
+        with self._lock:
+            if task_name in self.tasks:
+                return self.tasks[task_name]
+            
+            if task_name not in self._task_sources:
+                self._discover_plugins()
+            if task_name not in self._task_sources:
+                raise ValueError(f"Task not registered: {task_name}")
+            
+            source = self._task_sources[task_name]
             try:
-                module_path, function_name = import_path.rsplit('.', 1)
-                module = importlib.import_module(module_path)
-                task_function = getattr(module, function_name)
-                self.tasks[task_name] = task_function
+                if isinstance(source, str):
+                    module_path, function_name = source.rsplit('.', 1)
+                    module = importlib.import_module(module_path)
+                    task_function = getattr(module, function_name)
+                elif callable(source):
+                    task_function = source
+                else:  # importlib.metadata.EntryPoint
+                    task_function = source.load()
             except (ImportError, AttributeError) as e:
-                raise ImportError(f"Failed to register task {task_name}: {e}")
+                raise ImportError(f"Failed to load task {task_name}: {e}")
+            
+            self.tasks[task_name] = task_function
+            return task_function
     
-    def execute_task(self, task_name: str, config: Dict[str, Any], env: str) -> Dict[str, Any]:
-        """Execute a registered task"""
-        if task_name not in self.tasks:
-            raise ValueError(f"Task not registered: {task_name}")
+    def _context_mode(self, task_name: str, task_function: Callable) -> Optional[str]:
+        """'positional' or 'keyword' if the task accepts the run context, else None (checked once per task)"""
+        with self._lock:
+            if task_name in self._context_modes:
+                return self._context_modes[task_name]
         
-        task_function = self.tasks[task_name]
+        try:
+            parameters = list(inspect.signature(task_function).parameters.values())
+        except (TypeError, ValueError):  # No introspectable signature: assume the baseline one
+            parameters = []
+        positional = [p for p in parameters if p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD)]
+        if len(positional) >= 3 or any(p.kind == p.VAR_POSITIONAL for p in parameters):
+            mode = 'positional'
+        elif any(p.name == 'context' or p.kind == p.VAR_KEYWORD for p in parameters):
+            mode = 'keyword'
+        else:
+            mode = None
+            self.logger.info(f"Task {task_name} does not accept a run context; calling it as execute(config, env)")
+        
+        with self._lock:
+            self._context_modes[task_name] = mode
+        return mode
+    
+    def execute_task(self, task_name: str, config: Dict[str, Any], env: str, context=None) -> Dict[str, Any]:
+        """Execute a registered task
+
+        When a run context is given it is passed to tasks whose signature
+        accepts it (see ENTRY_POINT_GROUP), so they can exchange artifacts
+        through it; tasks written as execute(config, env) still run.
+        """
+        task_function = self.get_task(task_name)
+        mode = self._context_mode(task_name, task_function) if context is not None else None
+        if mode == 'positional':
+            return task_function(config, env, context)
+        if mode == 'keyword':
+            return task_function(config, env, context=context)
         return task_function(config, env)
\ No newline at end of file
@@ -1,33 +1,142 @@
 import requests
 import pandas as pd
 import xml.etree.ElementTree as ET
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterator, List, Optional, Tuple, Union, IO
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from libs.ColumnarFrameBuilder import ColumnarFrameBuilder
+from libs.StageRecorder import StageRecorder
 import logging
+import threading
+import time
 import urllib3
 
 # Disable SSL warnings for internal systems
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# Statuses worth retrying: throttling and transient server-side failures
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Statuses meaning the batch endpoint does not exist here; fall back to per-trade calls
+BATCH_UNAVAILABLE_STATUSES = (404, 405, 501)
+
+
+class BatchEndpointUnavailable(Exception):
+    """Raised when the CDW deployment does not offer the multi-trade endpoint"""
+
+
+class TimedReader:
+    """File-like wrapper of a response body that accumulates the time spent in read()"""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+
+    def read(self, size: int = -1) -> bytes:
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        data = self.raw.read(size)
+        self.wall_seconds += time.perf_counter() - wall_start
+        self.cpu_seconds += time.thread_time() - cpu_start
+        return data
+
+
+class HostRateLimiter:
+    """Spread requests so that each host sees at most N requests per second"""
+
+    def __init__(self, requests_per_second: Optional[float] = None):
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self._next_slot: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, host: str):
+        """Block until the next request slot for host is available"""
+        if not self.interval:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+def create_session(credentials: Dict[str, str], max_workers: int = 1, max_retries: int = 0,
+                   backoff_factor: float = 0.5) -> requests.Session:
+    """HTTP session with CDW authentication, a pool sized for max_workers and retries on 429/5xx"""
+    session = requests.Session()
+    session.verify = False  # Handle SSL errors
+    
+    # Setup authentication
+    # Implement your authentication logic here
+    # This could be basic auth, token-based, etc.
+    if 'username' in credentials and 'password' in credentials:
+        session.auth = (
+            credentials['username'], 
+            credentials['password']
+        )
+    
+    retry = Retry(
+        total=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(['GET']),
+        respect_retry_after_header=True,
+        raise_on_status=False  # Let raise_for_status report the final response
+    )
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=max(max_workers, 10),
+        max_retries=retry
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
 class CDWHelper:
-    def __init__(self, base_url: str, credentials: Dict[str, str]):
+    def __init__(self, base_url: str, credentials: Dict[str, str],
+                 max_workers: int = 1, requests_per_second: Optional[float] = None,
+                 max_retries: int = 0, backoff_factor: float = 0.5,
+                 cache=None, env: str = '', refresh: bool = False, stages: StageRecorder = None,
+                 batch_path: Optional[str] = None, batch_size: int = 100, batch_id_attribute: str = 'id',
+                 session: Optional[requests.Session] = None, rate_limiter: Optional[HostRateLimiter] = None,
+                 typed_columns: bool = True, frame_batch_size: int = 2000):
         self.base_url = base_url
         self.credentials = credentials
-        self.session = requests.Session()
-        self.session.verify = False  # Handle SSL errors
+        self.max_workers = max(1, int(max_workers))
+        # Pass a shared limiter so several helpers respect one per-host budget
+        self.rate_limiter = rate_limiter if rate_limiter is not None else HostRateLimiter(requests_per_second)
+        self.cache = cache  # Optional CDWResponseCache
+        self.env = env
+        self.refresh = refresh  # Ignore cached entries, but still refresh them
+        self.stages = stages if stages is not None else StageRecorder()
+        # Multi-trade endpoint, e.g. '/trades' -> {base_url}/trades?on=<date>&ids=<id,id,...>
+        self.batch_path = batch_path
+        self.batch_size = max(1, int(batch_size))
+        self.batch_id_attribute = batch_id_attribute
+        self._batch_available = True
+        # Build the result with inferred numeric/date/categorical dtypes instead of all-text columns
+        self.typed_columns = typed_columns
+        self.frame_batch_size = frame_batch_size
         self.logger = logging.getLogger(__name__)
         
-        # Setup authentication
-        self._setup_auth()
+        # An injected session belongs to the caller (e.g. the suite's ResourceContext)
+        self._owns_session = session is None
+        self.session = session if session is not None else create_session(
+            credentials, self.max_workers, max_retries, backoff_factor
+        )
     
-    def _setup_auth(self):
-        """Setup authentication for CDW API"""
-        # Implement your authentication logic here
-        # This could be basic auth, token-based, etc.
-        if 'username' in self.credentials and 'password' in self.credentials:
-            self.session.auth = (
-                self.credentials['username'], 
-                self.credentials['password']
-            )
+    def close(self):
+        """Close the HTTP session if this helper created it"""
+        if self._owns_session:
+            self.session.close()
     
     def flatten_xml(self, element: ET.Element, path: str = '', separator: str = '_') -> Dict[str, str]:
         """Recursively flatten XML structure"""
@@ -55,50 +164,334 @@ class CDWHelper:
         
         return flattened
     
+    def flatten_xml_stream(self, source: Union[str, IO[bytes]], separator: str = '_') -> Dict[str, str]:
+        """Flatten XML incrementally with iterparse into a single dict
+
+        Produces the same keys, values and key order as flatten_xml, but
+        without building the whole tree or recursing, so very large or deeply
+        nested payloads stay within bounded memory and stack depth.
+        """
+        for _, flattened in self.iter_flatten_xml(source, record_depth=0, separator=separator):
+            return flattened
+        return {}
+    
+    def iter_flatten_xml(self, source: Union[str, IO[bytes]], record_depth: int = 0,
+                         separator: str = '_') -> Iterator[Tuple[Dict[str, str], Dict[str, str]]]:
+        """Yield (attributes, flattened) for every element at record_depth
+
+        Each record is flattened exactly as flatten_xml would flatten it as a
+        document root, so depth 0 covers a single-trade response and depth 1
+        the <trade> children of a batch response. Finished elements are
+        discarded as parsing goes, keeping memory bounded by one record.
+        """
+        flattened = None
+        attributes = None
+        keys = []        # Flattened key of every open element inside the record
+        reserved = []    # Whether that element reserved its text slot
+        open_elements = []
+        
+        for event, element in ET.iterparse(source, events=('start', 'end')):
+            if event == 'start':
+                depth = len(open_elements)
+                open_elements.append(element)
+                if depth < record_depth:
+                    continue
+                if depth == record_depth:
+                    flattened = {}
+                    attributes = dict(element.attrib)
+                
+                key = keys[-1] + separator + element.tag if keys else element.tag
+                keys.append(key)
+                
+                # Text is only known at 'end'; reserve its slot now so keys keep
+                # the recursive order of text, attributes, then children
+                reserve = key not in flattened
+                if reserve:
+                    flattened[key] = None
+                reserved.append(reserve)
+                
+                for attr, value in element.attrib.items():
+                    flattened[key + separator + attr] = value
+            else:
+                open_elements.pop()
+                depth = len(open_elements)
+                if depth >= record_depth:
+                    key = keys.pop()
+                    reserve = reserved.pop()
+                    if element.text and element.text.strip():
+                        flattened[key] = element.text.strip()
+                    elif reserve:
+                        del flattened[key]
+                
+                # Drop the finished subtree so memory does not grow with the document
+                element.clear()
+                if open_elements:
+                    open_elements[-1].remove(element)
+                
+                if depth == record_depth:
+                    yield attributes, flattened
+    
     def fetch_trade_data(self, trade_id: str, trade_date: str) -> Dict[str, Any]:
-        """Fetch trade data from CDW API"""
+        """Fetch trade data from CDW API, serving and revalidating cached records"""
         try:
-            url = f"{self.base_url}/trade/{trade_id}?on={trade_date}"
-            response = self.session.get(url)
+            cached = None
+            if self.cache is not None and not self.refresh:
+                with self.stages.stage('cache_lookup'):
+                    cached = self.cache.get(self.env, trade_id, trade_date)
+                if cached is not None and cached['fresh']:
+                    self.cache.record_stat('hits')
+                    return self._cached_record(cached, trade_id, trade_date)
             
-            if response.status_code == 401:
-                raise Exception("Authentication failed - check credentials")
-            response.raise_for_status()
+            # Stale entries are revalidated with a conditional request
+            headers = {}
+            if cached is not None:
+                if cached['etag']:
+                    headers['If-None-Match'] = cached['etag']
+                if cached['last_modified']:
+                    headers['If-Modified-Since'] = cached['last_modified']
             
-            # Parse XML response
-            root = ET.fromstring(response.content)
+            url = f"{self.base_url}/trade/{trade_id}?on={trade_date}"
+            with self.stages.stage('rate_limit_wait'):
+                self.rate_limiter.acquire(urlparse(url).netloc)
+            # Returns once the headers are in; the body is read while parsing
+            with self.stages.stage('http_fetch'):
+                response = self.session.get(url, stream=True, headers=headers)
+            with response:
+                if response.status_code == 304 and cached is not None:
+                    self.cache.touch(self.env, trade_id, trade_date)
+                    self.cache.record_stat('revalidated')
+                    return self._cached_record(cached, trade_id, trade_date)
+                
+                if response.status_code == 401:
+                    raise Exception("Authentication failed - check credentials")
+                response.raise_for_status()
+                
+                # Stream-parse and flatten the XML response as it arrives
+                flattened_data = self._parse_body(response, self.flatten_xml_stream)
+                validators = (response.headers.get('ETag'), response.headers.get('Last-Modified'))
             
-            # Flatten the entire XML structure
-            flattened_data = self.flatten_xml(root)
             flattened_data['trade_id'] = trade_id
             flattened_data['trade_date'] = trade_date
             
+            if self.cache is not None:
+                self.cache.record_stat('misses')
+                self.cache.put(self.env, trade_id, trade_date, flattened_data, *validators)
+            
             return flattened_data
             
         except Exception as e:
             self.logger.error(f"Failed to fetch trade {trade_id}: {e}")
             raise
     
-    def extract_all_trades(self, trades_config: List[Dict]) -> pd.DataFrame:
-        """Extract data for all trades and return as DataFrame"""
-        all_trades_data = []
+    def _parse_body(self, response: requests.Response, parse):
+        """parse(body) over the streamed response body
+
+        Waiting for body bytes is booked under http_download and the rest
+        under xml_flatten, so slow networks are not blamed on parsing.
+        """
+        response.raw.decode_content = True
+        body = TimedReader(response.raw)
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            return parse(body)
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.thread_time() - cpu_start
+            self.stages.record('http_download', body.wall_seconds, body.cpu_seconds)
+            self.stages.record('xml_flatten', max(0.0, wall - body.wall_seconds), max(0.0, cpu - body.cpu_seconds))
+    
+    @staticmethod
+    def _cached_record(cached: Dict[str, Any], trade_id, trade_date) -> Dict[str, Any]:
+        """Cached record carrying the caller's id/date values rather than their JSON round-trip"""
+        record = cached['record']
+        record['trade_id'] = trade_id
+        record['trade_date'] = trade_date
+        return record
+    
+    def _fetch_trade_record(self, trade_config: Dict) -> Dict[str, Any]:
+        """Fetch a single trade, turning failures into an error record"""
+        try:
+            return self.fetch_trade_data(
+                trade_config['trade_id'],
+                trade_config['trade_date']
+            )
+            
+        except Exception as e:
+            self.logger.warning(f"Skipping trade {trade_config['trade_id']}: {e}")
+            # Add error record
+            return {
+                'trade_id': trade_config['trade_id'],
+                'trade_date': trade_config['trade_date'],
+                'error': str(e)
+            }
+    
+    def fetch_trade_batch(self, trade_date, trade_ids: List) -> Dict[Any, Dict[str, Any]]:
+        """Fetch several trades of one date from the batch endpoint
+
+        Returns the flattened record of every requested trade found in the
+        response; trades the response leaves out are simply absent.
+        """
+        ids = ','.join(str(trade_id) for trade_id in trade_ids)
+        url = f"{self.base_url}{self.batch_path}?on={trade_date}&ids={ids}"
+        with self.stages.stage('rate_limit_wait'):
+            self.rate_limiter.acquire(urlparse(url).netloc)
+        with self.stages.stage('http_fetch'):
+            response = self.session.get(url, stream=True)
+        with response:
+            if response.status_code in BATCH_UNAVAILABLE_STATUSES:
+                raise BatchEndpointUnavailable(f"Batch endpoint returned {response.status_code}")
+            if response.status_code == 401:
+                raise Exception("Authentication failed - check credentials")
+            response.raise_for_status()
+            
+            requested = {str(trade_id): trade_id for trade_id in trade_ids}
+            
+            def parse(body):
+                records = {}
+                for attributes, flattened in self.iter_flatten_xml(body, record_depth=1):
+                    trade_id = requested.get(attributes.get(self.batch_id_attribute))
+                    if trade_id is None:
+                        continue
+                    flattened['trade_id'] = trade_id
+                    flattened['trade_date'] = trade_date
+                    records[trade_id] = flattened
+                return records
+            
+            records = self._parse_body(response, parse)
         
-        for trade_config in trades_config:
-            try:
-                trade_data = self.fetch_trade_data(
-                    trade_config['trade_id'],
-                    trade_config['trade_date']
-                )
-                all_trades_data.append(trade_data)
+        if self.cache is not None:
+            for trade_id, record in records.items():
+                self.cache.record_stat('misses')
+                self.cache.put(self.env, trade_id, trade_date, record)
+        return records
+    
+    def _fetch_batch_records(self, batch: Tuple[Any, List]) -> Dict[Tuple, Dict[str, Any]]:
+        """Fetch one (trade_date, trade_ids) batch; failed batches return nothing"""
+        trade_date, trade_ids = batch
+        if not self._batch_available:
+            return {}
+        try:
+            records = self.fetch_trade_batch(trade_date, trade_ids)
+        except BatchEndpointUnavailable as e:
+            if self._batch_available:
+                self._batch_available = False
+                self.logger.warning(f"CDW batch endpoint unavailable, using per-trade requests: {e}")
+            return {}
+        except Exception as e:
+            self.logger.warning(f"Batch of {len(trade_ids)} trades on {trade_date} failed, retrying per trade: {e}")
+            return {}
+        return {(trade_id, trade_date): record for trade_id, record in records.items()}
+    
+    def _batched(self, keys: List[Tuple]) -> List[Tuple[Any, List]]:
+        """Group (trade_id, trade_date) keys by date into batch_size slices"""
+        by_date: Dict[Any, List] = {}
+        for trade_id, trade_date in keys:
+            by_date.setdefault(trade_date, []).append(trade_id)
+        return [
+            (trade_date, trade_ids[start:start + self.batch_size])
+            for trade_date, trade_ids in by_date.items()
+            for start in range(0, len(trade_ids), self.batch_size)
+        ]
+    
+    def _imap(self, func, items: List) -> Iterator:
+        """Apply func to items (concurrently with max_workers > 1), yielding results in input order"""
+        if self.max_workers == 1 or len(items) < 2:
+            for item in items:
+                yield func(item)
+            return
+        # executor.map yields in submission order, so results keep the input order
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            yield from executor.map(func, items)
+    
+    def extract_all_trades(self, trades_config: List[Dict], checkpoint=None) -> pd.DataFrame:
+        """Extract data for all trades and return as DataFrame
+
+        Repeated (trade_id, trade_date) pairs are fetched once. With a
+        batch_path configured, trades are requested per date in batches of
+        batch_size; anything the batch endpoint does not return is fetched
+        individually. With a checkpoint (see core.checkpoint.TradeCheckpoint),
+        trades saved by an interrupted attempt are reused and every newly
+        fetched trade is saved as soon as it arrives.
+        
+        Records are handed to a ColumnarFrameBuilder as soon as every trade
+        before them has arrived, so the raw dicts do not outlive their batch.
+        """
+        keys = [(trade['trade_id'], trade['trade_date']) for trade in trades_config]
+        unique_keys = list(dict.fromkeys(keys))
+        if len(unique_keys) < len(keys):
+            self.logger.info(f"Collapsed {len(keys) - len(unique_keys)} duplicate trade requests")
+        
+        records = {}
+        builder = ColumnarFrameBuilder(self.frame_batch_size, infer_types=self.typed_columns)
+        next_row = 0
+        
+        def drain():
+            # Move the completed prefix of unique_keys into the builder
+            nonlocal next_row
+            while next_row < len(unique_keys) and unique_keys[next_row] in records:
+                builder.append(records.pop(unique_keys[next_row]))
+                next_row += 1
+        
+        if checkpoint is not None:
+            saved = checkpoint.load()
+            for key in unique_keys:
+                record = saved.get((str(key[0]), str(key[1])))
+                if record is not None:
+                    # Keep the input's own id/date values rather than their JSON round-trip
+                    record['trade_id'], record['trade_date'] = key
+                    records[key] = record
+            if records:
+                self.logger.info(f"Resuming with {len(records)} trades from checkpoint")
+        
+        try:
+            if self.batch_path:
+                pending = [key for key in unique_keys if key not in records]
+                if self.cache is not None and not self.refresh:
+                    uncached = []
+                    for key in pending:
+                        with self.stages.stage('cache_lookup'):
+                            cached = self.cache.get(self.env, *key)
+                        if cached is not None and cached['fresh']:
+                            self.cache.record_stat('hits')
+                            records[key] = self._cached_record(cached, *key)
+                        else:
+                            uncached.append(key)
+                    pending = uncached
                 
-            except Exception as e:
-                self.logger.warning(f"Skipping trade {trade_config['trade_id']}: {e}")
-                # Add error record
-                error_record = {
-                    'trade_id': trade_config['trade_id'],
-                    'trade_date': trade_config['trade_date'],
-                    'error': str(e)
-                }
-                all_trades_data.append(error_record)
+                for batch_records in self._imap(self._fetch_batch_records, self._batched(pending)):
+                    records.update(batch_records)
+                    if checkpoint is not None:
+                        for key, record in batch_records.items():
+                            checkpoint.save(key, record)
+                    drain()
+            
+            drain()
+            remaining = [key for key in unique_keys[next_row:] if key not in records]
+            if self.batch_path and remaining:
+                self.logger.info(f"Fetching {len(remaining)} trades individually")
+            fetched = self._imap(
+                self._fetch_trade_record,
+                [{'trade_id': trade_id, 'trade_date': trade_date} for trade_id, trade_date in remaining]
+            )
+            for key, record in zip(remaining, fetched):
+                records[key] = record
+                # Failed trades are not checkpointed, so a resumed run retries them
+                if checkpoint is not None and 'error' not in record:
+                    checkpoint.save(key, record)
+                drain()
+        finally:
+            if checkpoint is not None:
+                checkpoint.flush()
+        
+        if self.cache is not None:
+            self.logger.info(f"CDW response cache: {self.cache.stats}")
+        
+        with self.stages.stage('frame_build'):
+            frame = builder.build()
         
-        return pd.DataFrame(all_trades_data)
\ No newline at end of file
+        # One row per input trade, duplicates included
+        if len(unique_keys) < len(keys):
+            positions = {key: i for i, key in enumerate(unique_keys)}
+            frame = frame.iloc[[positions[key] for key in keys]].reset_index(drop=True)
+        return frame
\ No newline at end of file
@@ -0,0 +1,174 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+# Cache hits whose access time is buffered before it is written back in one statement
+ACCESS_FLUSH_EVERY = 1000
+
+
+def cache_key(env: str, trade_id, trade_date) -> Tuple[str, str, str]:
+    """Key of a trade, the same whether its date arrives as a Timestamp or as text"""
+    if isinstance(trade_id, float) and trade_id.is_integer():
+        trade_id = int(trade_id)
+    if isinstance(trade_date, datetime):  # Includes pandas Timestamps
+        has_time = (trade_date.hour, trade_date.minute, trade_date.second, trade_date.microsecond) != (0, 0, 0, 0)
+        trade_date = trade_date.isoformat() if has_time else trade_date.strftime('%Y-%m-%d')
+    elif isinstance(trade_date, date):
+        trade_date = trade_date.isoformat()
+    else:
+        trade_date = str(trade_date).strip()
+        if trade_date.endswith((' 00:00:00', 'T00:00:00')):
+            trade_date = trade_date[:-9]
+    return env, str(trade_id), trade_date
+
+
+class CDWResponseCache:
+    """Persistent SQLite cache of flattened CDW trade records
+
+    Entries are keyed by (env, trade_id, trade_date). Entries younger than
+    ttl_seconds are served directly; older ones keep their ETag/Last-Modified
+    validators so the caller can revalidate them with a conditional request.
+    The cache is trimmed to max_size_mb by evicting least recently used rows.
+    Access times of hits are buffered in memory and written back in batches
+    (on put, touch, close or every ACCESS_FLUSH_EVERY hits), so a warm run
+    does not pay a commit per trade.
+    """
+
+    def __init__(self, path: str, ttl_seconds: Optional[float] = 86400, max_size_mb: Optional[float] = 512):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = int(max_size_mb * 2**20) if max_size_mb else None
+        self.logger = logging.getLogger(__name__)
+        self.stats = {'hits': 0, 'revalidated': 0, 'misses': 0, 'evicted': 0}
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._accessed: Dict[Tuple[str, str, str], float] = {}
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                env TEXT NOT NULL,
+                trade_id TEXT NOT NULL,
+                trade_date TEXT NOT NULL,
+                record TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL,
+                PRIMARY KEY (env, trade_id, trade_date)
+            )
+        """)
+        self._conn.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)')
+        self._conn.commit()
+        self._total_bytes = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+    def get(self, env: str, trade_id, trade_date) -> Optional[Dict[str, Any]]:
+        """Return the cached entry (record, validators and freshness) or None"""
+        key = cache_key(env, trade_id, trade_date)
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT record, etag, last_modified, fetched_at FROM responses '
+                'WHERE env = ? AND trade_id = ? AND trade_date = ?', key
+            ).fetchone()
+            if row is None:
+                return None
+            self._accessed[key] = time.time()
+            if len(self._accessed) >= ACCESS_FLUSH_EVERY:
+                self._flush_accessed_locked()
+                self._conn.commit()
+
+        record, etag, last_modified, fetched_at = row
+        fresh = self.ttl_seconds is None or time.time() - fetched_at < self.ttl_seconds
+        return {
+            'record': json.loads(record),
+            'etag': etag,
+            'last_modified': last_modified,
+            'fresh': fresh
+        }
+
+    def put(self, env: str, trade_id, trade_date, record: Dict[str, Any],
+            etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """Store or replace the record for a trade"""
+        key = cache_key(env, trade_id, trade_date)
+        payload = json.dumps(record, default=str)
+        now = time.time()
+        with self._lock:
+            self._accessed.pop(key, None)
+            self._flush_accessed_locked()
+            previous = self._conn.execute(
+                'SELECT size FROM responses WHERE env = ? AND trade_id = ? AND trade_date = ?', key
+            ).fetchone()
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses '
+                '(env, trade_id, trade_date, record, etag, last_modified, fetched_at, accessed_at, size) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                key + (payload, etag, last_modified, now, now, len(payload))
+            )
+            self._total_bytes += len(payload) - (previous[0] if previous else 0)
+            self._evict_locked()
+            self._conn.commit()
+
+    def touch(self, env: str, trade_id, trade_date):
+        """Mark an entry as freshly validated (e.g. after a 304 Not Modified)"""
+        key = cache_key(env, trade_id, trade_date)
+        now = time.time()
+        with self._lock:
+            self._accessed.pop(key, None)
+            self._flush_accessed_locked()
+            self._conn.execute(
+                'UPDATE responses SET fetched_at = ?, accessed_at = ? '
+                'WHERE env = ? AND trade_id = ? AND trade_date = ?',
+                (now, now) + key
+            )
+            self._conn.commit()
+
+    def record_stat(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _flush_accessed_locked(self):
+        """Write buffered access times back (the caller commits)"""
+        if not self._accessed:
+            return
+        accessed, self._accessed = self._accessed, {}
+        self._conn.executemany(
+            'UPDATE responses SET accessed_at = ? WHERE env = ? AND trade_id = ? AND trade_date = ?',
+            [(accessed_at,) + key for key, accessed_at in accessed.items()]
+        )
+
+    def _evict_locked(self):
+        """Drop least recently used entries until the cache fits max_bytes"""
+        if self.max_bytes is None or self._total_bytes <= self.max_bytes:
+            return
+
+        # Trim to 90% so eviction does not run again on the very next insert
+        target = int(self.max_bytes * 0.9)
+        rows = self._conn.execute(
+            'SELECT env, trade_id, trade_date, size FROM responses ORDER BY accessed_at'
+        )
+        victims = []
+        for env, trade_id, trade_date, size in rows:
+            if self._total_bytes <= target:
+                break
+            victims.append((env, trade_id, trade_date))
+            self._total_bytes -= size
+        rows.close()
+        self._conn.executemany(
+            'DELETE FROM responses WHERE env = ? AND trade_id = ? AND trade_date = ?', victims
+        )
+        self.stats['evicted'] += len(victims)
+        self.logger.info(f"Evicted {len(victims)} cached CDW responses")
+
+    def close(self):
+        with self._lock:
+            self._flush_accessed_locked()
+            self._conn.commit()
+            self._conn.close()
@@ -0,0 +1,211 @@
+import logging
+import re
+import sys
+from typing import Dict, Any, Iterable, List
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# Text patterns accepted for conversion. Leading zeros are kept as text so
+# identifiers like "007" survive, and integers stay within float precision.
+INT_PATTERN = re.compile(r'-?(?:0|[1-9]\d{0,14})')
+FLOAT_PATTERN = re.compile(r'-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][-+]?\d+)?')
+DATETIME_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d{1,9})?)?)?')
+
+NUMERIC_KINDS = ('int', 'float')
+
+
+class ColumnarFrameBuilder:
+    """Build a typed DataFrame from a stream of flat records with bounded overhead
+
+    Records are collected in batches of batch_size and each full batch is
+    turned into columns by pandas and converted straight away: text that is
+    entirely integers, decimals or ISO dates becomes int64/float64/datetime64,
+    and repetitive text becomes a categorical, so only one batch of raw
+    Python strings is alive at a time. Column names are interned, and build()
+    concatenates the typed chunks, reconciling columns whose type differs
+    between batches (e.g. int and float become float; numbers and text
+    become text). A typed batch only keeps the few strings that its typed
+    values do not render back to (e.g. "1.50"), so a column demoted to text
+    still holds exactly the values that were extracted.
+
+    passthrough columns (by default the trade keys and error message) are
+    left to pandas' own inference, exactly as pd.DataFrame(records) would.
+    """
+
+    def __init__(self, batch_size: int = 2000, passthrough: Iterable[str] = ('trade_id', 'trade_date', 'error'),
+                 infer_types: bool = True, category_max_unique: int = 1000, category_max_ratio: float = 0.5):
+        self.batch_size = max(1, int(batch_size))
+        self.passthrough = set(passthrough)
+        self.infer_types = infer_types
+        self.category_max_unique = category_max_unique
+        self.category_max_ratio = category_max_ratio
+        self.logger = logging.getLogger(__name__)
+
+        self._columns: Dict[str, int] = {}          # Interned name -> position of first appearance
+        self._chunks: Dict[str, List[tuple]] = {}   # Name -> [(batch number, kind, values, text)]
+        self._batch_lengths: List[int] = []
+        self._pending: List[Dict[str, Any]] = []
+
+    def __len__(self) -> int:
+        return sum(self._batch_lengths) + len(self._pending)
+
+    def append(self, record: Dict[str, Any]):
+        """Add one record; keys not seen before become new columns"""
+        self._pending.append(record)
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+
+    def extend(self, records: Iterable[Dict[str, Any]]):
+        for record in records:
+            self.append(record)
+
+    def build(self) -> pd.DataFrame:
+        """Concatenate all batches into the final frame"""
+        self._flush()
+        columns = {name: self._assemble(name) for name in self._columns}
+        return pd.DataFrame(columns, index=pd.RangeIndex(sum(self._batch_lengths)), copy=False)
+
+    def _flush(self):
+        if not self._pending:
+            return
+        batch = len(self._batch_lengths)
+        # pandas lays the batch out column-wise, in order of first appearance and
+        # padding absent keys, without a Python-level pass per value
+        frame = pd.DataFrame(self._pending, dtype=object)
+        for name in frame.columns:
+            if name not in self._columns:
+                self._columns[sys.intern(name) if isinstance(name, str) else name] = len(self._columns)
+            kind, converted, text = self._convert(name, frame[name].to_numpy())
+            if kind is not None:
+                self._chunks.setdefault(name, []).append((batch, kind, converted, text))
+        self._batch_lengths.append(len(self._pending))
+        self._pending = []
+
+    def _convert(self, name, values: np.ndarray):
+        """Infer the kind of one column batch and convert it; (None, None, None) if it is all null
+
+        Patterns are checked and text is converted on the distinct values
+        only, then mapped back to the rows through their codes. Typed batches
+        also return what re-rendering them as text needs: how to render, and
+        the positions and strings that do not render back.
+        """
+        if name in self.passthrough or not self.infer_types:
+            return 'passthrough', pd.Series(values.tolist()), None
+
+        codes, distinct = pd.factorize(values)
+        if not len(distinct):
+            return None, None, None
+        # Pattern checks stop at the first miss
+        if not all(isinstance(value, str) for value in distinct):
+            return 'passthrough', pd.Series(values.tolist()), None
+
+        typed = None
+        if all(INT_PATTERN.fullmatch(value) for value in distinct):
+            render, typed = 'int', pd.to_numeric(distinct).astype('int64')
+        elif all(FLOAT_PATTERN.fullmatch(value) for value in distinct):
+            render, typed = 'float', pd.to_numeric(distinct).astype('float64')
+        elif all(DATETIME_PATTERN.fullmatch(value) for value in distinct):
+            dates = pd.to_datetime(pd.Series(distinct), format='ISO8601', errors='coerce')
+            if not dates.isna().any():
+                render, typed = 'datetime', dates.to_numpy()
+
+        if typed is not None:
+            complete = (codes >= 0).all()
+            if not complete:
+                # Code -1 (null) picks the appended NaN/NaT
+                null = np.datetime64('NaT') if render == 'datetime' else np.nan
+                typed = np.append(typed.astype('float64') if render == 'int' else typed, null)
+            kind = 'int' if render == 'int' and complete else 'float' if render != 'datetime' else 'datetime'
+            return kind, pd.Series(typed[codes]), self._text(render, typed, distinct, codes)
+
+        unique = len(distinct)
+        if unique <= self.category_max_unique and unique <= len(values) * self.category_max_ratio:
+            # Sorted categories, as pd.Categorical(values) would have them
+            order = np.argsort(distinct)
+            rank = np.empty(unique + 1, dtype=np.intp)
+            rank[order] = np.arange(unique)
+            rank[-1] = -1
+            return 'category', pd.Series(pd.Categorical.from_codes(rank[codes], distinct[order])), None
+        return 'string', pd.Series(values.tolist()), None
+
+    def _text(self, render: str, typed: np.ndarray, distinct: np.ndarray, codes: np.ndarray) -> tuple:
+        """(render, positions, strings) for the rows whose text the typed values do not render back to"""
+        differs = np.flatnonzero(self._render(render, typed[:len(distinct)]) != distinct)
+        positions = np.flatnonzero(np.isin(codes, differs)) if len(differs) else np.empty(0, dtype=np.intp)
+        return render, positions, distinct[codes[positions]]
+
+    @staticmethod
+    def _render(render: str, typed: np.ndarray) -> np.ndarray:
+        """Deterministic text form of typed values (None for nulls)"""
+        present = ~pd.isna(typed)
+        text = np.full(len(typed), None, dtype=object)
+        values = typed[present]
+        if render == 'datetime':
+            days = values.astype('datetime64[D]')
+            text[present] = np.where(values == days, np.datetime_as_string(days),
+                                     np.datetime_as_string(values.astype('datetime64[s]')))
+        else:
+            text[present] = (values.astype(np.int64) if render == 'int' else values).astype(str)
+        return text
+
+    def _final_kind(self, kinds: set, complete: bool) -> str:
+        if len(kinds) == 1:
+            kind = next(iter(kinds))
+            # Batches without the column are filled with NaN, which int64 cannot hold
+            return 'float' if kind == 'int' and not complete else kind
+        if 'passthrough' in kinds:
+            return 'passthrough'
+        if kinds <= set(NUMERIC_KINDS):
+            return 'float'
+        return 'string'
+
+    def _assemble(self, name) -> pd.Series:
+        chunks = self._chunks.get(name, [])
+        kind = self._final_kind({k for _, k, _, _ in chunks}, len(chunks) == len(self._batch_lengths)) \
+            if chunks else 'passthrough'
+        by_batch = {batch: self._cast(values, kind, text) for batch, _, values, text in chunks}
+        template = next(iter(by_batch.values()), None)
+
+        # One piece per batch, with an all-null piece where the column was absent
+        pieces = []
+        for batch, length in enumerate(self._batch_lengths):
+            piece = by_batch.pop(batch, None)
+            pieces.append(self._null_piece(kind, length, template) if piece is None else piece)
+
+        if kind == 'category':
+            combined = union_categoricals([p.array for p in pieces])
+            if len(combined.categories) <= self.category_max_unique:
+                return pd.Series(combined)
+            pieces = [self._cast(p, 'string', None) for p in pieces]
+        if len(pieces) == 1:
+            return pieces[0].reset_index(drop=True)
+        return pd.concat(pieces, ignore_index=True)
+
+    def _cast(self, values: pd.Series, kind: str, text) -> pd.Series:
+        """Convert a batch to the column's final kind (typed batches demote to their original text)"""
+        if kind == 'float' and values.dtype != 'float64':
+            return values.astype('float64')
+        if kind not in ('string', 'passthrough'):
+            return values
+        if text is not None:
+            render, positions, strings = text
+            rendered = self._render(render, values.to_numpy())
+            rendered[positions] = strings
+            return pd.Series(rendered.tolist())
+        if kind == 'passthrough':
+            return values
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            return pd.Series(values.astype(object).where(values.notna(), None).tolist())
+        return values
+
+    def _null_piece(self, kind: str, length: int, template: pd.Series) -> pd.Series:
+        if kind in NUMERIC_KINDS:
+            return pd.Series(np.full(length, np.nan))
+        if kind == 'category':
+            return pd.Series(pd.Categorical([None] * length, categories=template.cat.categories[:0]))
+        if kind == 'passthrough' and template is not None:
+            # Null padding keeps the dtype pandas gives a column with missing keys (ints become floats)
+            return pd.Series([None] * length, dtype='float64' if template.dtype.kind in 'iub' else template.dtype)
+        return pd.Series([None] * length, dtype=template.dtype if kind in ('datetime', 'string') else object)
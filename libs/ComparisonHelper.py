@@ -0,0 +1,387 @@
+import pandas as pd
+import numpy as np
+import logging
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional
+
+# Row-level issue labels used in mismatch samples
+MISSING_IN_SOURCE = 'missing_in_source'
+MISSING_IN_TARGET = 'missing_in_target'
+VALUE_MISMATCH = 'value_mismatch'
+DUPLICATE_IN_SOURCE = 'duplicate_in_source'
+DUPLICATE_IN_TARGET = 'duplicate_in_target'
+
+
+class ComparisonHelper:
+    """Key-based comparison of a source and a target DataFrame
+
+    All checks run as vectorized pandas/NumPy operations on a single outer
+    merge, so the cost is dominated by the merge itself rather than Python
+    row loops. Only counts and a bounded sample of keys are returned.
+
+    A key that occurs more than once on one side is a mismatch: the first
+    row is compared and every further row is counted as a duplicate, so
+    duplicates never multiply through the merge.
+    """
+
+    def __init__(self, sample_size: int = 10):
+        self.sample_size = sample_size
+        self.logger = logging.getLogger(__name__)
+
+    def compare(self, source_df: pd.DataFrame, target_df: pd.DataFrame, key_columns: List[str],
+                compare_columns: Optional[List[str]] = None,
+                tolerances: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Compare source and target on key_columns and summarise the differences
+
+        tolerances maps a column name (or 'default') to either an absolute
+        tolerance or a dict with 'abs' and/or 'rel' entries.
+        """
+        key_columns = list(key_columns)
+        tolerances = tolerances or {}
+
+        for side, df in (('source', source_df), ('target', target_df)):
+            missing_keys = [k for k in key_columns if k not in df.columns]
+            if missing_keys:
+                raise ValueError(f"Key columns missing from {side} data: {missing_keys}")
+
+        if compare_columns is None:
+            target_columns = set(target_df.columns)
+            compare_columns = [c for c in source_df.columns
+                               if c in target_columns and c not in key_columns]
+        else:
+            compare_columns = [c for c in compare_columns if c not in key_columns]
+            for side, df in (('source', source_df), ('target', target_df)):
+                missing_columns = [c for c in compare_columns if c not in df.columns]
+                if missing_columns:
+                    raise ValueError(f"Compare columns missing from {side} data: {missing_columns}")
+
+        source = source_df[key_columns + compare_columns]
+        target = target_df[key_columns + compare_columns]
+        source, target = self._align_key_dtypes(source, target, key_columns)
+        source, source_duplicates = self._split_duplicates(source, key_columns)
+        target, target_duplicates = self._split_duplicates(target, key_columns)
+
+        merged = source.merge(
+            target, on=key_columns, how='outer',
+            suffixes=('_source', '_target'), indicator=True
+        )
+
+        missing_in_target = (merged['_merge'] == 'left_only').to_numpy()
+        missing_in_source = (merged['_merge'] == 'right_only').to_numpy()
+        in_both = ~(missing_in_target | missing_in_source)
+
+        column_masks = {}
+        for column in compare_columns:
+            column_masks[column] = self._column_mismatch(
+                merged[f"{column}_source"], merged[f"{column}_target"],
+                self._tolerance_for(column, tolerances)
+            ) & in_both
+
+        value_mismatch = np.zeros(len(merged), dtype=bool)
+        for mask in column_masks.values():
+            value_mismatch |= mask
+
+        column_mismatches = {column: int(mask.sum()) for column, mask in column_masks.items()}
+        result = {
+            'key_columns': key_columns,
+            'source_rows': len(source_df),
+            'target_rows': len(target_df),
+            'matched_rows': int(in_both.sum()),
+            'missing_in_source': int(missing_in_source.sum()),
+            'missing_in_target': int(missing_in_target.sum()),
+            'value_mismatch_rows': int(value_mismatch.sum()),
+            'duplicates_in_source': len(source_duplicates),
+            'duplicates_in_target': len(target_duplicates),
+            'column_mismatches': {c: n for c, n in column_mismatches.items() if n},
+            'sample_keys': self._sample_keys(
+                merged, key_columns, column_masks,
+                missing_in_source, missing_in_target, value_mismatch
+            )
+        }
+        if len(source_duplicates) or len(target_duplicates):
+            duplicates = [dict(record, issue=DUPLICATE_IN_SOURCE)
+                          for record in source_duplicates.head(self.sample_size).to_dict('records')]
+            duplicates += [dict(record, issue=DUPLICATE_IN_TARGET)
+                           for record in target_duplicates.head(self.sample_size).to_dict('records')]
+            result['sample_keys'] = sorted(
+                result['sample_keys'] + duplicates, key=lambda record: sample_order(record, key_columns)
+            )[:self.sample_size]
+        return self.finalize(result)
+
+    def merge_results(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Combine comparisons of disjoint key partitions into one summary
+
+        Counts add up and the sample keeps the smallest keys overall, so the
+        outcome equals a single in-memory comparison of the same data.
+        """
+        merged = {
+            'source_rows': 0,
+            'target_rows': 0,
+            'matched_rows': 0,
+            'missing_in_source': 0,
+            'missing_in_target': 0,
+            'value_mismatch_rows': 0,
+            'duplicates_in_source': 0,
+            'duplicates_in_target': 0,
+            'column_mismatches': {},
+            'sample_keys': []
+        }
+        key_columns = None
+        for result in results:
+            for field in ('source_rows', 'target_rows', 'matched_rows',
+                          'missing_in_source', 'missing_in_target', 'value_mismatch_rows'):
+                merged[field] += result[field]
+            for field in ('duplicates_in_source', 'duplicates_in_target'):
+                merged[field] += result.get(field, 0)
+            for column, count in result['column_mismatches'].items():
+                merged['column_mismatches'][column] = merged['column_mismatches'].get(column, 0) + count
+            merged['sample_keys'].extend(result['sample_keys'])
+            key_columns = key_columns or result.get('key_columns')
+
+        if key_columns:
+            merged['sample_keys'].sort(key=lambda record: sample_order(record, key_columns))
+        merged['sample_keys'] = merged['sample_keys'][:self.sample_size]
+        merged['key_columns'] = key_columns
+        return self.finalize(merged)
+
+    def compare_partitioned(self, source_chunks: Iterable[pd.DataFrame], target_chunks: Iterable[pd.DataFrame],
+                            key_columns: List[str], compare_columns: Optional[List[str]] = None,
+                            tolerances: Optional[Dict[str, Any]] = None, num_partitions: int = 16,
+                            work_dir: Optional[str] = None, max_workers: int = 1) -> Dict[str, Any]:
+        """Out-of-core comparison for inputs larger than memory
+
+        Both sides are streamed chunk by chunk and hash-partitioned on
+        key_columns into on-disk spill files; each partition is then compared
+        on its own (optionally in a process pool), so peak memory is bounded
+        by the largest partition rather than the whole dataset.
+        """
+        key_columns = list(key_columns)
+        spill_dir = Path(tempfile.mkdtemp(prefix='risk_compare_', dir=work_dir))
+        try:
+            source_schema = self._spill_partitions(source_chunks, spill_dir / 'source', key_columns, num_partitions)
+            target_schema = self._spill_partitions(target_chunks, spill_dir / 'target', key_columns, num_partitions)
+
+            jobs = []
+            for partition in range(num_partitions):
+                source_files = sorted((spill_dir / 'source' / f"{partition:05d}").glob('*.pkl'))
+                target_files = sorted((spill_dir / 'target' / f"{partition:05d}").glob('*.pkl'))
+                if source_files or target_files:
+                    jobs.append((
+                        source_files, target_files, source_schema, target_schema,
+                        key_columns, compare_columns, tolerances, self.sample_size
+                    ))
+
+            self.logger.info(f"Comparing {len(jobs)} non-empty partitions of {num_partitions}")
+            if max_workers > 1 and len(jobs) > 1:
+                with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                    results = list(executor.map(_compare_partition, jobs))
+            else:
+                results = [_compare_partition(job) for job in jobs]
+
+            if not results:
+                results = [_compare_partition(([], [], source_schema, target_schema, key_columns,
+                                               compare_columns, tolerances, self.sample_size))]
+            return self.merge_results(results)
+        finally:
+            shutil.rmtree(spill_dir, ignore_errors=True)
+
+    def _spill_partitions(self, chunks: Iterable[pd.DataFrame], side_dir: Path,
+                          key_columns: List[str], num_partitions: int) -> pd.DataFrame:
+        """Write each chunk's rows to per-partition pickle files; return an empty schema frame"""
+        schema = None
+        for chunk_number, chunk in enumerate(chunks):
+            if schema is None:
+                schema = chunk.iloc[0:0]
+            if chunk.empty:
+                continue
+            for partition, part in chunk.groupby(partition_ids(chunk, key_columns, num_partitions), sort=False):
+                partition_dir = side_dir / f"{partition:05d}"
+                partition_dir.mkdir(parents=True, exist_ok=True)
+                part.to_pickle(partition_dir / f"{chunk_number:08d}.pkl")
+        return schema if schema is not None else pd.DataFrame(columns=key_columns)
+
+    def finalize(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Derive the overall verdict and the human-readable details string"""
+        duplicates = result.get('duplicates_in_source', 0) + result.get('duplicates_in_target', 0)
+        result['mismatch_count'] = (
+            result['missing_in_source'] + result['missing_in_target'] + result['value_mismatch_rows'] + duplicates
+        )
+        result['all_match'] = result['mismatch_count'] == 0
+
+        details = (
+            f"matched={result['matched_rows']}, "
+            f"missing_in_source={result['missing_in_source']}, "
+            f"missing_in_target={result['missing_in_target']}, "
+            f"value_mismatches={result['value_mismatch_rows']}"
+        )
+        if duplicates:
+            details += (f", duplicates_in_source={result.get('duplicates_in_source', 0)}, "
+                        f"duplicates_in_target={result.get('duplicates_in_target', 0)}")
+        if result['column_mismatches']:
+            per_column = ', '.join(f"{c}={n}" for c, n in result['column_mismatches'].items())
+            details += f" ({per_column})"
+        result['details'] = details
+        return result
+
+    def _align_key_dtypes(self, source: pd.DataFrame, target: pd.DataFrame, key_columns: List[str]):
+        """Cast key columns to their key strings where the two sides disagree on dtype"""
+        mismatched = [k for k in key_columns if source[k].dtype != target[k].dtype]
+        if mismatched:
+            self.logger.debug(f"Casting key columns to string for comparison: {mismatched}")
+            source = source.assign(**{k: key_strings(source[k]) for k in mismatched})
+            target = target.assign(**{k: key_strings(target[k]) for k in mismatched})
+        return source, target
+
+    def _split_duplicates(self, frame: pd.DataFrame, key_columns: List[str]):
+        """First row of every key, and the keys of the rows repeating one"""
+        repeated = frame.duplicated(key_columns, keep='first').to_numpy()
+        if not repeated.any():
+            return frame, frame.iloc[0:0][key_columns]
+        duplicates = frame.loc[repeated, key_columns].sort_values(key_columns, kind='mergesort')
+        return frame[~repeated], duplicates
+
+    def _tolerance_for(self, column: str, tolerances: Dict[str, Any]) -> Dict[str, float]:
+        """Resolve the abs/rel tolerance for a column"""
+        spec = tolerances.get(column, tolerances.get('default', 0))
+        if isinstance(spec, dict):
+            return {'abs': float(spec.get('abs', 0)), 'rel': float(spec.get('rel', 0))}
+        return {'abs': float(spec), 'rel': 0.0}
+
+    def _column_mismatch(self, left: pd.Series, right: pd.Series, tolerance: Dict[str, float]) -> np.ndarray:
+        """Boolean mask of rows where left and right differ beyond tolerance"""
+        left_null = left.isna().to_numpy()
+        right_null = right.isna().to_numpy()
+        null_mismatch = left_null != right_null
+        both_present = ~(left_null | right_null)
+
+        numeric = self._as_numeric_pair(left, right)
+        if numeric is not None:
+            left_values, right_values = numeric
+            close = np.isclose(
+                left_values, right_values,
+                rtol=tolerance['rel'], atol=tolerance['abs'], equal_nan=True
+            )
+            return null_mismatch | (both_present & ~close)
+
+        if pd.api.types.is_datetime64_any_dtype(left) or pd.api.types.is_datetime64_any_dtype(right):
+            left = pd.to_datetime(left, errors='coerce')
+            right = pd.to_datetime(right, errors='coerce')
+            differs = (left != right).to_numpy()
+        elif left.dtype == right.dtype:
+            differs = (left != right).to_numpy()
+        else:
+            differs = (left.astype(str) != right.astype(str)).to_numpy()
+
+        return null_mismatch | (both_present & differs)
+
+    def _as_numeric_pair(self, left: pd.Series, right: pd.Series):
+        """Return float arrays for both sides if they can be compared numerically"""
+        left_numeric = pd.api.types.is_numeric_dtype(left) and not pd.api.types.is_bool_dtype(left)
+        right_numeric = pd.api.types.is_numeric_dtype(right) and not pd.api.types.is_bool_dtype(right)
+        if not (left_numeric or right_numeric):
+            return None
+
+        # One side is numeric: the other (typically strings flattened from XML)
+        # is accepted only if every non-null value parses as a number
+        converted = []
+        for series in (left, right):
+            values = pd.to_numeric(series, errors='coerce')
+            if (values.isna() & series.notna()).any():
+                return None
+            converted.append(values.to_numpy(dtype=float, na_value=np.nan))
+        return converted[0], converted[1]
+
+    def _sample_keys(self, merged: pd.DataFrame, key_columns: List[str], column_masks: Dict[str, np.ndarray],
+                     missing_in_source: np.ndarray, missing_in_target: np.ndarray,
+                     value_mismatch: np.ndarray) -> List[Dict[str, Any]]:
+        """Smallest sample_size mismatching keys, so samples are deterministic"""
+        any_issue = missing_in_source | missing_in_target | value_mismatch
+        if not self.sample_size or not any_issue.any():
+            return []
+
+        issues = merged.loc[any_issue, key_columns]
+        sample_index = issues.sort_values(key_columns, kind='mergesort').index[:self.sample_size]
+        positions = merged.index.get_indexer(sample_index)
+
+        sample = []
+        for position, record in zip(positions, merged.loc[sample_index, key_columns].to_dict('records')):
+            if missing_in_source[position]:
+                record['issue'] = MISSING_IN_SOURCE
+            elif missing_in_target[position]:
+                record['issue'] = MISSING_IN_TARGET
+            else:
+                record['issue'] = VALUE_MISMATCH
+                record['columns'] = [c for c, mask in column_masks.items() if mask[position]]
+            sample.append(record)
+        return sample
+
+
+def key_strings(series: pd.Series) -> pd.Series:
+    """String form of a key column in which equal keys agree across dtypes
+
+    Integer-valued floats lose their '.0' (a float key column is usually an
+    integer one with blanks), so 1, 1.0 and '1' all become '1'; midnight
+    timestamps render as a bare date whatever else the column holds; nulls
+    stay null instead of becoming 'nan'.
+    """
+    present = series.notna().to_numpy()
+    text = series.astype(str).astype(object)
+    if pd.api.types.is_float_dtype(series):
+        values = series.to_numpy(dtype=float, na_value=np.nan)
+        whole = present & (np.mod(values, 1) == 0) & (np.abs(values) < 2 ** 63)
+        if whole.any():
+            text[whole] = values[whole].astype(np.int64).astype(str)
+    elif pd.api.types.is_datetime64_any_dtype(series):
+        midnight = present & (series == series.dt.normalize()).to_numpy()
+        if midnight.any():
+            text[midnight] = series[midnight].dt.strftime('%Y-%m-%d').to_numpy()
+    return text.where(present, None)
+
+
+def sample_order(record: Dict[str, Any], key_columns: List[str]) -> tuple:
+    """Sort key for sample records that orders mixed and null key values like pandas
+
+    Numbers come first in numeric order, then everything else by its string
+    form, then nulls, so samples from different partitions sort without
+    comparing e.g. str with int.
+    """
+    order = []
+    for column in key_columns:
+        value = record.get(column)
+        if value is None or (isinstance(value, float) and np.isnan(value)) or value is pd.NaT:
+            order.append((2, 0.0, ''))
+        elif isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, (bool, np.bool_)):
+            order.append((0, float(value), ''))
+        else:
+            order.append((1, 0.0, str(value)))
+    return tuple(order)
+
+
+def partition_ids(frame: pd.DataFrame, key_columns: List[str], num_partitions: int) -> np.ndarray:
+    """Stable hash partition of each row by its key values
+
+    Keys are hashed through their key strings so that e.g. 42, 42.0 and '42'
+    land in the same partition on both sides, as they would match in compare().
+    """
+    keys = pd.DataFrame({column: key_strings(frame[column]) for column in key_columns})
+    hashes = pd.util.hash_pandas_object(keys, index=False).to_numpy()
+    return (hashes % np.uint64(num_partitions)).astype(np.int64)
+
+
+def _compare_partition(job) -> Dict[str, Any]:
+    """Compare one spilled partition (module level so process pools can pickle it)"""
+    (source_files, target_files, source_schema, target_schema,
+     key_columns, compare_columns, tolerances, sample_size) = job
+
+    def load(files, schema):
+        if not files:
+            return schema
+        return pd.concat([pd.read_pickle(f) for f in files], ignore_index=True)
+
+    return ComparisonHelper(sample_size=sample_size).compare(
+        load(source_files, source_schema), load(target_files, target_schema),
+        key_columns, compare_columns=compare_columns, tolerances=tolerances
+    )
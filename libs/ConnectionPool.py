@@ -0,0 +1,141 @@
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Optional
+
+
+class ConnectionPool:
+    """Thread-safe pool of DB-API connections
+
+    Connections are created lazily up to max_size and handed out LIFO, so
+    hot connections get reused while the rest can go idle. A connection that
+    has been idle for longer than health_check_interval is probed with
+    health_check_query before it is handed out and replaced if it is dead.
+    """
+
+    def __init__(self, connect: Callable[[], Any], max_size: int = 5,
+                 health_check_query: str = 'SELECT 1', health_check_interval: float = 30.0,
+                 acquire_timeout: Optional[float] = None):
+        self._connect = connect
+        self.max_size = max(1, int(max_size))
+        self.health_check_query = health_check_query
+        self.health_check_interval = health_check_interval
+        self.acquire_timeout = acquire_timeout
+        self.logger = logging.getLogger(__name__)
+        self.stats = {'created': 0, 'reused': 0, 'discarded': 0}
+
+        self._idle = deque()  # (connection, last_used) pairs
+        self._size = 0        # Connections created and not yet discarded
+        self._closed = False
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of a with block"""
+        conn = self.acquire()
+        try:
+            yield conn
+        except BaseException:
+            # Also covers GeneratorExit from abandoned streaming reads.
+            # Keep the connection only if it can still roll back cleanly
+            self.release(conn, discard=not self._rollback(conn))
+            raise
+        else:
+            self.release(conn)
+
+    def acquire(self):
+        """Check out a healthy connection, creating one if the pool has room"""
+        deadline = None if self.acquire_timeout is None else time.monotonic() + self.acquire_timeout
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    conn, last_used = None, None
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"No connection available within {self.acquire_timeout}s")
+                self._condition.wait(remaining)
+
+        if conn is not None and not self._is_healthy(conn, last_used):
+            self._close_quietly(conn)
+            self._count('discarded')
+            conn = None
+
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._condition:
+                    self._size -= 1
+                    self._condition.notify()
+                raise
+            self._count('created')
+        else:
+            self._count('reused')
+        return conn
+
+    def release(self, conn, discard: bool = False):
+        """Return a connection to the pool (or drop it if discard is set)"""
+        with self._condition:
+            if discard or self._closed:
+                self._size -= 1
+                self.stats['discarded'] += 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._condition.notify()
+
+        if discard or self._closed:
+            self._close_quietly(conn)
+
+    def close(self):
+        """Close idle connections; connections still checked out close on release"""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+            self._condition.notify_all()
+
+        for conn, _ in idle:
+            self._close_quietly(conn)
+        self.logger.debug(f"Connection pool closed: {self.stats}")
+
+    def _is_healthy(self, conn, last_used: float) -> bool:
+        if time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(self.health_check_query)
+                cursor.fetchall()
+            finally:
+                cursor.close()
+            return True
+        except Exception as e:
+            self.logger.warning(f"Discarding unhealthy pooled connection: {e}")
+            return False
+
+    def _rollback(self, conn) -> bool:
+        try:
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _count(self, name: str):
+        with self._condition:
+            self.stats[name] += 1
+
+    def _close_quietly(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
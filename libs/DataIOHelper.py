@@ -0,0 +1,176 @@
+import pandas as pd
+import logging
+from pathlib import Path
+from typing import Dict, Any, Iterator, List, Optional
+
+from libs.ExcelIOHelper import ExcelIOHelper
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:  # Columnar formats are optional
+    pa = None
+    feather = None
+    pq = None
+
+# File suffix -> format name, used when no format is configured explicitly
+FORMAT_BY_SUFFIX = {
+    '.xlsx': 'excel',
+    '.xlsm': 'excel',
+    '.xls': 'excel',
+    '.parquet': 'parquet',
+    '.pq': 'parquet',
+    '.feather': 'feather',
+    '.arrow': 'feather',
+    '.csv': 'csv'
+}
+
+# Format name -> suffix used when an output path is rewritten for a format
+SUFFIX_BY_FORMAT = {
+    'excel': '.xlsx',
+    'parquet': '.parquet',
+    'feather': '.feather',
+    'csv': '.csv'
+}
+
+
+class DataIOHelper:
+    """Read and write task inputs/outputs in a configurable file format
+
+    Parquet and Feather (Arrow IPC) keep dtypes intact and are read through
+    memory maps; Excel stays available as the human-readable export and is
+    streamed through ExcelIOHelper (legacy .xls files go through pandas).
+    """
+
+    def __init__(self, excel_max_rows: Optional[int] = None):
+        self.excel = ExcelIOHelper(excel_max_rows) if excel_max_rows else ExcelIOHelper()
+        self.logger = logging.getLogger(__name__)
+
+    def detect_format(self, path: str, fmt: Optional[str] = None) -> str:
+        """Resolve the format of path, preferring an explicit fmt"""
+        if fmt:
+            fmt = fmt.lower()
+            if fmt not in SUFFIX_BY_FORMAT:
+                raise ValueError(f"Unsupported data format: {fmt}")
+            return fmt
+
+        suffix = Path(path).suffix.lower()
+        if suffix not in FORMAT_BY_SUFFIX:
+            raise ValueError(f"Cannot infer data format from file name: {path}")
+        return FORMAT_BY_SUFFIX[suffix]
+
+    def path_for_format(self, path: str, fmt: str) -> str:
+        """Swap the suffix of path for the one matching fmt"""
+        return str(Path(path).with_suffix(SUFFIX_BY_FORMAT[self.detect_format(path, fmt)]))
+
+    def read(self, path: str, fmt: Optional[str] = None, columns: Optional[List[str]] = None,
+             **kwargs) -> pd.DataFrame:
+        """Read a DataFrame from path"""
+        fmt = self.detect_format(path, fmt)
+
+        if fmt == 'excel':
+            if kwargs or self._legacy_excel(path):
+                return pd.read_excel(path, usecols=columns, **kwargs)
+            return self.excel.read(path, columns)
+        if fmt == 'csv':
+            return pd.read_csv(path, usecols=columns, **kwargs)
+
+        self._require_arrow(fmt)
+        if fmt == 'parquet':
+            return pd.read_parquet(path, columns=columns, engine='pyarrow', memory_map=True, **kwargs)
+        return feather.read_table(path, columns=columns, memory_map=True).to_pandas(**kwargs)
+
+    def iter_chunks(self, path: str, chunksize: int, fmt: Optional[str] = None,
+                    columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+        """Yield path as DataFrames of at most chunksize rows"""
+        fmt = self.detect_format(path, fmt)
+
+        if fmt == 'csv':
+            with pd.read_csv(path, usecols=columns, chunksize=chunksize) as reader:
+                yield from reader
+            return
+        if fmt == 'excel':
+            if self._legacy_excel(path):
+                # openpyxl cannot stream .xls; slice the sheet once loaded
+                frame = self.read(path, fmt, columns)
+                for start in range(0, len(frame), chunksize):
+                    yield frame.iloc[start:start + chunksize]
+            else:
+                yield from self.excel.iter_chunks(path, chunksize, columns)
+            return
+
+        self._require_arrow(fmt)
+        if fmt == 'parquet':
+            for batch in pq.ParquetFile(path, memory_map=True).iter_batches(batch_size=chunksize, columns=columns):
+                yield batch.to_pandas()
+        else:
+            table = feather.read_table(path, columns=columns, memory_map=True)
+            for batch in table.to_batches(max_chunksize=chunksize):
+                yield batch.to_pandas()
+
+    def write(self, frame: pd.DataFrame, path: str, fmt: Optional[str] = None) -> str:
+        """Write frame to path and return the path actually written"""
+        fmt = self.detect_format(path, fmt)
+        path = self.path_for_format(path, fmt)
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+        if fmt == 'excel':
+            self.excel.write(frame, path)
+        elif fmt == 'csv':
+            frame.to_csv(path, index=False)
+        else:
+            self._require_arrow(fmt)
+            self._write_columnar(frame.reset_index(drop=True), path, fmt)
+        return path
+
+    def save_task_output(self, frame: pd.DataFrame, output_path: str, config: Dict[str, Any],
+                         context=None, task_name: Optional[str] = None) -> str:
+        """Persist a task's output according to its config and return the primary file
+
+        output_format picks the primary format (Excel by default). With a
+        columnar format, excel_export additionally produces the Excel report,
+        which defer_output postpones to the end of the suite. Within a suite
+        run the path may be redirected by the context (see RunContext.output_path).
+        """
+        if context is not None:
+            output_path = context.output_path(output_path)
+            if config.get('publish_as'):
+                context.artifacts.publish(config['publish_as'], frame, owner=context.task_id)
+
+        output_format = self.detect_format(output_path, config.get('output_format', 'excel'))
+        primary_file = None
+        if output_format != 'excel':
+            primary_file = self.write(frame, output_path, output_format)
+
+        if output_format == 'excel' or config.get('excel_export'):
+            excel_path = self.path_for_format(output_path, 'excel')
+            if context is not None and config.get('defer_output'):
+                context.artifacts.add_report(excel_path, frame, task_name=task_name, owner=context.task_id)
+            else:
+                self.write(frame, excel_path, 'excel')
+            primary_file = primary_file or excel_path
+
+        return primary_file
+
+    def _write_columnar(self, frame: pd.DataFrame, path: str, fmt: str):
+        """Write Parquet/Feather, stringifying object columns Arrow cannot type"""
+        try:
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            mixed = [c for c in frame.columns if frame[c].dtype == object]
+            self.logger.warning(f"Storing mixed-type columns as strings in {path}: {mixed}")
+            frame = frame.astype({c: 'string' for c in mixed})
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+
+        if fmt == 'parquet':
+            pq.write_table(table, path)
+        else:
+            feather.write_feather(table, path)
+
+    def _legacy_excel(self, path: str) -> bool:
+        return Path(path).suffix.lower() == '.xls'
+
+    def _require_arrow(self, fmt: str):
+        if pa is None:
+            raise ImportError(f"pyarrow is required for the {fmt} format")
@@ -0,0 +1,149 @@
+import logging
+import re
+from typing import Any, Iterator, List, Optional
+
+import pandas as pd
+
+try:
+    from openpyxl import Workbook, load_workbook
+except ImportError:  # Only needed for Excel input/output
+    Workbook = None
+    load_workbook = None
+
+# Data rows per sheet: Excel's 1,048,576 row limit minus the header row
+EXCEL_MAX_ROWS = 1_048_575
+
+# Rows converted from the frame to Python values at a time while writing
+WRITE_CHUNK_ROWS = 50_000
+
+
+class ExcelIOHelper:
+    """Stream DataFrames to and from .xlsx files through openpyxl's write-only and read-only modes
+
+    Writing never builds a cell object per value, and reading walks the
+    sheet row by row, so memory stays bounded by the chunk size rather than
+    the sheet size. Frames longer than max_rows continue on sheets named
+    "<sheet>_2", "<sheet>_3", ... each with its own header row; reading the
+    base sheet picks those continuation sheets up again.
+    """
+
+    def __init__(self, max_rows: int = EXCEL_MAX_ROWS):
+        self.max_rows = max(1, min(int(max_rows), EXCEL_MAX_ROWS))
+        self.logger = logging.getLogger(__name__)
+
+    def write(self, frame: pd.DataFrame, path: str, sheet_name: str = 'Sheet1') -> List[str]:
+        """Write frame to path and return the names of the sheets written"""
+        self._require_openpyxl()
+        workbook = Workbook(write_only=True)
+        header = [str(column) for column in frame.columns]
+        sheets = []
+
+        for start in range(0, max(len(frame), 1), self.max_rows):
+            title = sheet_name if not sheets else f"{sheet_name}_{len(sheets) + 1}"
+            sheet = workbook.create_sheet(title)
+            sheet.append(header)
+            part = frame.iloc[start:start + self.max_rows]
+            for offset in range(0, len(part), WRITE_CHUNK_ROWS):
+                for row in self._python_rows(part.iloc[offset:offset + WRITE_CHUNK_ROWS]):
+                    sheet.append(row)
+            sheets.append(title)
+
+        if len(sheets) > 1:
+            self.logger.info(f"Split {len(frame)} rows over {len(sheets)} sheets in {path}")
+        workbook.save(path)
+        return sheets
+
+    def read(self, path: str, columns: Optional[List[str]] = None,
+             sheet_name: Optional[str] = None) -> pd.DataFrame:
+        """Read a sheet (and its continuation sheets) into one DataFrame"""
+        chunks = list(self.iter_chunks(path, WRITE_CHUNK_ROWS, columns, sheet_name))
+        if len(chunks) == 1:
+            return chunks[0]
+        return pd.concat(chunks, ignore_index=True)
+
+    def iter_chunks(self, path: str, chunksize: int, columns: Optional[List[str]] = None,
+                    sheet_name: Optional[str] = None) -> Iterator[pd.DataFrame]:
+        """Yield a sheet as DataFrames of at most chunksize rows
+
+        Without sheet_name the first sheet is read. An empty sheet yields
+        one empty frame so callers always see the columns.
+        """
+        self._require_openpyxl()
+        chunksize = max(1, int(chunksize))
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            base = sheet_name or workbook.sheetnames[0]
+            if base not in workbook.sheetnames:
+                raise ValueError(f"Worksheet {base} not found in {path}")
+
+            header = None
+            yielded = False
+            for title in self._sheet_group(workbook.sheetnames, base):
+                rows = workbook[title].iter_rows(values_only=True)
+                sheet_header = self._header(next(rows, ()))
+                if header is None:
+                    header = sheet_header
+                    positions = self._positions(header, columns, path)
+                elif sheet_header != header:
+                    self.logger.warning(f"Sheet {title} in {path} has a different header, not reading it")
+                    continue
+
+                batch = []
+                for row in rows:
+                    if not any(value is not None for value in row):
+                        continue
+                    batch.append([row[i] if i < len(row) else None for i in positions])
+                    if len(batch) >= chunksize:
+                        yield self._frame(batch, header, positions)
+                        yielded = True
+                        batch = []
+                if batch:
+                    yield self._frame(batch, header, positions)
+                    yielded = True
+
+            if not yielded:
+                yield self._frame([], header or [], positions if header else [])
+        finally:
+            workbook.close()
+
+    def _sheet_group(self, sheet_names: List[str], base: str) -> List[str]:
+        """base followed by its continuation sheets in order"""
+        pattern = re.compile(re.escape(base) + r'_(\d+)')
+        continuations = sorted(
+            (int(match.group(1)), name)
+            for name, match in ((name, pattern.fullmatch(name)) for name in sheet_names) if match
+        )
+        return [base] + [name for _, name in continuations]
+
+    def _header(self, row) -> List[str]:
+        # Trailing empty header cells are formatting, not columns
+        header = list(row)
+        while header and header[-1] is None:
+            header.pop()
+        return [f"Unnamed: {i}" if value is None else str(value) for i, value in enumerate(header)]
+
+    def _positions(self, header: List[str], columns: Optional[List[str]], path: str) -> List[int]:
+        if columns is None:
+            return list(range(len(header)))
+        missing = [column for column in columns if column not in header]
+        if missing:
+            raise ValueError(f"Columns {missing} not found in {path}")
+        wanted = set(columns)
+        return [i for i, name in enumerate(header) if name in wanted]
+
+    def _frame(self, rows: List[List[Any]], header: List[str], positions: List[int]) -> pd.DataFrame:
+        frame = pd.DataFrame(rows, columns=[header[i] for i in positions])
+        # Entirely empty columns come back as NaN floats, as pd.read_excel returns them
+        empty = [column for column in frame.columns if frame[column].dtype == object and frame[column].isna().all()]
+        if empty and len(frame):
+            frame[empty] = frame[empty].astype('float64')
+        return frame
+
+    def _python_rows(self, frame: pd.DataFrame) -> Iterator[tuple]:
+        """Rows as tuples of plain values, with NaN/NaT written as empty cells"""
+        values = frame.astype(object).where(frame.notna(), None)
+        return values.itertuples(index=False, name=None)
+
+    def _require_openpyxl(self):
+        if Workbook is None:
+            raise ImportError("openpyxl is required for the excel format")
@@ -1,34 +1,279 @@
 import pandas as pd
+import fnmatch
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import List, Optional, Tuple, Union
 import logging
+import numpy as np
+from libs.DataIOHelper import DataIOHelper
+from libs.StageRecorder import StageRecorder
+
+MATCH_MODES = ('exact', 'glob', 'regex')
+
+# Characters that end the literal prefix (and start the literal suffix) of a pattern
+GLOB_SPECIAL = frozenset('*?[]')
+REGEX_SPECIAL = frozenset('.^$*+?{}[]\\|()')
+
+# Sorts after every file name, so [prefix, prefix + MAX_CHAR) spans all names starting with prefix
+MAX_CHAR = '\U0010ffff'
 
 class FileSystemHelper:
-    def __init__(self):
+    def __init__(self, max_workers: int = 8, stages: StageRecorder = None):
+        self.max_workers = max(1, int(max_workers))
+        self.stages = stages if stages is not None else StageRecorder()
         self.logger = logging.getLogger(__name__)
-    
-    def validate_files_exist(self, expected_files_path: str, target_directory: str) -> pd.DataFrame:
-        """Validate that expected files exist in target directory"""
+
+    def scan_directory(self, directory: str, recursive: bool = False, warn_missing: bool = True) -> pd.DataFrame:
+        """List a directory tree once with os.scandir
+
+        Returns one row per file with its path relative to directory, its
+        base name and the DirEntry (whose stat() result is cached, so sizes
+        are only fetched for the files that are actually matched). Symlinked
+        directories are skipped, as os.walk does; symlinked files are listed.
+        """
+        root = Path(directory)
+        records = []
+        pending = [root]
+        while pending:
+            current = pending.pop()
+            try:
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            if recursive:
+                                pending.append(Path(entry.path))
+                        elif entry.is_dir():
+                            # Symlinked directories are not descended into (as in os.walk), so
+                            # a link back up the tree cannot make the scan loop forever
+                            continue
+                        else:
+                            relative = Path(entry.path).relative_to(root).as_posix()
+                            records.append((str(root), relative, entry.name, entry))
+            except FileNotFoundError:
+                if warn_missing:
+                    self.logger.warning(f"Target directory not found: {current}")
+
+        return pd.DataFrame(records, columns=['directory', 'relative_path', 'name', 'entry'])
+
+    def build_index(self, directories: List[str], recursive: bool = False,
+                    case_sensitive: Optional[bool] = None, subdirectories: List[str] = ()) -> pd.DataFrame:
+        """Scan several directories in parallel into a single file index
+
+        subdirectories (relative paths) are listed on their own under every
+        directory, so expected names like 'sub/file.csv' resolve without a
+        recursive scan. case_sensitive=None detects it per directory.
+        """
+        jobs = [(d, '') for d in directories] + [(d, sub) for d in directories for sub in subdirectories]
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(jobs))) as executor:
+            listings = list(executor.map(lambda job: self._scan_job(job[0], job[1], recursive), jobs))
+
+        index = pd.concat(listings, ignore_index=True).drop_duplicates(['directory', 'relative_path'])
+        # Directory order decides which copy wins when a file exists twice
+        index['directory_rank'] = index['directory'].map({str(Path(d)): i for i, d in enumerate(directories)})
+        insensitive = {str(Path(d)): (not case_sensitive) if case_sensitive is not None
+                       else self._case_insensitive(d, index.loc[index['directory'] == str(Path(d)), 'relative_path'])
+                       for d in directories}
+        index['case_insensitive'] = index['directory'].map(insensitive).astype(bool)
+        return index.reset_index(drop=True)
+
+    def _scan_job(self, directory: str, subdirectory: str, recursive: bool) -> pd.DataFrame:
+        if not subdirectory:
+            return self.scan_directory(directory, recursive)
+        listing = self.scan_directory(os.path.join(directory, subdirectory), recursive=False, warn_missing=False)
+        return listing.assign(directory=str(Path(directory)),
+                              relative_path=subdirectory + '/' + listing['relative_path'])
+
+    def _case_insensitive(self, directory: str, relative_paths: pd.Series) -> bool:
+        """Whether directory lives on a case-insensitive file system (Windows, most SMB shares)
+
+        Costs at most one stat: a listed file is looked up under its
+        swapped-case name.
+        """
+        if os.path.normcase('A') == 'a':
+            return True
+        listed = set(relative_paths)
+        for relative in relative_paths:
+            swapped = relative.swapcase()
+            if swapped != relative and swapped not in listed:
+                return os.path.exists(os.path.join(directory, swapped))
+        return False
+
+    def validate_files_exist(self, expected_files_path: str, target_directory: Union[str, List[str]],
+                             match_mode: str = 'exact', recursive: bool = False,
+                             case_sensitive: Optional[bool] = None) -> pd.DataFrame:
+        """Validate that expected files exist in target directory
+
+        Names are matched case-insensitively on case-insensitive targets, as
+        exists() would; case_sensitive forces either behaviour.
+        """
         try:
-            # Read expected files from Excel
-            expected_files_df = pd.read_excel(expected_files_path)
-            target_path = Path(target_directory)
-            
-            results = []
-            
-            for _, row in expected_files_df.iterrows():
-                expected_file = row['filename']  # Adjust column name as needed
-                file_path = target_path / expected_file
-                
-                result = {
-                    'filename': expected_file,
-                    'expected_path': str(file_path),
-                    'status': 'Found' if file_path.exists() else 'Missing',
-                    'file_size': file_path.stat().st_size if file_path.exists() else 0
-                }
-                results.append(result)
-            
-            return pd.DataFrame(results)
-            
+            if match_mode not in MATCH_MODES:
+                raise ValueError(f"Unsupported match mode: {match_mode}")
+
+            # Read expected files (Excel or any columnar format)
+            with self.stages.stage('read_input'):
+                expected_files_df = DataIOHelper().read(expected_files_path)
+            directories = [target_directory] if isinstance(target_directory, (str, Path)) else list(target_directory)
+            expected = expected_files_df['filename'].astype(str).reset_index(drop=True)  # Adjust column name as needed
+            filenames = expected
+
+            # Expected paths below the top level are listed directory by directory when not scanning recursively
+            subdirectories = []
+            if match_mode == 'exact':
+                expected = expected.str.replace('\\', '/', regex=False)
+                parents = expected[expected.str.contains('/', regex=False)].map(lambda name: name.rsplit('/', 1)[0])
+                subdirectories = [p for p in parents.unique() if not recursive or p.startswith(('/', '..'))]
+
+            with self.stages.stage('scan'):
+                index = self.build_index(directories, recursive, case_sensitive, subdirectories)
+            self.stages.add_rows('scan', len(index))
+
+            with self.stages.stage('match', rows=len(expected)):
+                if match_mode == 'exact':
+                    matches = self._match_exact(expected, index)
+                else:
+                    matches = self._match_patterns(expected, index, match_mode)
+
+            # One row per expected file, keeping the best (first directory) match
+            matches = matches.sort_values(['position', 'directory_rank', 'relative_path'], kind='mergesort')
+            best = matches.drop_duplicates('position').set_index('position')
+            match_counts = matches.groupby('position').size()
+
+            found = expected.index.isin(best.index)
+            first_directory = Path(directories[0])
+            result = pd.DataFrame({
+                'filename': filenames,
+                'expected_path': [str(first_directory / name) for name in expected],
+                'status': pd.Series(found).map({True: 'Found', False: 'Missing'}),
+                'file_size': 0
+            })
+
+            if len(best):
+                found_paths = best['directory'] + os.sep + best['relative_path'].str.replace('/', os.sep)
+                result.loc[best.index, 'expected_path'] = found_paths
+                with self.stages.stage('stat', rows=len(best)):
+                    result.loc[best.index, 'file_size'] = self._file_sizes(best['entry'])
+            if match_mode != 'exact':
+                result['match_count'] = match_counts.reindex(expected.index, fill_value=0).to_numpy()
+
+            return result
+
         except Exception as e:
             self.logger.error(f"File validation failed: {e}")
-            raise
\ No newline at end of file
+            raise
+
+    def _match_exact(self, expected: pd.Series, index: pd.DataFrame) -> pd.DataFrame:
+        """Join expected names against relative paths, then bare names for recursive scans"""
+        wanted = expected.rename('key').rename_axis('position').reset_index()
+        by_path = self._join_literal(wanted, index, 'relative_path')
+
+        # A bare file name may live anywhere in a recursive tree
+        unmatched = wanted[~wanted['position'].isin(by_path['position']) & ~wanted['key'].str.contains('/')]
+        by_name = self._join_literal(unmatched, index, 'name')
+        return pd.concat([by_path, by_name], ignore_index=True)
+
+    def _join_literal(self, wanted: pd.DataFrame, index: pd.DataFrame, column: str) -> pd.DataFrame:
+        """Hash join of wanted['key'] against an index column, folding case where the target ignores it"""
+        insensitive = index['case_insensitive'].to_numpy()
+        joined = [wanted.merge(index[~insensitive], left_on='key', right_on=column)]
+        if insensitive.any():
+            folded = index[insensitive].assign(match_key=index.loc[insensitive, column].str.lower())
+            joined.append(wanted.assign(match_key=wanted['key'].str.lower())
+                          .merge(folded, on='match_key').drop(columns='match_key'))
+        return pd.concat(joined, ignore_index=True)
+
+    def _match_patterns(self, expected: pd.Series, index: pd.DataFrame, match_mode: str) -> pd.DataFrame:
+        """Match every glob/regex pattern against the index
+
+        Patterns without wildcards are hash-joined like exact names. For the
+        rest the index column is sorted once (and once more reversed), and
+        each pattern's literal prefix or suffix narrows it to a contiguous
+        range by binary search, so a pattern only runs its regex over the
+        names that can match rather than over every file.
+        """
+        wanted = expected.rename('key').rename_axis('position').reset_index()
+        affixes = [self._literal_affixes(pattern, match_mode) for pattern in wanted['key']]
+        literal = np.array([is_literal for _, _, is_literal in affixes], dtype=bool)
+        # Patterns without a separator are matched against base names
+        with_path = wanted['key'].str.contains('/', regex=False).to_numpy()
+
+        matches = []
+        for column, on_column in (('name', ~with_path), ('relative_path', with_path)):
+            if (on_column & literal).any():
+                matches.append(self._join_literal(wanted[on_column & literal], index, column))
+            patterns = wanted[on_column & ~literal]
+            if patterns.empty:
+                continue
+            for insensitive in (False, True):
+                part = index[index['case_insensitive'].to_numpy() == insensitive]
+                if not part.empty:
+                    matches.extend(self._match_wildcards(
+                        patterns, [affixes[i] for i in patterns.index], part, column, match_mode, insensitive
+                    ))
+
+        if not matches:
+            return index.iloc[0:0].assign(position=pd.Series(dtype='int64'))
+        return pd.concat(matches, ignore_index=True)
+
+    def _match_wildcards(self, patterns: pd.DataFrame, affixes: List[Tuple[str, str, bool]], part: pd.DataFrame,
+                         column: str, match_mode: str, insensitive: bool) -> List[pd.DataFrame]:
+        """Run each pattern's regex over the range of names sharing its literal prefix or suffix"""
+        names = part[column].str.lower() if insensitive else part[column]
+        forward = np.argsort(names.to_numpy(dtype=object), kind='stable')
+        sorted_names = names.to_numpy(dtype=object)[forward]
+        reversed_names = names.map(lambda name: name[::-1]).to_numpy(dtype=object)
+        backward = np.argsort(reversed_names, kind='stable')
+        sorted_reversed = reversed_names[backward]
+        flags = re.IGNORECASE if insensitive else 0
+
+        rows, positions = [], []
+        name_values = names.to_numpy(dtype=object)
+        for (position, pattern), (prefix, suffix, _) in zip(patterns[['position', 'key']].itertuples(index=False),
+                                                              affixes):
+            if insensitive:
+                prefix, suffix = prefix.lower(), suffix.lower()
+            if len(suffix) > len(prefix):
+                reversed_suffix = suffix[::-1]
+                low, high = np.searchsorted(sorted_reversed, [reversed_suffix, reversed_suffix + MAX_CHAR])
+                candidates = backward[low:high]
+            elif prefix:
+                low, high = np.searchsorted(sorted_names, [prefix, prefix + MAX_CHAR])
+                candidates = forward[low:high]
+            else:
+                candidates = forward
+
+            match = re.compile(fnmatch.translate(pattern) if match_mode == 'glob' else pattern, flags).fullmatch
+            hits = [row for row in candidates.tolist() if match(name_values[row])]
+            rows.extend(hits)
+            positions.extend([position] * len(hits))
+
+        if not rows:
+            return []
+        return [part.iloc[rows].assign(position=positions)]
+
+    def _literal_affixes(self, pattern: str, match_mode: str) -> Tuple[str, str, bool]:
+        """Literal (prefix, suffix) every match of pattern has, and whether pattern is a plain name"""
+        special = GLOB_SPECIAL if match_mode == 'glob' else REGEX_SPECIAL
+        positions = [i for i, char in enumerate(pattern) if char in special]
+        if not positions:
+            return pattern, pattern, True
+        # Alternation and inline flags make any affix unreliable
+        if match_mode == 'regex' and ('|' in pattern or '(?' in pattern):
+            return '', '', False
+
+        first, last = positions[0], positions[-1]
+        prefix, suffix = pattern[:first], pattern[last + 1:]
+        if match_mode == 'regex':
+            # A quantifier makes the character before it optional, an escape changes the one after it
+            if pattern[first] in '*?{':
+                prefix = prefix[:-1]
+            if pattern[last] == '\\':
+                suffix = suffix[1:]
+        return prefix, suffix, False
+
+    def _file_sizes(self, entries: pd.Series) -> List[int]:
+        """stat() only the matched entries, in parallel (each is a round-trip on network shares)"""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(lambda entry: entry.stat().st_size, entries))
@@ -0,0 +1,278 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Any, Callable, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from libs.ComparisonHelper import ComparisonHelper, partition_ids
+
+# Buckets per validation; each changed bucket is re-compared on its own
+DEFAULT_NUM_BUCKETS = 32
+
+
+class FingerprintStore:
+    """Last fingerprints and per-bucket results of each validation, kept in a JSON file"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._state = {}
+        if self.path.exists():
+            with open(self.path) as f:
+                self._state = json.load(f)
+        self.logger = logging.getLogger(__name__)
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._state.get(name)
+
+    def put(self, name: str, entry: Dict[str, Any]):
+        """Store entry for name and rewrite the file atomically"""
+        with self._lock:
+            self._state[name] = entry
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(prefix=self.path.name, dir=self.path.parent)
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self._state, f, default=str)
+            os.replace(tmp_path, self.path)
+
+
+class FingerprintHelper:
+    """Skip or narrow validations whose data has not changed since the last run
+
+    Each side of a validation is fingerprinted per bucket: rows are placed
+    in num_buckets buckets by their key (the same hash partitioning the
+    partitioned comparison uses), every row is hashed with
+    pd.util.hash_pandas_object and a bucket's hash is the wrapping sum of
+    its row hashes (np.add.reduceat), so row order and batching do not
+    matter.
+
+    validate() returns the stored result untouched when the source
+    fingerprint and the target's server-side checksum both match the last
+    run. Otherwise the target is loaded, or streamed in batches, and only
+    buckets whose source or target hash changed are compared again; the
+    stored results of the other buckets are merged back in.
+    """
+
+    def __init__(self, store: FingerprintStore, num_buckets: int = DEFAULT_NUM_BUCKETS, sample_size: int = 10):
+        self.store = store
+        self.num_buckets = max(1, int(num_buckets))
+        self.sample_size = sample_size
+        self.logger = logging.getLogger(__name__)
+
+    def bucket_ids(self, frame: pd.DataFrame, key_columns: List[str]) -> np.ndarray:
+        if frame.empty:
+            return np.zeros(0, dtype=np.int64)
+        return partition_ids(frame, key_columns, self.num_buckets)
+
+    def row_hashes(self, frame: pd.DataFrame) -> np.ndarray:
+        """Hash of every row over all columns, independent of column order and batching
+
+        Each non-null value is hashed under a key derived from its column
+        name, and the wrapping sum per row is hashed once more. A column
+        absent from a batch therefore hashes like a null one, and numbers
+        hash as float64, so a batch that inferred int64 and one that had to
+        use float64 for the same values agree.
+        """
+        if frame.empty:
+            return np.zeros(0, dtype=np.uint64)
+        total = np.zeros(len(frame), dtype=np.uint64)
+        for column in frame.columns:
+            values = frame[column]
+            present = values.notna().to_numpy()
+            if not present.any():
+                continue
+            if pd.api.types.is_bool_dtype(values) or pd.api.types.is_numeric_dtype(values):
+                array = values.to_numpy(dtype='float64', na_value=np.nan)
+            elif pd.api.types.is_datetime64_any_dtype(values):
+                array = values.to_numpy(dtype='datetime64[ns]').view('int64')
+            else:
+                array = values.to_numpy(dtype=object)
+            column_key = hashlib.sha256(str(column).encode()).hexdigest()[:16]
+            hashes = pd.util.hash_array(array, hash_key=column_key)
+            total += np.where(present, hashes, np.uint64(0))
+        # The sum alone would let two rows of a bucket swap values unnoticed
+        return pd.util.hash_array(total)
+
+    def _bucket_sums(self, buckets: np.ndarray, hashes: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(non-empty buckets, row counts, wrapping hash sums)"""
+        order = np.argsort(buckets, kind='stable')
+        present, starts, counts = np.unique(buckets[order], return_index=True, return_counts=True)
+        sums = np.add.reduceat(hashes[order], starts) if len(hashes) else np.zeros(0, dtype=np.uint64)
+        return present, counts, sums
+
+    def fingerprint(self, frame: pd.DataFrame, key_columns: List[str],
+                    buckets: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        """Row count, overall digest and {bucket: [rows, hash]} of frame"""
+        if buckets is None:
+            buckets = self.bucket_ids(frame, key_columns)
+        hashes = self.row_hashes(frame)
+        present, counts, sums = self._bucket_sums(buckets, hashes)
+        return self._fingerprint_dict(len(frame), hashes.sum(dtype=np.uint64), present, counts, sums)
+
+    def _fingerprint_dict(self, rows: int, digest, present, counts, sums) -> Dict[str, Any]:
+        return {
+            'rows': int(rows),
+            'digest': format(int(digest), '016x'),
+            'buckets': {str(b): [int(n), format(int(h), '016x')] for b, n, h in zip(present, counts, sums)}
+        }
+
+    def _stream_target(self, target_batches: Callable[[], Iterable[pd.DataFrame]], key_columns: List[str],
+                       wanted: Optional[set], changed: Callable[[Dict[str, Any]], set]):
+        """Fingerprint a streamed target, keeping only the rows of changed buckets
+
+        Rows of the wanted buckets (None for all) are kept while the target
+        is fingerprinted; buckets that turn out to have changed on the
+        target side only are read in a second pass. Returns (target rows,
+        fingerprint, changed buckets).
+        """
+        counts = np.zeros(self.num_buckets, dtype=np.int64)
+        sums = np.zeros(self.num_buckets, dtype=np.uint64)
+        digest = np.zeros(1, dtype=np.uint64)  # Arrays wrap on overflow, scalars warn
+        kept = []
+
+        def keep(batch, buckets, selected):
+            if selected is None:
+                kept.append(batch)
+            elif selected:
+                rows = np.isin(buckets, [int(b) for b in selected])
+                if rows.any():
+                    kept.append(batch[rows])
+
+        for batch in target_batches():
+            buckets = self.bucket_ids(batch, key_columns)
+            hashes = self.row_hashes(batch)
+            present, batch_counts, batch_sums = self._bucket_sums(buckets, hashes)
+            counts[present] += batch_counts
+            sums[present] += batch_sums
+            digest += hashes.sum(dtype=np.uint64)
+            keep(batch, buckets, wanted)
+
+        present = np.flatnonzero(counts)
+        target_fp = self._fingerprint_dict(counts.sum(), digest[0], present, counts[present], sums[present])
+        changed_buckets = changed(target_fp)
+        missed = None if wanted is None else changed_buckets - wanted
+        if missed:
+            self.logger.info(f"Re-reading target for {len(missed)} buckets changed on the target side")
+            for batch in target_batches():
+                keep(batch, self.bucket_ids(batch, key_columns), missed)
+
+        columns = kept[0].columns if kept else key_columns
+        target_df = pd.concat(kept, ignore_index=True) if kept else pd.DataFrame(columns=columns)
+        return target_df, target_fp, changed_buckets
+
+    def changed_buckets(self, previous: Optional[Dict[str, Any]], current: Dict[str, Any]) -> set:
+        """Buckets whose contents differ between two fingerprints of one side"""
+        if previous is None:
+            return set(current['buckets'])
+        old, new = previous['buckets'], current['buckets']
+        return {b for b in set(old) | set(new) if old.get(b) != new.get(b)}
+
+    def config_digest(self, config: Optional[Dict[str, Any]]) -> str:
+        """Digest of a validation's configuration (query, compare columns, tolerances, ...)"""
+        payload = json.dumps(config or {}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def validate(self, name: str, source_df: pd.DataFrame, key_columns: List[str],
+                 target_checksum: Optional[Any], load_target: Callable[[], pd.DataFrame],
+                 compare: Callable[[pd.DataFrame, pd.DataFrame], Dict[str, Any]],
+                 config: Optional[Dict[str, Any]] = None,
+                 target_batches: Optional[Callable[[], Iterable[pd.DataFrame]]] = None) -> Dict[str, Any]:
+        """Comparison result for one validation, reusing whatever the last run established
+
+        target_checksum is the server-side checksum of the target (None if
+        unavailable, which disables skipping). config is the validation's
+        configuration as compare() uses it; when it changes, the stored
+        result and bucket results are discarded. With target_batches the
+        target is streamed instead of loaded: only the rows of changed
+        buckets are held, and the target is read a second time only for
+        buckets whose target side alone changed. The result carries a
+        'change_detection' summary.
+        """
+        key_columns = list(key_columns)
+        checksum = None if target_checksum is None else json.loads(json.dumps(target_checksum, default=str))
+        config_digest = self.config_digest(config)
+        state = self.store.get(name)
+        if state is not None and (state.get('num_buckets') != self.num_buckets
+                                  or state.get('key_columns') != key_columns
+                                  or state.get('config_digest') != config_digest):
+            state = None
+
+        source_buckets = self.bucket_ids(source_df, key_columns)
+        source_fp = self.fingerprint(source_df, key_columns, source_buckets)
+
+        if (state is not None and checksum is not None and state['target_checksum'] == checksum
+                and state['source']['digest'] == source_fp['digest']
+                and state['source']['rows'] == source_fp['rows']):
+            self.logger.info(f"Validation {name} unchanged since {state['updated_at']}, reusing its result")
+            result = dict(state['result'])
+            result['change_detection'] = f"unchanged since {state['updated_at']}"
+            return result
+
+        def changed_with(target_fp):
+            if state is None:
+                return set(source_fp['buckets']) | set(target_fp['buckets'])
+            return self.changed_buckets(state['source'], source_fp) | self.changed_buckets(state['target'], target_fp)
+
+        if target_batches is not None:
+            wanted = None if state is None else self.changed_buckets(state['source'], source_fp)
+            target_df, target_fp, changed = self._stream_target(target_batches, key_columns, wanted, changed_with)
+            target_buckets = self.bucket_ids(target_df, key_columns)
+        else:
+            target_df = load_target()
+            target_buckets = self.bucket_ids(target_df, key_columns)
+            target_fp = self.fingerprint(target_df, key_columns, target_buckets)
+            changed = changed_with(target_fp)
+
+        bucket_results = {} if state is None else \
+            {b: r for b, r in state['bucket_results'].items() if b not in changed}
+
+        source_rows = pd.Series(np.arange(len(source_df))).groupby(source_buckets).indices
+        target_rows = pd.Series(np.arange(len(target_df))).groupby(target_buckets).indices
+        empty = np.zeros(0, dtype=np.int64)
+        for bucket in sorted(changed, key=int):
+            source_positions = source_rows.get(int(bucket), empty)
+            target_positions = target_rows.get(int(bucket), empty)
+            if len(source_positions) == 0 and len(target_positions) == 0:
+                continue
+            result = compare(source_df.iloc[source_positions], target_df.iloc[target_positions])
+            # Stored results go through JSON; fresh ones do too so their samples sort alike
+            bucket_results[bucket] = json.loads(json.dumps(result, default=str))
+
+        comparator = ComparisonHelper(sample_size=self.sample_size)
+        if bucket_results:
+            result = comparator.merge_results(list(bucket_results.values()))
+        else:
+            result = json.loads(json.dumps(compare(source_df, target_df), default=str))
+
+        updated_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        self.store.put(name, {
+            'updated_at': updated_at,
+            'num_buckets': self.num_buckets,
+            'key_columns': key_columns,
+            'config_digest': config_digest,
+            'target_checksum': checksum,
+            'source': source_fp,
+            'target': target_fp,
+            'bucket_results': bucket_results,
+            'result': result
+        })
+
+        total = len(set(source_fp['buckets']) | set(target_fp['buckets']))
+        summary = f"compared {len(changed)} changed of {total} non-empty buckets"
+        self.logger.info(f"Validation {name}: {summary}")
+        result = dict(result)
+        result['change_detection'] = summary
+        return result
+
+
+def store_for(state_dir: str, task_name: str, env: str) -> FingerprintStore:
+    """Fingerprint store of one task and environment under state_dir"""
+    return FingerprintStore(str(Path(state_dir) / f"{task_name}_{env}.json"))
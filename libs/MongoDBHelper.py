@@ -1,55 +1,446 @@
-import pymongo
+try:
+    import pymongo
+except ImportError:  # Only needed when the helper opens its own client
+    pymongo = None
 import pandas as pd
+import json
 import logging
-from typing import Dict, Any
+import time
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Any, Iterator, List, Optional
+import numpy as np
+from libs.ComparisonHelper import ComparisonHelper, DUPLICATE_IN_TARGET, key_strings
+from libs.FingerprintHelper import FingerprintHelper
+from libs.StageRecorder import StageRecorder
+
+# Documents per server round-trip and per DataFrame chunk
+DEFAULT_BATCH_SIZE = 5000
+
+
+def create_client(connection_string: str):
+    """MongoClient (with its own connection pool) for connection_string"""
+    if pymongo is None:
+        raise ImportError("pymongo is required to connect to MongoDB")
+    return pymongo.MongoClient(connection_string)
+
+
+def flatten_documents(documents: List[Dict[str, Any]], separator: str = '_') -> pd.DataFrame:
+    """Flatten nested sub-documents into parent_child columns, as CDWHelper.flatten_xml names nested elements
+
+    Arrays are stored as JSON text so the columns stay hashable and comparable.
+    """
+    frame = pd.json_normalize(documents, sep=separator)
+    for column in frame.columns:
+        if frame[column].dtype != object:
+            continue
+        values = frame[column]
+        arrays = values.map(lambda value: isinstance(value, (list, tuple))).to_numpy(dtype=bool)
+        if arrays.any():
+            frame[column] = values.where(~arrays, values[arrays].map(lambda value: json.dumps(value, default=str)))
+    return frame.drop(columns='_id', errors='ignore')
+
+
+def _key_index(frame: pd.DataFrame, key_columns: List[str]) -> pd.Index:
+    """Index of each row's key in string form, as ComparisonHelper matches keys"""
+    keys = key_strings(frame[key_columns[0]]).fillna('').astype(str)
+    for column in key_columns[1:]:
+        keys = keys + '\x1f' + key_strings(frame[column]).fillna('').astype(str)
+    return pd.Index(keys.to_numpy())
+
 
 class MongoDBHelper:
-    def __init__(self, connection_string: str, database: str):
-        self.client = pymongo.MongoClient(connection_string)
+    def __init__(self, connection_string: str, database: str, stages: StageRecorder = None, client=None,
+                 fingerprints: FingerprintHelper = None):
+        # An injected client belongs to the caller (e.g. the suite's ResourceContext)
+        self._owns_client = client is None
+        self.client = client if client is not None else create_client(connection_string)
         self.database = self.client[database]
+        self.stages = stages if stages is not None else StageRecorder()
+        # Change detection against the last run; validations opt out with "fingerprint": false
+        self.fingerprints = fingerprints
         self.logger = logging.getLogger(__name__)
     
-    def query_collection(self, collection: str, query: Dict, projection: Dict = None) -> pd.DataFrame:
+    def close(self):
+        """Close the MongoClient if this helper created it"""
+        if self._owns_client:
+            self.client.close()
+    
+    def _projection_without_id(self, projection) -> Dict:
+        """Exclude _id on the server instead of popping it from every document"""
+        if projection is None:
+            return {'_id': 0}
+        if isinstance(projection, (list, tuple)):
+            projection = {field: 1 for field in projection}
+        projection = dict(projection)
+        projection['_id'] = 0
+        return projection
+    
+    def _cursor_to_frame(self, cursor, chunk_size: int = DEFAULT_BATCH_SIZE) -> pd.DataFrame:
+        """Build a DataFrame from a cursor chunk by chunk instead of list(cursor)"""
+        chunks = []
+        while True:
+            batch = list(islice(cursor, chunk_size))
+            if not batch:
+                break
+            chunks.append(pd.DataFrame(batch))
+        
+        if not chunks:
+            return pd.DataFrame()
+        frame = chunks[0] if len(chunks) == 1 else pd.concat(chunks, ignore_index=True)
+        # Aggregation pipelines may still emit _id
+        return frame.drop(columns='_id', errors='ignore')
+    
+    def query_collection(self, collection: str, query: Dict, projection: Dict = None,
+                         batch_size: int = DEFAULT_BATCH_SIZE, sort=None) -> pd.DataFrame:
         """Query MongoDB collection and return as DataFrame"""
         try:
             collection_obj = self.database[collection]
-            cursor = collection_obj.find(query, projection)
+            cursor = collection_obj.find(
+                query, self._projection_without_id(projection), batch_size=batch_size
+            )
+            if sort:
+                cursor = cursor.sort(sort)
             
-            results = list(cursor)
-            # Remove MongoDB _id field
-            for result in results:
-                result.pop('_id', None)
-            
-            return pd.DataFrame(results)
+            return self._cursor_to_frame(cursor, batch_size)
             
         except Exception as e:
             self.logger.error(f"MongoDB query failed: {e}")
             raise
     
+    def aggregate_collection(self, collection: str, pipeline: List[Dict],
+                             batch_size: int = DEFAULT_BATCH_SIZE) -> pd.DataFrame:
+        """Run an aggregation pipeline and return the output as DataFrame"""
+        try:
+            collection_obj = self.database[collection]
+            cursor = collection_obj.aggregate(pipeline, batchSize=batch_size, allowDiskUse=True)
+            return self._cursor_to_frame(cursor, batch_size)
+            
+        except Exception as e:
+            self.logger.error(f"MongoDB aggregation failed: {e}")
+            raise
+    
+    def time_range_pipeline(self, time_field: str, start=None, end=None, query: Dict = None,
+                            projection: Dict = None) -> List[Dict]:
+        """Pipeline reading a time-ordered collection in index order over [start, end)"""
+        match = dict(query or {})
+        time_filter = {}
+        if start is not None:
+            time_filter['$gte'] = self._parse_time(start)
+        if end is not None:
+            time_filter['$lt'] = self._parse_time(end)
+        if time_filter:
+            match[time_field] = time_filter
+        
+        return [
+            {'$match': match},
+            {'$sort': {time_field: 1}},
+            {'$project': self._projection_without_id(projection)}
+        ]
+    
+    def _parse_time(self, value):
+        """Config files carry ISO-8601 strings; Mongo compares BSON dates"""
+        if isinstance(value, str):
+            return datetime.fromisoformat(value)
+        return value
+    
+    def _iter_key_filters(self, keys: pd.DataFrame, key_columns: List[str], key_batch_size: int):
+        """Yield ($in filter, key batch) pairs covering the distinct source keys"""
+        unique_keys = keys[key_columns].dropna().drop_duplicates()
+        for start in range(0, len(unique_keys), key_batch_size):
+            key_batch = unique_keys.iloc[start:start + key_batch_size]
+            key_filter = {
+                column: {'$in': key_batch[column].drop_duplicates().tolist()}
+                for column in key_columns
+            }
+            yield key_filter, key_batch
+    
+    def _restrict_to_keys(self, frame: pd.DataFrame, key_batch: pd.DataFrame, key_columns: List[str]) -> pd.DataFrame:
+        """Drop documents whose composite key is not one of the requested tuples
+
+        Per-column $in filters return the cross product of key values, so
+        composite keys need this exact-match pass.
+        """
+        if len(key_columns) == 1 or frame.empty:
+            return frame
+        wanted = pd.MultiIndex.from_frame(key_batch[key_columns])
+        found = pd.MultiIndex.from_frame(frame[key_columns])
+        return frame[found.isin(wanted)]
+    
+    def _configured_pipeline(self, config: Dict) -> Optional[List[Dict]]:
+        """Explicit 'pipeline', a time-range pipeline for 'time_field', or None for a plain find"""
+        pipeline = config.get('pipeline')
+        if pipeline is None and config.get('time_field'):
+            time_range = config.get('time_range', {})
+            pipeline = self.time_range_pipeline(
+                config['time_field'], time_range.get('start'), time_range.get('end'),
+                config.get('query', {}), config.get('projection')
+            )
+        return pipeline
+    
+    def load_target_data(self, config: Dict, source_data: pd.DataFrame = None) -> pd.DataFrame:
+        """Load the documents a validation compares against
+
+        Supports plain find queries, aggregation pipelines ('pipeline') and
+        time-ordered reads ('time_field' with optional 'time_range'). With
+        'push_down_keys' (implied by 'sampled') the source keys are sent to
+        the server in batched $in filters so only the validated documents
+        are pulled. With 'flatten' nested sub-documents become columns, as
+        iter_target_batches returns them.
+        """
+        if config.get('flatten'):
+            batches = list(self.iter_target_batches(config, source_data))
+            return pd.concat(batches, ignore_index=True) if batches else pd.DataFrame(columns=config['key_columns'])
+        
+        collection = config['collection']
+        query = config.get('query', {})
+        projection = config.get('projection')
+        batch_size = config.get('batch_size', DEFAULT_BATCH_SIZE)
+        pipeline = self._configured_pipeline(config)
+        
+        def load(key_filter=None):
+            if pipeline is not None:
+                stages = ([{'$match': key_filter}] if key_filter else []) + list(pipeline)
+                return self.aggregate_collection(collection, stages, batch_size)
+            combined = {'$and': [query, key_filter]} if key_filter and query else (key_filter or query)
+            return self.query_collection(collection, combined, projection, batch_size)
+        
+        # A sampled run always pushes its keys down so only sampled documents are read
+        if not (config.get('push_down_keys') or config.get('sampled')) or source_data is None:
+            return load()
+        
+        key_columns = config['key_columns']
+        chunks = []
+        for key_filter, key_batch in self._iter_key_filters(
+                source_data, key_columns, config.get('key_batch_size', 1000)):
+            chunks.append(self._restrict_to_keys(load(key_filter), key_batch, key_columns))
+        
+        chunks = [chunk for chunk in chunks if not chunk.empty]
+        if not chunks:
+            return pd.DataFrame(columns=key_columns)
+        return pd.concat(chunks, ignore_index=True)
+    
+    def iter_target_batches(self, config: Dict, source_data: pd.DataFrame = None) -> Iterator[pd.DataFrame]:
+        """Stream a validation's documents as flattened DataFrames of at most batch_size rows
+
+        Takes the same query options as load_target_data, including key
+        push-down, but never holds more than one batch of documents.
+        """
+        collection = self.database[config['collection']]
+        query = config.get('query', {})
+        batch_size = config.get('batch_size', DEFAULT_BATCH_SIZE)
+        separator = config.get('separator', '_')
+        pipeline = self._configured_pipeline(config)
+        
+        def cursor(key_filter=None):
+            if pipeline is not None:
+                stages = ([{'$match': key_filter}] if key_filter else []) + list(pipeline)
+                return collection.aggregate(stages, batchSize=batch_size, allowDiskUse=True)
+            combined = {'$and': [query, key_filter]} if key_filter and query else (key_filter or query)
+            return collection.find(combined, self._projection_without_id(config.get('projection')),
+                                   batch_size=batch_size)
+        
+        def batches(documents):
+            while True:
+                batch = list(islice(documents, batch_size))
+                if not batch:
+                    return
+                yield flatten_documents(batch, separator)
+        
+        if not (config.get('push_down_keys') or config.get('sampled')) or source_data is None:
+            yield from batches(cursor())
+            return
+        
+        key_columns = config['key_columns']
+        for key_filter, key_batch in self._iter_key_filters(
+                source_data, key_columns, config.get('key_batch_size', 1000)):
+            for frame in batches(cursor(key_filter)):
+                frame = self._restrict_to_keys(frame, key_batch, key_columns)
+                if not frame.empty:
+                    yield frame
+    
+    def _compare_batches(self, config: Dict, source_data: pd.DataFrame = None) -> Iterator[pd.DataFrame]:
+        """iter_target_batches checked for key columns and padded with absent compare columns"""
+        key_columns = list(config['key_columns'])
+        for batch in self.iter_target_batches(config, source_data):
+            missing = [column for column in key_columns if column not in batch.columns]
+            if missing:
+                raise ValueError(f"Key columns missing from documents: {missing}")
+            # A field absent from a whole batch is still a column to compare
+            for column in config.get('compare_columns') or []:
+                if column not in batch.columns:
+                    batch[column] = None
+            yield batch
+    
+    def stream_compare(self, source_df: pd.DataFrame, config: Dict):
+        """Compare source_df with a collection batch by batch; returns (result, documents read)
+
+        Each batch of documents is joined to the source rows sharing its
+        keys and compared on its own; source rows no batch matched are
+        reported as missing in the target at the end. Memory is bounded by
+        the source plus one batch. With 'partitioned' (true or a dict with
+        num_partitions, max_workers, work_dir) both sides are spilled to
+        disk instead, as in SQLServerHelper.
+        """
+        key_columns = list(config['key_columns'])
+        compare_columns = config.get('compare_columns')
+        tolerances = config.get('tolerances')
+        comparator = ComparisonHelper(sample_size=config.get('sample_size', 10))
+        documents = 0
+        
+        def target_batches():
+            nonlocal documents
+            for batch in self._compare_batches(config, source_df):
+                documents += len(batch)
+                self.stages.add_rows('query', len(batch))
+                yield batch
+        
+        if config.get('partitioned'):
+            options = config['partitioned'] if isinstance(config['partitioned'], dict) else {}
+            chunksize = config.get('batch_size', DEFAULT_BATCH_SIZE)
+            source_chunks = (source_df.iloc[start:start + chunksize] for start in range(0, len(source_df), chunksize))
+            result = comparator.compare_partitioned(
+                source_chunks, target_batches(), key_columns,
+                compare_columns=compare_columns, tolerances=tolerances,
+                num_partitions=options.get('num_partitions', 16),
+                work_dir=options.get('work_dir'),
+                max_workers=options.get('max_workers', 1)
+            )
+            return result, documents
+        
+        source_index = _key_index(source_df, key_columns)
+        source_keys = source_index.unique()
+        key_matched = np.zeros(len(source_keys), dtype=bool)
+        orphan_keys = set()  # Keys of documents without a source row seen so far
+        results = []
+        schema = None
+        for batch in target_batches():
+            schema = batch.iloc[0:0]
+            batch_keys = _key_index(batch, key_columns)
+            slots = source_keys.get_indexer(batch_keys)
+            # A key already met in an earlier batch is a duplicate; within a batch compare() finds them
+            repeated = np.where(slots >= 0, key_matched[slots], batch_keys.isin(orphan_keys))
+            if repeated.any():
+                results.append(self._duplicate_result(batch[repeated], key_columns, comparator.sample_size))
+                batch, batch_keys, slots = batch[~repeated], batch_keys[~repeated], slots[~repeated]
+            orphan_keys.update(batch_keys[slots < 0])
+            key_matched[slots[slots >= 0]] = True
+            indexer, _ = source_index.get_indexer_non_unique(batch_keys)
+            positions = np.unique(indexer[indexer >= 0])
+            results.append(comparator.compare(
+                source_df.iloc[positions], batch, key_columns, compare_columns, tolerances
+            ))
+        
+        unmatched = ~key_matched[source_keys.get_indexer(source_index)]
+        if unmatched.any() or not results:
+            target = schema if schema is not None else pd.DataFrame(columns=key_columns + list(compare_columns or []))
+            results.append(comparator.compare(source_df[unmatched], target, key_columns, compare_columns, tolerances))
+        return comparator.merge_results(results), documents
+    
+    def _duplicate_result(self, duplicates: pd.DataFrame, key_columns: List[str], sample_size: int) -> Dict:
+        """Comparison result counting documents whose key an earlier batch already had"""
+        sample = duplicates[key_columns].head(sample_size).to_dict('records')
+        return {
+            'key_columns': key_columns,
+            'source_rows': 0,
+            'target_rows': len(duplicates),
+            'matched_rows': 0,
+            'missing_in_source': 0,
+            'missing_in_target': 0,
+            'value_mismatch_rows': 0,
+            'duplicates_in_target': len(duplicates),
+            'column_mismatches': {},
+            'sample_keys': [dict(record, issue=DUPLICATE_IN_TARGET) for record in sample]
+        }
+    
+    def validate_stream(self, source_data: pd.DataFrame, validation_config: Dict) -> pd.DataFrame:
+        """Validate MongoDB data against source data, streaming the documents (see stream_compare)"""
+        validation_results = []
+        
+        for validation_name, config in validation_config.items():
+            start = time.perf_counter()
+            try:
+                with self.stages.stage('stream_compare', rows=len(source_data)):
+                    comparison_result, documents = self.stream_compare(source_data, config)
+                seconds = time.perf_counter() - start
+                rate = documents / seconds if seconds else 0.0
+                self.logger.info(f"Validation {validation_name}: {documents} documents in {seconds:.2f}s "
+                                 f"({rate:,.0f} docs/s)")
+                
+                validation_results.append({
+                    'validation_name': validation_name,
+                    'status': 'PASS' if comparison_result['all_match'] else 'FAIL',
+                    'mismatch_count': comparison_result['mismatch_count'],
+                    'missing_in_source': comparison_result['missing_in_source'],
+                    'missing_in_target': comparison_result['missing_in_target'],
+                    'column_mismatches': json.dumps(comparison_result['column_mismatches']),
+                    'sample_keys': json.dumps(comparison_result['sample_keys'], default=str),
+                    'details': comparison_result['details'],
+                    'documents': documents,
+                    'seconds': round(seconds, 3),
+                    'docs_per_second': round(rate, 1)
+                })
+                
+            except Exception as e:
+                self.logger.error(f"Validation {validation_name} failed: {e}")
+                validation_results.append({
+                    'validation_name': validation_name,
+                    'status': 'ERROR',
+                    'error': str(e)
+                })
+        
+        return pd.DataFrame(validation_results)
+    
     def validate_data(self, source_data: pd.DataFrame, validation_config: Dict) -> pd.DataFrame:
         """Validate MongoDB data against source data"""
         validation_results = []
         
         for validation_name, config in validation_config.items():
             try:
-                # Query MongoDB
-                mongo_data = self.query_collection(
-                    config['collection'],
-                    config.get('query', {}),
-                    config.get('projection')
-                )
+                def load_target():
+                    with self.stages.stage('query'):
+                        mongo_data = self.load_target_data(config, source_data)
+                    self.stages.add_rows('query', len(mongo_data))
+                    return mongo_data
+                
+                def target_batches():
+                    # Streamed for change detection, so only one batch and the changed buckets are held
+                    batches = self._compare_batches(config, source_data)
+                    while True:
+                        with self.stages.stage('query'):
+                            batch = next(batches, None)
+                        if batch is None:
+                            return
+                        self.stages.add_rows('query', len(batch))
+                        yield batch
                 
-                # Compare datasets
-                comparison_result = self._compare_datasets(
-                    source_data, mongo_data, config['key_columns']
-                )
+                def compare(source_df, target_df):
+                    with self.stages.stage('compare', rows=len(source_df)):
+                        return self._compare_datasets(source_df, target_df, config['key_columns'], config)
+                
+                if self.fingerprints is not None and config.get('fingerprint', True):
+                    with self.stages.stage('fingerprint'):
+                        checksum = self.target_checksum(config)
+                    # Batches are flattened documents, so only flattened validations can stream
+                    comparison_result = self.fingerprints.validate(
+                        validation_name, source_data, config['key_columns'], checksum, load_target, compare, config,
+                        target_batches=target_batches if config.get('flatten') else None
+                    )
+                else:
+                    comparison_result = compare(source_data, load_target())
                 
                 validation_results.append({
                     'validation_name': validation_name,
                     'status': 'PASS' if comparison_result['all_match'] else 'FAIL',
                     'mismatch_count': comparison_result['mismatch_count'],
+                    'missing_in_source': comparison_result['missing_in_source'],
+                    'missing_in_target': comparison_result['missing_in_target'],
+                    'column_mismatches': json.dumps(comparison_result['column_mismatches']),
+                    'sample_keys': json.dumps(comparison_result['sample_keys'], default=str),
                     'details': comparison_result['details']
                 })
+                if 'change_detection' in comparison_result:
+                    validation_results[-1]['change_detection'] = comparison_result['change_detection']
                 
             except Exception as e:
                 self.logger.error(f"Validation {validation_name} failed: {e}")
@@ -61,11 +452,39 @@ class MongoDBHelper:
         
         return pd.DataFrame(validation_results)
     
-    def _compare_datasets(self, source_df: pd.DataFrame, target_df: pd.DataFrame, key_columns: list) -> Dict:
+    def target_checksum(self, config: Dict):
+        """Server-side aggregate of a validation's collection, or None if it cannot be computed
+        
+        Counts the documents matching the query and takes $max/$sum of the
+        configured fingerprint_fields (e.g. a last-modified timestamp and a
+        version or amount), or runs fingerprint_pipeline when given. A count
+        alone misses in-place updates, so without either nothing is skipped.
+        """
+        pipeline = config.get('fingerprint_pipeline')
+        if pipeline is None:
+            if not config.get('fingerprint_fields'):
+                return None
+            group = {'_id': None, 'count': {'$sum': 1}}
+            for i, field in enumerate(config.get('fingerprint_fields', [])):
+                group[f"max_{i}"] = {'$max': f"${field}"}
+                group[f"sum_{i}"] = {'$sum': f"${field}"}
+            pipeline = [{'$match': config.get('query', {})}, {'$group': group}]
+        try:
+            documents = list(self.database[config['collection']].aggregate(pipeline, allowDiskUse=True))
+        except Exception as e:
+            self.logger.warning(f"Could not checksum collection, comparing without skipping: {e}")
+            return None
+        return [{k: v for k, v in document.items() if k != '_id'} for document in documents]
+    
+    def _compare_datasets(self, source_df: pd.DataFrame, target_df: pd.DataFrame, key_columns: List[str],
+                          compare_config: Dict = None) -> Dict:
         """Compare two datasets and identify mismatches"""
-        # Implementation similar to SQL helper
-        return {
-            'all_match': True,
-            'mismatch_count': 0,
-            'details': 'Comparison details'
-        }
\ No newline at end of file
+        compare_config = compare_config or {}
+        comparator = ComparisonHelper(sample_size=compare_config.get('sample_size', 10))
+        return comparator.compare(
+            source_df,
+            target_df,
+            key_columns,
+            compare_columns=compare_config.get('compare_columns'),
+            tolerances=compare_config.get('tolerances')
+        )
\ No newline at end of file
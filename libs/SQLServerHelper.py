@@ -1,68 +1,297 @@
-import pyodbc
+try:
+    import pyodbc
+except ImportError:  # Allows DB-API stand-ins (e.g. sqlite3) without the ODBC driver
+    pyodbc = None
 import pandas as pd
+import json
 import logging
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Callable, Iterator, Optional, Union
+from libs.ComparisonHelper import ComparisonHelper
+from libs.ConnectionPool import ConnectionPool
+from libs.FingerprintHelper import FingerprintHelper
+from libs.SamplingHelper import KEY_FILTER_PLACEHOLDER, restrict_to_keys, source_keys, sql_key_filters
+from libs.StageRecorder import StageRecorder
+
+# Rows fetched per round-trip in chunked mode
+DEFAULT_FETCH_SIZE = 50000
+
+
+def pyodbc_connect(connection_string: str):
+    if pyodbc is None:
+        raise ImportError("pyodbc is required to connect to SQL Server")
+    return pyodbc.connect(connection_string)
+
+
+def create_pool(connection_string: str, pool_size: int = 5, connect: Optional[Callable] = None) -> ConnectionPool:
+    """Connection pool for connection_string, e.g. to share between helpers of a suite run"""
+    connect = connect or pyodbc_connect
+    return ConnectionPool(lambda: connect(connection_string), max_size=pool_size)
 
 class SQLServerHelper:
-    def __init__(self, connection_string: str):
+    def __init__(self, connection_string: str, pool: Optional[ConnectionPool] = None,
+                 pool_size: int = 5, connect: Optional[Callable] = None,
+                 max_parallel_queries: int = 1, fetch_size: Optional[int] = None,
+                 stages: Optional[StageRecorder] = None, fingerprints: Optional[FingerprintHelper] = None):
         self.connection_string = connection_string
+        self.max_parallel_queries = max(1, int(max_parallel_queries))
+        self.fetch_size = fetch_size
+        self.stages = stages if stages is not None else StageRecorder()
+        # Change detection against the last run; validations opt out with "fingerprint": false
+        self.fingerprints = fingerprints
         self.logger = logging.getLogger(__name__)
+        
+        # connect(connection_string) -> DB-API connection; pyodbc unless overridden
+        self._connect = connect or pyodbc_connect
+        # An injected pool belongs to the caller (e.g. the suite's ResourceContext)
+        self._owns_pool = pool is None
+        self.pool = pool if pool is not None else ConnectionPool(self.create_connection, max_size=pool_size)
     
-    def execute_query(self, query: str, params: Dict[str, Any] = None) -> pd.DataFrame:
+    def create_connection(self):
+        """Open a new connection (used by the pool)"""
+        return self._connect(self.connection_string)
+    
+    def close(self):
+        """Close the connection pool if this helper created it"""
+        if self._owns_pool:
+            self.pool.close()
+    
+    def _query_params(self, params):
+        """DB-API drivers take positional parameters; dicts are used in declaration order"""
+        if not params:
+            return ()
+        if isinstance(params, dict):
+            return tuple(params.values())
+        return tuple(params)
+    
+    def iter_query(self, query: str, params: Dict[str, Any] = None,
+                   chunksize: int = DEFAULT_FETCH_SIZE) -> Iterator[pd.DataFrame]:
+        """Stream a query result as DataFrames of at most chunksize rows"""
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.arraysize = chunksize
+                cursor.execute(query, self._query_params(params))
+                columns = [column[0] for column in cursor.description]
+                
+                yielded = False
+                while True:
+                    rows = cursor.fetchmany(chunksize)
+                    if not rows:
+                        break
+                    yielded = True
+                    yield pd.DataFrame.from_records([tuple(row) for row in rows], columns=columns)
+                
+                if not yielded:
+                    yield pd.DataFrame(columns=columns)
+            finally:
+                cursor.close()
+    
+    def execute_query(self, query: str, params: Dict[str, Any] = None,
+                      chunksize: Optional[int] = None) -> pd.DataFrame:
         """Execute SQL query and return results as DataFrame"""
         try:
-            with pyodbc.connect(self.connection_string) as conn:
-                if params:
-                    result_df = pd.read_sql(query, conn, params=params)
-                else:
-                    result_df = pd.read_sql(query, conn)
-                return result_df
+            chunks = list(self.iter_query(query, params, chunksize or self.fetch_size or DEFAULT_FETCH_SIZE))
+            if len(chunks) == 1:
+                return chunks[0]
+            return pd.concat(chunks, ignore_index=True)
         except Exception as e:
             self.logger.error(f"SQL query execution failed: {e}")
             raise
     
-    def validate_data(self, source_data: pd.DataFrame, validation_queries: Dict) -> pd.DataFrame:
-        """Validate SQL data against source data"""
-        validation_results = []
+    def validate_data(self, source_data: Union[pd.DataFrame, Callable[[], Iterator[pd.DataFrame]]],
+                      validation_queries: Dict) -> pd.DataFrame:
+        """Validate SQL data against source data
+
+        source_data is a DataFrame or a callable returning a fresh iterator of
+        source chunks; the latter is only materialized for queries that are
+        not configured as partitioned.
+        """
+        items = list(validation_queries.items())
         
-        for query_name, query_config in validation_queries.items():
-            try:
-                # Execute validation query
-                validation_df = self.execute_query(
-                    query_config['query'], 
-                    query_config.get('params', {})
-                )
-                
-                # Compare with source data
-                comparison_result = self._compare_datasets(
-                    source_data, 
-                    validation_df, 
-                    query_config['key_columns']
-                )
-                
-                validation_results.append({
-                    'validation_name': query_name,
-                    'status': 'PASS' if comparison_result['all_match'] else 'FAIL',
-                    'mismatch_count': comparison_result['mismatch_count'],
-                    'details': comparison_result['details']
-                })
-                
-            except Exception as e:
-                self.logger.error(f"Validation {query_name} failed: {e}")
-                validation_results.append({
-                    'validation_name': query_name,
-                    'status': 'ERROR',
-                    'error': str(e)
-                })
+        def run(item):
+            return self._run_validation(source_data, *item)
+        
+        if self.max_parallel_queries == 1 or len(items) < 2:
+            validation_results = [run(item) for item in items]
+        else:
+            # Independent queries run on separate pooled connections; map keeps order
+            with ThreadPoolExecutor(max_workers=self.max_parallel_queries) as executor:
+                validation_results = list(executor.map(run, items))
         
         return pd.DataFrame(validation_results)
     
-    def _compare_datasets(self, source_df: pd.DataFrame, target_df: pd.DataFrame, key_columns: list) -> Dict:
+    def _run_validation(self, source_data, query_name: str, query_config: Dict) -> Dict[str, Any]:
+        """Run one validation query and compare it with the source data"""
+        try:
+            if query_config.get('partitioned'):
+                comparison_result = self._compare_partitioned(source_data, query_config)
+            elif self.fingerprints is not None and query_config.get('fingerprint', True) and not callable(source_data):
+                comparison_result = self._compare_fingerprinted(source_data, query_name, query_config)
+            else:
+                comparison_result = self._compare_in_memory(source_data, query_config)
+            
+            validation_result = {
+                'validation_name': query_name,
+                'status': 'PASS' if comparison_result['all_match'] else 'FAIL',
+                'mismatch_count': comparison_result['mismatch_count'],
+                'missing_in_source': comparison_result['missing_in_source'],
+                'missing_in_target': comparison_result['missing_in_target'],
+                'column_mismatches': json.dumps(comparison_result['column_mismatches']),
+                'sample_keys': json.dumps(comparison_result['sample_keys'], default=str),
+                'details': comparison_result['details']
+            }
+            if 'change_detection' in comparison_result:
+                validation_result['change_detection'] = comparison_result['change_detection']
+            return validation_result
+            
+        except Exception as e:
+            self.logger.error(f"Validation {query_name} failed: {e}")
+            return {
+                'validation_name': query_name,
+                'status': 'ERROR',
+                'error': str(e)
+            }
+    
+    def _compare_in_memory(self, source_data, query_config: Dict) -> Dict[str, Any]:
+        """Load the whole query result and compare it in one merge"""
+        if callable(source_data):
+            source_data = pd.concat(list(source_data()), ignore_index=True)
+        
+        # Execute validation query
+        validation_df = self._load_target(source_data, query_config)
+        
+        # Compare with source data
+        with self.stages.stage('compare', rows=len(source_data)):
+            return self._compare_datasets(
+                source_data, 
+                validation_df, 
+                query_config['key_columns'],
+                query_config
+            )
+    
+    def _load_target(self, source_data, query_config: Dict) -> pd.DataFrame:
+        """Run the validation query into one DataFrame"""
+        with self.stages.stage('query'):
+            chunksize = query_config.get('chunksize') or self.fetch_size or DEFAULT_FETCH_SIZE
+            chunks = list(self._target_chunks(source_data, query_config, chunksize))
+            validation_df = chunks[0] if len(chunks) == 1 else pd.concat(chunks, ignore_index=True)
+        self.stages.add_rows('query', len(validation_df))
+        return validation_df
+    
+    def _compare_fingerprinted(self, source_data: pd.DataFrame, query_name: str, query_config: Dict) -> Dict[str, Any]:
+        """Compare only what changed since the last run (see FingerprintHelper)"""
+        with self.stages.stage('fingerprint'):
+            checksum = self.target_checksum(query_config)
+        
+        def compare(source_df, target_df):
+            with self.stages.stage('compare', rows=len(source_df)):
+                return self._compare_datasets(source_df, target_df, query_config['key_columns'], query_config)
+        
+        return self.fingerprints.validate(
+            query_name, source_data, query_config['key_columns'], checksum,
+            lambda: self._load_target(source_data, query_config), compare, query_config
+        )
+    
+    def target_checksum(self, query_config: Dict) -> Optional[List[Any]]:
+        """Server-side row count and CHECKSUM_AGG of a validation query, or None if it cannot be computed
+        
+        fingerprint_query (with fingerprint_params) overrides the default,
+        e.g. for queries with an ORDER BY or a cheaper table-level checksum.
+        A {key_filter} placeholder is checksummed over the whole table.
+        """
+        query = query_config.get('fingerprint_query')
+        params = query_config.get('fingerprint_params', {})
+        if query is None:
+            base = query_config['query'].replace(KEY_FILTER_PLACEHOLDER, '(1 = 1)')
+            query = (f"SELECT COUNT_BIG(*) AS row_count, CHECKSUM_AGG(BINARY_CHECKSUM(*)) AS row_checksum "
+                     f"FROM ({base}) AS fingerprint_source")
+            params = query_config.get('params', {})
+        try:
+            return self.execute_query(query, params).iloc[0].tolist()
+        except Exception as e:
+            self.logger.warning(f"Could not checksum target, comparing without skipping: {e}")
+            return None
+    
+    def _compare_partitioned(self, source_data, query_config: Dict) -> Dict[str, Any]:
+        """Stream both sides through a hash-partitioned, out-of-core comparison
+        
+        The 'partitioned' entry of query_config may be true or a dict with
+        num_partitions, max_workers and work_dir.
+        """
+        options = query_config['partitioned'] if isinstance(query_config['partitioned'], dict) else {}
+        chunksize = query_config.get('chunksize') or self.fetch_size or DEFAULT_FETCH_SIZE
+        
+        if callable(source_data):
+            source_chunks = source_data()
+        else:
+            source_chunks = (source_data.iloc[start:start + chunksize]
+                             for start in range(0, len(source_data), chunksize))
+        target_chunks = self._target_chunks(source_data, query_config, chunksize)
+        
+        # Fetching and spilling are interleaved, so both count towards this stage
+        with self.stages.stage('compare_partitioned'):
+            result = ComparisonHelper(sample_size=query_config.get('sample_size', 10)).compare_partitioned(
+                source_chunks,
+                target_chunks,
+                query_config['key_columns'],
+                compare_columns=query_config.get('compare_columns'),
+                tolerances=query_config.get('tolerances'),
+                num_partitions=options.get('num_partitions', 16),
+                work_dir=options.get('work_dir'),
+                max_workers=options.get('max_workers', 1)
+            )
+        self.stages.add_rows('compare_partitioned', result['source_rows'] + result['target_rows'])
+        return result
+    
+    def _target_chunks(self, source_data, query_config: Dict, chunksize: int) -> Iterator[pd.DataFrame]:
+        """Stream the validation query, restricted to the source keys where asked
+        
+        A {key_filter} placeholder in the query is replaced by IN predicates
+        on the source keys (key_filter_columns maps key columns to SQL
+        expressions), run in batches that stay under SQL Server's parameter
+        limit. Without the placeholder, a 'sampled' query is filtered to the
+        source keys after fetching instead.
+        """
+        query = query_config['query']
+        params = list(self._query_params(query_config.get('params', {})))
+        key_columns = query_config['key_columns']
+        
+        if KEY_FILTER_PLACEHOLDER not in query:
+            chunks = self.iter_query(query, params, chunksize)
+            if not query_config.get('sampled'):
+                yield from chunks
+                return
+            self.logger.warning(f"Query has no {KEY_FILTER_PLACEHOLDER} placeholder; filtering sampled keys after fetch")
+            keys = source_keys(source_data, key_columns)
+            for chunk in chunks:
+                yield restrict_to_keys(chunk, keys, key_columns)
+            return
+        
+        # Parameters before the placeholder keep their position
+        head, tail = query.split(KEY_FILTER_PLACEHOLDER, 1)
+        leading = head.count('?')
+        keys = source_keys(source_data, key_columns)
+        if keys.empty:
+            yield from self.iter_query(head + '(1 = 0)' + tail, params, chunksize)
+            return
+        
+        mapping = query_config.get('key_filter_columns', {})
+        expressions = [mapping.get(column, column) for column in key_columns]
+        for predicate, key_params, key_batch in sql_key_filters(keys, expressions):
+            batch_params = params[:leading] + key_params + params[leading:]
+            for chunk in self.iter_query(head + predicate + tail, batch_params, chunksize):
+                yield restrict_to_keys(chunk, key_batch, key_columns) if len(key_columns) > 1 else chunk
+    
+    def _compare_datasets(self, source_df: pd.DataFrame, target_df: pd.DataFrame, key_columns: List[str],
+                          compare_config: Dict = None) -> Dict:
         """Compare two datasets and identify mismatches"""
-        # Implementation for dataset comparison
-        # This would merge on key columns and compare relevant fields
-        return {
-            'all_match': True,  # Simplified
-            'mismatch_count': 0,
-            'details': 'Comparison details'
-        }
\ No newline at end of file
+        compare_config = compare_config or {}
+        comparator = ComparisonHelper(sample_size=compare_config.get('sample_size', 10))
+        return comparator.compare(
+            source_df,
+            target_df,
+            key_columns,
+            compare_columns=compare_config.get('compare_columns'),
+            tolerances=compare_config.get('tolerances')
+        )
\ No newline at end of file
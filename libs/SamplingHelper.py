@@ -0,0 +1,183 @@
+import hashlib
+import logging
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from libs.ComparisonHelper import key_strings
+from libs.DataIOHelper import DataIOHelper
+
+# SQL Server accepts at most 2100 parameters per statement; leave room for the query's own
+MAX_SQL_PARAMETERS = 2000
+
+# Placeholder in validation queries replaced by the key filter
+KEY_FILTER_PLACEHOLDER = '{key_filter}'
+
+
+class SamplingHelper:
+    """Deterministic, hash-based sampling of trades for fast smoke runs
+
+    Every row is scored by a seeded hash of its key columns, so the same
+    seed and rate select the same trades in every run, environment and
+    task. Sampling is idempotent: applying it to an already sampled frame
+    keeps every row, which lets each task of a suite re-apply it safely.
+
+    stratify_by guarantees min_per_stratum rows (the lowest scores) from
+    every stratum, e.g. every trade_date or book, and max_per_stratum caps
+    them. Keys listed in always_include are kept regardless of the rate.
+    """
+
+    def __init__(self, rate: float = 1.0, key_columns: Optional[List[str]] = None, seed: str = '',
+                 stratify_by: Optional[List[str]] = None, min_per_stratum: int = 0,
+                 max_per_stratum: Optional[int] = None, always_include: Optional[List[Any]] = None):
+        if not 0.0 <= rate <= 1.0:
+            raise ValueError(f"Sampling rate must be between 0 and 1, got {rate}")
+        self.rate = rate
+        self.key_columns = list(key_columns or ['trade_id'])
+        self.seed = str(seed)
+        self.stratify_by = list(stratify_by or [])
+        self.min_per_stratum = int(min_per_stratum)
+        self.max_per_stratum = max_per_stratum
+        # hash_pandas_object takes a 16-byte key
+        self._hash_key = hashlib.sha256(self.seed.encode('utf-8')).hexdigest()[:16]
+        self._always_include = self._include_keys(always_include or [])
+        self.logger = logging.getLogger(__name__)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'SamplingHelper':
+        """Build a sampler from a suite's 'sampling' section
+
+        always_include may be given inline or as always_include_path, a file
+        (any DataIOHelper format) with the key columns.
+        """
+        always_include = list(config.get('always_include', []))
+        key_columns = config.get('key_columns')
+        if config.get('always_include_path'):
+            frame = DataIOHelper().read(config['always_include_path'])
+            columns = list(key_columns or ['trade_id'])
+            always_include.extend(frame[columns].to_dict('records'))
+        return cls(
+            rate=config.get('rate', 1.0),
+            key_columns=key_columns,
+            seed=config.get('seed', ''),
+            stratify_by=config.get('stratify_by'),
+            min_per_stratum=config.get('min_per_stratum', 0),
+            max_per_stratum=config.get('max_per_stratum'),
+            always_include=always_include
+        )
+
+    def settings(self) -> Dict[str, Any]:
+        """Everything that decides the sample, e.g. to fingerprint a run's configuration"""
+        return {
+            'rate': self.rate,
+            'key_columns': self.key_columns,
+            'seed': self.seed,
+            'stratify_by': self.stratify_by,
+            'min_per_stratum': self.min_per_stratum,
+            'max_per_stratum': self.max_per_stratum,
+            'always_include': sorted(self._always_include)
+        }
+
+    def _include_keys(self, always_include: List[Any]) -> set:
+        """Normalise always_include entries (scalars or key dicts) to key-string tuples
+
+        Each value goes through key_strings on its own, so 101, 101.0 and
+        '101' all name the same trade as the rows they are matched against.
+        """
+        keys = set()
+        for entry in always_include:
+            if isinstance(entry, dict):
+                values = [entry[column] for column in self.key_columns]
+            elif len(self.key_columns) == 1:
+                values = [entry]
+            else:
+                values = list(entry)
+            keys.add(tuple(key_strings(pd.Series([value])).iloc[0] for value in values))
+        return keys
+
+    def scores(self, frame: pd.DataFrame) -> np.ndarray:
+        """Uniform score in [0, 1) per row, from the seeded hash of its key"""
+        missing = [column for column in self.key_columns if column not in frame.columns]
+        if missing:
+            raise ValueError(f"Sampling key columns missing from data: {missing}")
+        # Keys hash on the form the comparison matches them on, so an int column and
+        # the same ids as floats (a column with blanks) select the same trades
+        keys = pd.DataFrame({column: key_strings(frame[column]) for column in self.key_columns})
+        hashes = pd.util.hash_pandas_object(keys, index=False, hash_key=self._hash_key).to_numpy()
+        # Top 53 bits give an exact float in [0, 1)
+        return (hashes >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+    def mask(self, frame: pd.DataFrame) -> np.ndarray:
+        """Boolean mask of the rows in the sample"""
+        if frame.empty:
+            return np.zeros(0, dtype=bool)
+        scores = self.scores(frame)
+        selected = scores < self.rate
+
+        if self.stratify_by and (self.min_per_stratum or self.max_per_stratum is not None):
+            missing = [column for column in self.stratify_by if column not in frame.columns]
+            if missing:
+                raise ValueError(f"Stratification columns missing from data: {missing}")
+            strata = [key_strings(frame[column]).to_numpy() for column in self.stratify_by]
+            rank = pd.Series(scores).groupby(strata, dropna=False).rank(method='first').to_numpy()
+            selected |= rank <= self.min_per_stratum
+            if self.max_per_stratum is not None:
+                selected &= rank <= self.max_per_stratum
+
+        if self._always_include:
+            keys = zip(*(key_strings(frame[column]) for column in self.key_columns))
+            selected |= np.fromiter((key in self._always_include for key in keys), dtype=bool, count=len(frame))
+        return selected
+
+    def sample(self, frame: pd.DataFrame, label: str = 'rows') -> pd.DataFrame:
+        """Rows of frame in the sample"""
+        sampled = frame[self.mask(frame)]
+        self.logger.info(f"Sampled {len(sampled)} of {len(frame)} {label} (rate={self.rate}, seed={self.seed!r})")
+        return sampled
+
+    def sample_chunks(self, chunks: Iterator[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        """Sample a chunked source; strata bounds then apply per chunk rather than overall"""
+        for chunk in chunks:
+            yield chunk[self.mask(chunk)]
+
+
+def source_keys(source_data, key_columns: List[str]) -> pd.DataFrame:
+    """Distinct key tuples of a DataFrame or of a callable returning source chunks"""
+    if callable(source_data):
+        chunks = [chunk[key_columns].drop_duplicates() for chunk in source_data()]
+        frame = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=key_columns)
+    else:
+        frame = source_data[key_columns]
+    return frame.dropna().drop_duplicates().reset_index(drop=True)
+
+
+def sql_key_filters(keys: pd.DataFrame, columns: List[str],
+                    max_parameters: int = MAX_SQL_PARAMETERS) -> Iterator[Tuple[str, List[Any], pd.DataFrame]]:
+    """Yield (SQL predicate, parameters, key batch) covering keys in bounded statements
+
+    A single key column becomes "col IN (?, ...)"; composite keys become one
+    IN list per column, whose cross product callers narrow down again with
+    restrict_to_keys. columns are the SQL expressions for the key columns.
+    """
+    batch_size = max(1, max_parameters // len(columns))
+    for start in range(0, len(keys), batch_size):
+        batch = keys.iloc[start:start + batch_size]
+        predicates, parameters = [], []
+        for column, expression in zip(keys.columns, columns):
+            values = batch[column].drop_duplicates().tolist()
+            predicates.append(f"{expression} IN ({', '.join('?' * len(values))})")
+            parameters.extend(values)
+        yield '(' + ' AND '.join(predicates) + ')', parameters, batch
+
+
+def restrict_to_keys(frame: pd.DataFrame, key_batch: pd.DataFrame, key_columns: List[str]) -> pd.DataFrame:
+    """Drop rows whose key is not one of the requested tuples
+
+    Keys are matched on their string form, as the comparison matches them.
+    """
+    if frame.empty:
+        return frame
+    wanted = pd.MultiIndex.from_frame(pd.DataFrame({c: key_strings(key_batch[c]) for c in key_columns}))
+    found = pd.MultiIndex.from_frame(pd.DataFrame({c: key_strings(frame[c]) for c in key_columns}))
+    return frame[found.isin(wanted)]
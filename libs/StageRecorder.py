@@ -0,0 +1,56 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+
+
+class StageRecorder:
+    """Thread-safe accumulator of wall/CPU time and row counts per named stage
+
+    Helpers wrap their internal steps (HTTP fetch, XML flatten, query,
+    compare, ...) in stage() blocks; a stage entered from many threads is
+    aggregated into one entry with call count, totals and the slowest call.
+    CPU time is measured per calling thread.
+    """
+
+    def __init__(self):
+        self._stages: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str, rows: Optional[int] = None):
+        """Time the enclosed block under name"""
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - wall_start, time.thread_time() - cpu_start, rows)
+
+    def record(self, name: str, wall_seconds: float, cpu_seconds: float = 0.0,
+               rows: Optional[int] = None, calls: int = 1):
+        """Add timed calls to a stage"""
+        with self._lock:
+            entry = self._stages.get(name)
+            if entry is None:
+                entry = self._stages[name] = {
+                    'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'max_wall_seconds': 0.0, 'rows': 0
+                }
+            entry['calls'] += calls
+            entry['wall_seconds'] += wall_seconds
+            entry['cpu_seconds'] += cpu_seconds
+            entry['max_wall_seconds'] = max(entry['max_wall_seconds'], wall_seconds)
+            if rows:
+                entry['rows'] += int(rows)
+
+    def add_rows(self, name: str, rows: int):
+        """Attribute rows to a stage without timing anything"""
+        self.record(name, 0.0, 0.0, rows, calls=0)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Copy of the per-stage totals, rounded for reporting"""
+        with self._lock:
+            return {
+                name: {key: round(value, 6) if isinstance(value, float) else value for key, value in entry.items()}
+                for name, entry in self._stages.items()
+            }
@@ -4,15 +4,82 @@ import sys
 import json
 from pathlib import Path
 from core.orchestrator import Orchestrator
+from core.checkpoint import DEFAULT_STATE_DIR
+from core.profiler import write_profile_report
+
+def print_run_summary(results) -> bool:
+    """Print one environment's results; True if every task and report succeeded"""
+    print(f"\n=== Suite Execution Summary ===")
+    print(f"Suite: {results['suite_name']}")
+    print(f"Environment: {results['environment']}")
+    print(f"Total Tasks: {len(results['tasks'])}")
+    
+    successful_tasks = [t for t in results['tasks'] if t['status'] == 'SUCCESS']
+    skipped_tasks = [t for t in results['tasks'] if t['status'] == 'SKIPPED']
+    print(f"Successful: {len(successful_tasks)}")
+    print(f"Failed: {len(results['tasks']) - len(successful_tasks) - len(skipped_tasks)}")
+    print(f"Skipped: {len(skipped_tasks)}")
+    if results.get('run_peak_rss_mb') is not None:
+        print(f"Peak RSS (run): {results['run_peak_rss_mb']} MiB")
+    
+    # Print individual task results
+    print(f"\n--- Task Details ---")
+    timings = {p['task_id']: p['wall_seconds'] for p in results.get('profile', [])}
+    for task in results['tasks']:
+        status_icon = {"SUCCESS": "✅", "SKIPPED": "⏭️"}.get(task['status'], "❌")
+        elapsed = f" ({timings[task['task_id']]:.2f}s)" if task.get('task_id') in timings else ""
+        if task.get('resumed'):
+            elapsed = " (resumed)"
+        print(f"{status_icon} {task['task_name']}: {task['status']}{elapsed}")
+        if task.get('error'):
+            print(f"   Error: {task['error']}")
+    
+    # Deferred Excel reports written at the end of the suite
+    failed_reports = [r for r in results.get('reports', []) if r['status'] != 'SUCCESS']
+    for report in failed_reports:
+        print(f"❌ Report {report['output_file']}: {report['error']}")
+    
+    return len(successful_tasks) == len(results['tasks']) and not failed_reports
+
+def print_cross_env_summary(results) -> bool:
+    """Print cross-environment comparisons; True if all of them passed"""
+    print(f"\n=== Cross-Environment Comparison ({' vs '.join(results['environments'])}) ===")
+    if not results['cross_env']:
+        print("No cross_env_compare entries in the suite")
+    for row in results['cross_env']:
+        status_icon = "✅" if row['status'] == 'PASS' else "❌"
+        print(f"{status_icon} {row['comparison_name']} {row['source_env']} vs {row['target_env']}: {row['status']}")
+        print(f"   {row.get('details') or row.get('error')}")
+    if results.get('cross_env_output'):
+        print(f"Report: {results['cross_env_output']}")
+    return all(row['status'] == 'PASS' for row in results['cross_env'])
 
 def main():
     parser = argparse.ArgumentParser(description='RISK Validation Automation Framework')
-    parser.add_argument('--env', required=True, choices=['UAT', 'PROD'], 
-                       help='Environment to run tests against')
+    parser.add_argument('--env', required=True, choices=['UAT', 'PROD'], nargs='+',
+                       help='Environment(s) to run tests against; several run concurrently '
+                            'with per-environment output folders and a cross-environment diff')
     parser.add_argument('--suite', required=True, 
                        help='Path to the suite configuration file')
     parser.add_argument('--config-dir', default='config',
                        help='Base configuration directory')
+    parser.add_argument('--max-parallel', type=int, default=None,
+                       help='Maximum number of suite tasks to run concurrently '
+                            '(overrides max_parallel_tasks in the suite file)')
+    parser.add_argument('--refresh', action='store_true',
+                       help='Ignore cached CDW responses and fetch everything again')
+    parser.add_argument('--profile-output',
+                       help='Write per-task/per-stage timings to this file '
+                            '(.json for one report, .jsonl for one line per task)')
+    parser.add_argument('--cprofile-dir',
+                       help='Run each task under cProfile and dump <task_id>.prof files here')
+    parser.add_argument('--checkpoint', action='store_true',
+                       help='Record task and extraction progress until the run completes, '
+                            'so an interrupted run can be continued with --resume')
+    parser.add_argument('--state-dir',
+                       help=f'Where checkpoints are kept (implies --checkpoint; default {DEFAULT_STATE_DIR})')
+    parser.add_argument('--resume', action='store_true',
+                       help='Continue an interrupted checkpointed run: skip completed tasks and fetched trades')
     
     args = parser.parse_args()
     
@@ -22,33 +89,37 @@ def main():
         sys.exit(1)
     
     try:
+        # Checkpointing is opt-in: it writes every task's artifacts to disk
+        state_dir = args.state_dir
+        if state_dir is None and (args.checkpoint or args.resume):
+            state_dir = DEFAULT_STATE_DIR
+        
         # Initialize and run orchestrator
         orchestrator = Orchestrator(args.config_dir)
-        results = orchestrator.execute_suite(args.suite, args.env)
-        
-        # Print summary
-        print(f"\n=== Suite Execution Summary ===")
-        print(f"Suite: {results['suite_name']}")
-        print(f"Environment: {results['environment']}")
-        print(f"Total Tasks: {len(results['tasks'])}")
+        run_options = dict(
+            max_parallel=args.max_parallel,
+            refresh=args.refresh,
+            cprofile_dir=args.cprofile_dir,
+            state_dir=state_dir,
+            resume=args.resume
+        )
+        if len(set(args.env)) == 1:
+            results = orchestrator.execute_suite(args.suite, args.env[0], **run_options)
+            runs = [results]
+        else:
+            results = orchestrator.execute_multi_env(args.suite, args.env, **run_options)
+            runs = results['runs']
         
-        successful_tasks = [t for t in results['tasks'] if t['status'] == 'SUCCESS']
-        print(f"Successful: {len(successful_tasks)}")
-        print(f"Failed: {len(results['tasks']) - len(successful_tasks)}")
+        if args.profile_output:
+            write_profile_report(results, args.profile_output)
         
-        # Print individual task results
-        print(f"\n--- Task Details ---")
-        for task in results['tasks']:
-            status_icon = "✅" if task['status'] == 'SUCCESS' else "❌"
-            print(f"{status_icon} {task['task_name']}: {task['status']}")
-            if task.get('error'):
-                print(f"   Error: {task['error']}")
+        # Print summary
+        all_passed = all([print_run_summary(run) for run in runs])
+        if 'cross_env' in results:
+            all_passed = print_cross_env_summary(results) and all_passed
         
         # Exit with appropriate code
-        if len(successful_tasks) == len(results['tasks']):
-            sys.exit(0)
-        else:
-            sys.exit(1)
+        sys.exit(0 if all_passed else 1)
             
     except Exception as e:
         print(f"Framework execution failed: {e}")
@@ -1,45 +1,108 @@
 import pandas as pd
-from pathlib import Path
-from libs.CDWHelper import CDWHelper
+from libs.CDWHelper import CDWHelper, HostRateLimiter, create_session
+from libs.CDWResponseCache import CDWResponseCache
+from libs.DataIOHelper import DataIOHelper
+from libs.StageRecorder import StageRecorder
 import logging
 
-def execute(config: dict, env: str) -> dict:
+def execute(config: dict, env: str, context=None) -> dict:
     logger = logging.getLogger(__name__)
     
     try:
         # Get environment-specific configuration
         env_config = config['environments'][env]
         
+        io_helper = DataIOHelper()
+        stages = context.stages if context is not None else StageRecorder()
+        
+        # Optional persistent response cache shared across runs
+        cache = None
+        cache_config = env_config.get('cache')
+        if cache_config:
+            cache = CDWResponseCache(
+                cache_config['path'],
+                ttl_seconds=cache_config.get('ttl_seconds', 86400),
+                max_size_mb=cache_config.get('max_size_mb', 512)
+            )
+        refresh = bool(getattr(context, 'refresh', False)) or bool((cache_config or {}).get('refresh'))
+        
+        # Within a suite run, tasks hitting the same CDW share one session and rate limit
+        fetch_config = env_config.get('fetch', {})
+        shared = {}
+        if context is not None:
+            identity = (env_config['base_url'], env_config['credentials'])
+            transport = {k: fetch_config[k] for k in ('max_workers', 'max_retries', 'backoff_factor') if k in fetch_config}
+            shared['session'] = context.resources.acquire(
+                'cdw', env, identity, lambda: create_session(env_config['credentials'], **transport), **transport
+            )
+            shared['rate_limiter'] = context.resources.acquire(
+                'cdw_rate_limit', env, env_config['base_url'],
+                lambda: HostRateLimiter(fetch_config.get('requests_per_second'))
+            )
+        
         # Initialize CDW helper
         helper = CDWHelper(
             base_url=env_config['base_url'],
-            credentials=env_config['credentials']
+            credentials=env_config['credentials'],
+            cache=cache,
+            env=env,
+            refresh=refresh,
+            stages=stages,
+            **fetch_config,
+            **shared
         )
         
-        # Load trade list
-        trades_df = pd.read_excel(env_config['trade_list_path'])
-        trades_config = trades_df.to_dict('records')
+        # Load trade list in chunks so large Excel lists are streamed rather than loaded whole
+        with stages.stage('read_input'):
+            trades_config = []
+            for chunk in io_helper.iter_chunks(env_config['trade_list_path'],
+                                               env_config.get('trade_list_chunksize', 50000)):
+                trades_config.extend(chunk.to_dict('records'))
+        total_trades = len(trades_config)
+        
+        # A sampled (smoke) run extracts only the suite's sample of the trade list
+        sampler = getattr(context, 'sampling', None)
+        if sampler is not None:
+            with stages.stage('sample', rows=total_trades):
+                trades_config = sampler.sample(pd.DataFrame(trades_config), 'trades').to_dict('records')
+        
+        # Checkpoint fetched trades so a resumed run continues mid-extraction
+        checkpoint = None
+        if context is not None and context.checkpoints is not None:
+            checkpoint = context.checkpoints.trade_checkpoint(context.task_id)
         
         # Extract all trades
-        results_df = helper.extract_all_trades(trades_config)
+        try:
+            results_df = helper.extract_all_trades(trades_config, checkpoint=checkpoint)
+        finally:
+            helper.close()
+            if cache is not None:
+                cache.close()
         
-        # Save results
+        # Save results (and share them with downstream tasks)
         output_path = env_config['output_path']
-        output_dir = Path(output_path).parent
-        output_dir.mkdir(parents=True, exist_ok=True)
-        
-        results_df.to_excel(output_path, index=False)
+        with stages.stage('write_output', rows=len(results_df)):
+            output_file = io_helper.save_task_output(
+                results_df, output_path, config, context, task_name='cdw_extraction_task'
+            )
         
         # Check for errors
-        error_trades = results_df[results_df.get('error', '').notna()]
+        if 'error' in results_df.columns:
+            error_trades = results_df[results_df['error'].notna()]
+        else:
+            error_trades = results_df.iloc[0:0]
         status = 'SUCCESS' if len(error_trades) == 0 else 'PARTIAL'
         
-        return {
+        result = {
             'status': status,
-            'output_file': output_path,
+            'output_file': output_file,
+            'rows': len(results_df),
             'total_trades': len(results_df),
             'failed_trades': len(error_trades)
         }
+        if sampler is not None:
+            result['sampled_from'] = total_trades
+        return result
         
     except Exception as e:
         logger.error(f"CDW extraction task failed: {e}")
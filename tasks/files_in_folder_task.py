@@ -1,13 +1,17 @@
 import pandas as pd
-from pathlib import Path
 from libs.FileSystemHelper import FileSystemHelper
+from libs.DataIOHelper import DataIOHelper
+from libs.StageRecorder import StageRecorder
 import logging
 
-def execute(config: dict, env: str) -> dict:
+def execute(config: dict, env: str, context=None) -> dict:
     logger = logging.getLogger(__name__)
     
     try:
-        helper = FileSystemHelper()
+        scan_config = config.get('scan', {})
+        stages = context.stages if context is not None else StageRecorder()
+        helper = FileSystemHelper(max_workers=scan_config.get('max_workers', 8), stages=stages)
+        io_helper = DataIOHelper()
         
         # Get environment-specific paths
         expected_files_path = config['paths'][env]['expected_files']
@@ -15,13 +19,19 @@ def execute(config: dict, env: str) -> dict:
         output_path = config['paths'][env]['output_report']
         
         # Validate files
-        results_df = helper.validate_files_exist(expected_files_path, target_directory)
+        results_df = helper.validate_files_exist(
+            expected_files_path,
+            target_directory,
+            match_mode=scan_config.get('match_mode', 'exact'),
+            recursive=scan_config.get('recursive', False),
+            case_sensitive=scan_config.get('case_sensitive')
+        )
         
-        # Save results
-        output_dir = Path(output_path).parent
-        output_dir.mkdir(parents=True, exist_ok=True)
-        
-        results_df.to_excel(output_path, index=False)
+        # Save results (and share them with downstream tasks)
+        with stages.stage('write_output', rows=len(results_df)):
+            output_file = io_helper.save_task_output(
+                results_df, output_path, config, context, task_name='files_in_folder_task'
+            )
         
         # Check if any files are missing
         missing_files = results_df[results_df['status'] == 'Missing']
@@ -29,7 +39,8 @@ def execute(config: dict, env: str) -> dict:
         
         return {
             'status': status,
-            'output_file': output_path,
+            'output_file': output_file,
+            'rows': len(results_df),
             'missing_files': len(missing_files),
             'total_files': len(results_df)
         }
@@ -0,0 +1,104 @@
+from libs.MongoDBHelper import MongoDBHelper, create_client
+from libs.DataIOHelper import DataIOHelper
+from libs.FingerprintHelper import FingerprintHelper, store_for
+from libs.StageRecorder import StageRecorder
+import logging
+
+def execute(config: dict, env: str, context=None) -> dict:
+    logger = logging.getLogger(__name__)
+
+    try:
+        env_config = config['environments'][env]
+
+        stages = context.stages if context is not None else StageRecorder()
+
+        # Initialize MongoDB helper on the client shared by the suite run
+        client = None
+        if context is not None:
+            client = context.resources.acquire(
+                'mongo', env, env_config['connection_string'],
+                lambda: create_client(env_config['connection_string'])
+            )
+        # Optional change detection: unchanged validations reuse the last run's result
+        fingerprints = None
+        if env_config.get('fingerprint_state_dir'):
+            task_id = getattr(context, 'task_id', None) or 'mongo_validation_task'
+            fingerprints = FingerprintHelper(
+                store_for(env_config['fingerprint_state_dir'], task_id, env),
+                num_buckets=env_config.get('fingerprint_buckets', 32)
+            )
+        helper = MongoDBHelper(
+            env_config['connection_string'],
+            env_config['database'],
+            stages=stages,
+            client=client,
+            fingerprints=fingerprints
+        )
+        io_helper = DataIOHelper()
+
+        # Load source data (from CDW extraction), preferring the in-memory artifact
+        source_df = None
+        if context is not None and config.get('source_artifact'):
+            source_df = context.artifacts.get(config['source_artifact'])
+            if source_df is None:
+                logger.warning(f"Artifact {config['source_artifact']} not published, reading source file")
+        if source_df is None:
+            # In a multi-environment run the CDW output lives in this environment's subdirectory
+            source_data_path = env_config['source_data_path']
+            if context is not None:
+                source_data_path = context.input_path(source_data_path)
+            with stages.stage('read_input'):
+                source_df = io_helper.read(source_data_path)
+
+        # Nested sub-documents are compared as flattened columns (risk.pv -> risk_pv)
+        validations = {name: dict(validation, flatten=validation.get('flatten', True))
+                       for name, validation in env_config['validations'].items()}
+
+        # In a sampled run only the sampled keys are validated, and the validations are told so
+        sampler = getattr(context, 'sampling', None)
+        if sampler is not None:
+            with stages.stage('sample', rows=len(source_df)):
+                source_df = sampler.sample(source_df, 'source rows')
+            validations = {name: dict(validation, sampled=True) for name, validation in validations.items()}
+
+        # Documents are streamed and joined to the source batch by batch; with
+        # change detection the target is loaded whole so it can be fingerprinted
+        try:
+            if fingerprints is not None:
+                validation_results = helper.validate_data(source_df, validations)
+            else:
+                validation_results = helper.validate_stream(source_df, validations)
+        finally:
+            helper.close()
+
+        # Save results (and share them with downstream tasks)
+        output_path = env_config['output_path']
+        with stages.stage('write_output', rows=len(validation_results)):
+            output_file = io_helper.save_task_output(
+                validation_results, output_path, config, context, task_name='mongo_validation_task'
+            )
+
+        # Determine overall status
+        failed_validations = validation_results[validation_results['status'] != 'PASS']
+        status = 'SUCCESS' if len(failed_validations) == 0 else 'FAIL'
+
+        result = {
+            'status': status,
+            'output_file': output_file,
+            'rows': len(source_df),
+            'total_validations': len(validation_results),
+            'failed_validations': len(failed_validations)
+        }
+        if 'documents' in validation_results.columns:
+            documents = int(validation_results['documents'].fillna(0).sum())
+            seconds = float(validation_results['seconds'].fillna(0).sum())
+            result['documents'] = documents
+            result['docs_per_second'] = round(documents / seconds, 1) if seconds else None
+        return result
+
+    except Exception as e:
+        logger.error(f"MongoDB validation task failed: {e}")
+        return {
+            'status': 'FAIL',
+            'error': str(e)
+        }
@@ -1,33 +1,90 @@
-import pandas as pd
-from pathlib import Path
-from libs.SQLServerHelper import SQLServerHelper
+from libs.SQLServerHelper import SQLServerHelper, create_pool
+from libs.DataIOHelper import DataIOHelper
+from libs.FingerprintHelper import FingerprintHelper, store_for
+from libs.StageRecorder import StageRecorder
 import logging
 
-def execute(config: dict, env: str) -> dict:
+def execute(config: dict, env: str, context=None) -> dict:
     logger = logging.getLogger(__name__)
     
     try:
         env_config = config['environments'][env]
         
-        # Initialize SQL helper
-        helper = SQLServerHelper(env_config['connection_string'])
+        stages = context.stages if context is not None else StageRecorder()
         
-        # Load source data (from CDW extraction)
-        source_data_path = env_config['source_data_path']
-        source_df = pd.read_excel(source_data_path)
+        # Initialize SQL helper on the connection pool shared by the suite run
+        pool = None
+        if context is not None:
+            pool = context.resources.acquire(
+                'sql', env, env_config['connection_string'],
+                lambda: create_pool(env_config['connection_string'], env_config.get('pool_size', 5))
+            )
+        # Optional change detection: unchanged validations reuse the last run's result
+        fingerprints = None
+        if env_config.get('fingerprint_state_dir'):
+            task_id = getattr(context, 'task_id', None) or 'sql_validation_task'
+            fingerprints = FingerprintHelper(
+                store_for(env_config['fingerprint_state_dir'], task_id, env),
+                num_buckets=env_config.get('fingerprint_buckets', 32)
+            )
+        helper = SQLServerHelper(
+            env_config['connection_string'],
+            pool=pool,
+            pool_size=env_config.get('pool_size', 5),
+            max_parallel_queries=env_config.get('max_parallel_queries', 1),
+            fetch_size=env_config.get('fetch_size'),
+            stages=stages,
+            fingerprints=fingerprints
+        )
+        io_helper = DataIOHelper()
+        
+        # Load source data (from CDW extraction), preferring the in-memory artifact
+        source_df = None
+        if context is not None and config.get('source_artifact'):
+            source_df = context.artifacts.get(config['source_artifact'])
+            if source_df is None:
+                logger.warning(f"Artifact {config['source_artifact']} not published, reading source file")
+        # In a multi-environment run the CDW output lives in this environment's subdirectory
+        source_data_path = env_config.get('source_data_path')
+        if context is not None and source_data_path:
+            source_data_path = context.input_path(source_data_path)
+        if source_df is None and env_config.get('source_chunksize'):
+            # Large sources are streamed from disk instead of loaded up front
+            source_data = lambda: io_helper.iter_chunks(source_data_path, env_config['source_chunksize'])
+        else:
+            if source_df is None:
+                with stages.stage('read_input'):
+                    source_df = io_helper.read(source_data_path)
+            source_data = source_df
+        
+        # In a sampled run only the sampled keys are validated, and the queries are told so
+        validation_queries = env_config['validation_queries']
+        sampler = getattr(context, 'sampling', None)
+        if sampler is not None:
+            if source_df is not None:
+                with stages.stage('sample', rows=len(source_df)):
+                    source_df = source_data = sampler.sample(source_df, 'source rows')
+            else:
+                source_data = lambda: sampler.sample_chunks(
+                    io_helper.iter_chunks(source_data_path, env_config['source_chunksize'])
+                )
+            validation_queries = {name: dict(query, sampled=True) for name, query in validation_queries.items()}
         
         # Perform validations
-        validation_results = helper.validate_data(
-            source_df, 
-            env_config['validation_queries']
-        )
+        try:
+            validation_results = helper.validate_data(
+                source_data, 
+                validation_queries
+            )
+        finally:
+            helper.close()
         
-        # Save results
+        # Save results (and share them with downstream tasks)
         output_path = env_config['output_path']
-        output_dir = Path(output_path).parent
-        output_dir.mkdir(parents=True, exist_ok=True)
-        
-        validation_results.to_excel(output_path, index=False)
+        with stages.stage('write_output', rows=len(validation_results)):
+            output_file = io_helper.save_task_output(
+                validation_results, output_path, config, context, task_name='sql_validation_task'
+            )
         
         # Determine overall status
         failed_validations = validation_results[validation_results['status'] == 'FAIL']
@@ -35,7 +92,8 @@ def execute(config: dict, env: str) -> dict:
         
         return {
             'status': status,
-            'output_file': output_path,
+            'output_file': output_file,
+            'rows': len(source_df) if source_df is not None else None,
             'total_validations': len(validation_results),
             'failed_validations': len(failed_validations)
         }
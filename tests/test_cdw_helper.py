@@ -0,0 +1,118 @@
+import time
+import types
+
+import pandas as pd
+import pytest
+
+from benchmarks.cdw_stub_server import CDWStubServer, trade_xml
+from libs.CDWHelper import CDWHelper
+from libs.CDWResponseCache import CDWResponseCache
+
+
+@pytest.fixture
+def server():
+    with CDWStubServer() as stub:
+        yield stub
+
+
+def trade_list(count=6):
+    return [{'trade_id': 100 + i, 'trade_date': pd.Timestamp('2024-01-02') + pd.Timedelta(days=i % 2)}
+            for i in range(count)]
+
+
+@pytest.mark.parametrize('options', [{}, {'batch_path': '/trades'}])
+def test_warm_cache_run_matches_cold_run(server, tmp_path, options):
+    trades = trade_list()
+    cache = CDWResponseCache(str(tmp_path / 'cache.sqlite'))
+    try:
+        cold = CDWHelper(server.base_url, {}, cache=cache, **options).extract_all_trades(trades)
+        # Half the trades are served from the cache and half fetched again
+        mixed_trades = trades + [{'trade_id': 200, 'trade_date': pd.Timestamp('2024-01-02')}]
+        mixed = CDWHelper(server.base_url, {}, cache=cache, **options).extract_all_trades(mixed_trades)
+        server.reset_counts()
+        warm = CDWHelper(server.base_url, {}, cache=cache, **options).extract_all_trades(trades)
+    finally:
+        cache.close()
+
+    assert server.counts == {'trade': 0, 'batch': 0}
+    pd.testing.assert_frame_equal(warm, cold)
+    pd.testing.assert_frame_equal(mixed.iloc[:len(trades)], cold)
+    assert pd.api.types.is_datetime64_any_dtype(warm['trade_date'])
+    assert warm['trade_id'].tolist() == [trade['trade_id'] for trade in trades]
+
+
+
+def dated_trades():
+    """Trades over three dates with repeated rows, in no particular order"""
+    unique = [{'trade_id': f"T{i:03d}", 'trade_date': f"2024-01-0{i % 3 + 1}"} for i in range(25)]
+    return unique + [dict(unique[4]), dict(unique[17]), dict(unique[4])]
+
+
+def extract(server, trades, **options):
+    helper = CDWHelper(server.base_url, {}, **options)
+    try:
+        return helper.extract_all_trades(trades)
+    finally:
+        helper.close()
+
+
+@pytest.mark.parametrize('max_workers', [1, 4])
+def test_batched_extraction_matches_per_trade(server, max_workers):
+    trades = dated_trades()
+    per_trade = extract(server, trades, max_workers=max_workers)
+    assert server.counts == {'trade': 25, 'batch': 0}  # Repeated rows are fetched once
+
+    server.reset_counts()
+    batched = extract(server, trades, max_workers=max_workers, batch_path='/trades', batch_size=4)
+    # 9, 8 and 8 trades per date in batches of 4
+    assert server.counts == {'trade': 0, 'batch': 3 + 2 + 2}
+    pd.testing.assert_frame_equal(batched, per_trade)
+    assert batched['trade_id'].tolist() == [trade['trade_id'] for trade in trades]
+
+
+def test_trades_missing_from_batch_response_are_fetched_individually():
+    trades = dated_trades()
+    with CDWStubServer(missing_ids=['T004', 'T011']) as server:
+        batched = extract(server, trades, batch_path='/trades', batch_size=10)
+        assert server.counts == {'trade': 2, 'batch': 3}
+        server.reset_counts()
+        pd.testing.assert_frame_equal(batched, extract(server, trades))
+
+
+@pytest.mark.parametrize('max_workers', [1, 4])
+def test_unavailable_batch_endpoint_falls_back_to_per_trade(max_workers):
+    trades = dated_trades()
+    with CDWStubServer(batch_enabled=False) as server:
+        batched = extract(server, trades, max_workers=max_workers, batch_path='/trades', batch_size=4)
+        # The first 404 disables the endpoint; only batches already in flight still try it
+        assert 1 <= server.counts['batch'] <= max_workers
+        assert server.counts['trade'] == 25
+        server.reset_counts()
+        pd.testing.assert_frame_equal(batched, extract(server, trades))
+
+
+class SlowBody:
+    """Response body that trickles in a few bytes at a time"""
+
+    def __init__(self, payload: bytes, delay: float):
+        self.payload = payload
+        self.delay = delay
+        self.decode_content = False
+
+    def read(self, size=-1):
+        time.sleep(self.delay)
+        chunk, self.payload = self.payload[:64], self.payload[64:]
+        return chunk
+
+
+def test_body_download_is_not_booked_as_parsing():
+    helper = CDWHelper('http://localhost', {})
+    payload = trade_xml('T1', '2024-01-02', legs=4).encode()
+    response = types.SimpleNamespace(raw=SlowBody(payload, delay=0.02))
+    flattened = helper._parse_body(response, helper.flatten_xml_stream)
+    helper.close()
+
+    assert flattened['trade_header_book'] == 'RATES'
+    stages = helper.stages.summary()
+    assert stages['http_download']['wall_seconds'] >= 0.02 * (len(payload) // 64)
+    assert stages['xml_flatten']['wall_seconds'] < 0.02
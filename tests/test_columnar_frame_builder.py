@@ -0,0 +1,44 @@
+import pandas as pd
+import pytest
+
+from libs.ColumnarFrameBuilder import ColumnarFrameBuilder
+
+
+def build(records, **options):
+    builder = ColumnarFrameBuilder(**options)
+    builder.extend(records)
+    return builder, builder.build()
+
+
+@pytest.mark.parametrize('batch_size', [1, 3, 1000])
+def test_untyped_build_matches_dataframe(batch_size):
+    records = [{'trade_id': f"T{i}", 'pv': str(i * 1.5)} if i % 3 else {'trade_id': f"T{i}", 'book': 'FX'}
+               for i in range(10)]
+    _, frame = build(records, batch_size=batch_size, infer_types=False)
+    pd.testing.assert_frame_equal(frame, pd.DataFrame(records))
+
+
+def test_columns_are_typed():
+    records = [{'trade_id': f"T{i}", 'qty': str(i), 'pv': f"{i}.25", 'asof': '2024-01-02', 'book': 'RATES'}
+               for i in range(10)]
+    _, frame = build(records, batch_size=4)
+    assert frame['qty'].dtype == 'int64'
+    assert frame['pv'].dtype == 'float64'
+    assert pd.api.types.is_datetime64_any_dtype(frame['asof'])
+    assert isinstance(frame['book'].dtype, pd.CategoricalDtype)
+
+
+@pytest.mark.parametrize('batch_size', [1, 2, 5])
+def test_demoted_column_keeps_extracted_text(batch_size):
+    values = ['1.50', '-0', '007', '2', None, '1e3', '2024-01-02T10:30']
+    _, frame = build([{'value': value} for value in values], batch_size=batch_size)
+    assert [None if pd.isna(value) else value for value in frame['value']] == values
+
+
+def test_typed_batches_keep_only_text_that_does_not_render_back():
+    values = ['1.5', '2.25', '1.50', '3', '4.0']
+    builder, _ = build([{'pv': value} for value in values], batch_size=len(values))
+    (_, kind, _, (_, positions, strings)), = builder._chunks['pv']
+    assert kind == 'float'
+    assert positions.tolist() == [2, 3]
+    assert strings.tolist() == ['1.50', '3']
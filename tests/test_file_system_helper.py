@@ -0,0 +1,29 @@
+import os
+
+import pytest
+
+from libs.FileSystemHelper import FileSystemHelper
+
+
+@pytest.fixture
+def tree(tmp_path):
+    (tmp_path / 'a' / 'b').mkdir(parents=True)
+    (tmp_path / 'top.csv').write_text('x')
+    (tmp_path / 'a' / 'b' / 'deep.csv').write_text('x')
+    try:
+        # A link back up the tree and a link to a file
+        os.symlink(tmp_path, tmp_path / 'a' / 'b' / 'loop', target_is_directory=True)
+        os.symlink(tmp_path / 'top.csv', tmp_path / 'a' / 'alias.csv')
+    except (OSError, NotImplementedError):
+        pytest.skip('symlinks not available')
+    return tmp_path
+
+
+def test_recursive_scan_skips_directory_symlinks(tree):
+    listing = FileSystemHelper().scan_directory(str(tree), recursive=True)
+    assert sorted(listing['relative_path']) == ['a/alias.csv', 'a/b/deep.csv', 'top.csv']
+
+
+def test_expected_files_resolve_through_a_symlink_loop(tree):
+    index = FileSystemHelper().build_index([str(tree)], recursive=True)
+    assert set(index['name']) == {'alias.csv', 'deep.csv', 'top.csv'}
@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.fake_mongo import mongo_client
+from benchmarks.generators import build_documents
+from libs.ComparisonHelper import ComparisonHelper
+from libs.FingerprintHelper import FingerprintHelper, FingerprintStore
+from libs.MongoDBHelper import MongoDBHelper, flatten_documents
+
+COUNTS = ('mismatch_count', 'missing_in_source', 'missing_in_target', 'value_mismatch_rows',
+          'matched_rows', 'duplicates_in_source', 'duplicates_in_target', 'column_mismatches')
+
+
+def validation(**options):
+    return dict({'collection': 'positions', 'key_columns': ['trade_id'], 'compare_columns': ['book', 'risk_pv'],
+                 'batch_size': 40, 'flatten': True}, **options)
+
+
+def load(documents):
+    client = mongo_client()
+    client['risk']['positions'].insert_many(documents)
+    return client
+
+
+def differing_sides(rows=300):
+    """Documents with duplicates inside and across batches, and a source that differs from them"""
+    documents = build_documents(rows)
+    documents += [dict(documents[5], _id=rows), dict(documents[200], _id=rows + 1)]
+    documents.insert(10, dict(documents[11], _id=rows + 2))
+    source = flatten_documents(build_documents(rows)).iloc[20:].reset_index(drop=True)
+    source.loc[3, 'risk_pv'] += 1.0
+    extra = source.iloc[:2].assign(trade_id=['S1', 'S2'])
+    return documents, pd.concat([source, extra], ignore_index=True)
+
+
+def assert_same_counts(result, expected):
+    for field in COUNTS:
+        assert result.get(field, 0) == expected.get(field, 0), field
+
+
+def test_stream_compare_matches_in_memory_compare():
+    documents, source = differing_sides()
+    helper = MongoDBHelper('mongodb://fake', 'risk', client=load(documents))
+    config = validation()
+
+    result, read = helper.stream_compare(source, config)
+    expected = ComparisonHelper().compare(source, flatten_documents(documents), config['key_columns'],
+                                          config['compare_columns'])
+    assert read == len(documents)
+    assert result['duplicates_in_target'] == 3
+    assert_same_counts(result, expected)
+
+
+def test_stream_compare_joins_int_and_float_keys():
+    documents = [{'_id': i, 'trade_id': i, 'pv': float(i)} for i in range(1, 101)]
+    source = pd.DataFrame({'trade_id': [float(i) for i in range(1, 101)] + [np.nan],
+                           'pv': [float(i) for i in range(1, 101)] + [0.0]})
+    helper = MongoDBHelper('mongodb://fake', 'risk', client=load(documents))
+    result, _ = helper.stream_compare(source, validation(compare_columns=['pv'], batch_size=7))
+    assert result['matched_rows'] == 100
+    assert result['missing_in_source'] == 0
+    assert result['missing_in_target'] == 1
+
+
+@pytest.fixture
+def fingerprinted(tmp_path):
+    documents, source = differing_sides()
+    client = load(documents)
+    fingerprints = FingerprintHelper(FingerprintStore(str(tmp_path / 'fingerprints.json')), num_buckets=8)
+    helper = MongoDBHelper('mongodb://fake', 'risk', client=client, fingerprints=fingerprints)
+    compared = []
+    compare = helper._compare_datasets
+
+    def spy(source_df, target_df, *args):
+        compared.append(len(target_df))
+        return compare(source_df, target_df, *args)
+
+    helper._compare_datasets = spy
+    return helper, client['risk']['positions'], source, compared
+
+
+def test_fingerprinted_validation_streams_and_narrows_to_changed_buckets(fingerprinted):
+    helper, collection, source, compared = fingerprinted
+    config = {'positions': validation(fingerprint_fields=['risk.pv'])}
+
+    first = helper.validate_data(source, config).iloc[0]
+    streamed = helper.validate_stream(source, config).iloc[0]
+    for field in ('status', 'mismatch_count', 'missing_in_source', 'missing_in_target'):
+        assert first[field] == streamed[field]
+
+    compared.clear()
+    assert helper.validate_data(source, config).iloc[0]['change_detection'].startswith('unchanged')
+    assert compared == []
+
+    # A target-side change is found on the second pass over the collection
+    collection.documents[50]['risk']['pv'] += 5.0
+    changed = helper.validate_data(source, config).iloc[0]
+    assert changed['change_detection'] == 'compared 1 changed of 8 non-empty buckets'
+    assert len(compared) == 1 and compared[0] < len(collection.documents) / 2
+    fresh = MongoDBHelper('mongodb://fake', 'risk', client=helper.client).validate_stream(source, config).iloc[0]
+    for field in ('mismatch_count', 'missing_in_source', 'missing_in_target'):
+        assert changed[field] == fresh[field]
+    assert changed['mismatch_count'] == first['mismatch_count'] + 1
+
+
+def test_streamed_fingerprint_equals_whole_frame_fingerprint(tmp_path):
+    documents = build_documents(200)
+    for document in documents[::3]:
+        document['note'] = 'manual'  # A field some batches do not have at all
+    frame = flatten_documents(documents)
+    batches = [flatten_documents(documents[start:start + 9]) for start in range(0, len(documents), 9)]
+    fingerprints = FingerprintHelper(FingerprintStore(str(tmp_path / 'fingerprints.json')), num_buckets=8)
+
+    _, streamed, _ = fingerprints._stream_target(lambda: iter(batches), ['trade_id'], set(), lambda fp: set())
+    assert streamed == fingerprints.fingerprint(frame, ['trade_id'])
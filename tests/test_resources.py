@@ -0,0 +1,84 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from core.resources import ResourceContext
+
+
+class Resource:
+    def __init__(self, name):
+        self.name = name
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_slow_factory_only_blocks_its_own_key():
+    resources = ResourceContext()
+    release = threading.Event()
+
+    def slow():
+        release.wait(5)
+        return Resource('slow')
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        pending = executor.submit(resources.acquire, 'mongo', 'UAT', 'mongodb://slow', slow)
+        started = time.perf_counter()
+        fast = resources.acquire('sql', 'UAT', 'Driver=fast', lambda: Resource('fast'))
+        assert time.perf_counter() - started < 1
+        assert not pending.done()
+        release.set()
+        assert pending.result().name == 'slow'
+    assert fast.name == 'fast'
+    resources.close()
+
+
+def test_concurrent_callers_share_one_resource():
+    resources = ResourceContext()
+    created = []
+
+    def factory():
+        time.sleep(0.05)
+        created.append(Resource('shared'))
+        return created[-1]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: resources.acquire('cdw', 'UAT', 'https://cdw', factory), range(8)))
+    assert len(created) == 1
+    assert all(result is created[0] for result in results)
+    resources.close()
+    assert created[0].closed
+
+
+def test_failed_factory_is_retried():
+    resources = ResourceContext()
+
+    def failing():
+        raise ConnectionError('login timed out')
+
+    with pytest.raises(ConnectionError):
+        resources.acquire('sql', 'UAT', 'Driver=x', failing)
+    assert resources.acquire('sql', 'UAT', 'Driver=x', lambda: Resource('retry')).name == 'retry'
+    resources.close()
+
+
+def test_resource_created_after_close_is_closed():
+    resources = ResourceContext()
+    release = threading.Event()
+    resource = Resource('late')
+
+    def slow():
+        release.wait(5)
+        return resource
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        pending = executor.submit(resources.acquire, 'mongo', 'UAT', 'mongodb://slow', slow)
+        time.sleep(0.05)
+        resources.close()
+        release.set()
+        with pytest.raises(RuntimeError):
+            pending.result()
+    assert resource.closed
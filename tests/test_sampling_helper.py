@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+from libs.SamplingHelper import SamplingHelper, restrict_to_keys
+
+
+def test_int_and_float_keys_sample_the_same_trades():
+    ids = np.arange(1, 2001)
+    sampler = SamplingHelper(rate=0.1, seed='nightly')
+    as_int = pd.DataFrame({'trade_id': ids})
+    # A blank cell turns the column into floats
+    as_float = pd.DataFrame({'trade_id': np.append(ids.astype(float), np.nan)})
+    as_text = pd.DataFrame({'trade_id': ids.astype(str)})
+
+    selected = sampler.sample(as_int)['trade_id'].tolist()
+    assert 0 < len(selected) < len(ids)
+    assert sampler.sample(as_float)['trade_id'].dropna().astype(int).tolist() == selected
+    assert sampler.sample(as_text)['trade_id'].astype(int).tolist() == selected
+
+
+def test_always_include_matches_float_keys_with_nan():
+    frame = pd.DataFrame({'trade_id': [101.0, 102.0, np.nan], 'pv': [1.0, 2.0, 3.0]})
+    for entry in (101, 101.0, '101', {'trade_id': 101}):
+        sampled = SamplingHelper(rate=0.0, always_include=[entry]).sample(frame)
+        assert sampled['trade_id'].tolist() == [101.0]
+
+
+def test_always_include_composite_key_with_dates():
+    frame = pd.DataFrame({
+        'trade_id': [1, 1, 2],
+        'trade_date': [pd.Timestamp('2024-01-01'), pd.Timestamp('2024-01-02 10:30'), pd.Timestamp('2024-01-01')],
+    })
+    sampler = SamplingHelper(rate=0.0, key_columns=['trade_id', 'trade_date'],
+                             always_include=[{'trade_id': 1.0, 'trade_date': '2024-01-01'}])
+    assert sampler.mask(frame).tolist() == [True, False, False]
+
+
+def test_sampling_is_idempotent_and_agrees_with_restrict_to_keys():
+    frame = pd.DataFrame({'trade_id': np.arange(500, dtype=float)})
+    sampler = SamplingHelper(rate=0.2, seed=3)
+    sampled = sampler.sample(frame)
+    pd.testing.assert_frame_equal(sampler.sample(sampled), sampled)
+    target = pd.DataFrame({'trade_id': np.arange(500)})
+    assert restrict_to_keys(target, sampled, ['trade_id'])['trade_id'].tolist() == \
+        sampled['trade_id'].astype(int).tolist()
@@ -0,0 +1,103 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.standins import create_sqlite_database
+from libs.SQLServerHelper import SQLServerHelper, create_pool
+
+
+@pytest.fixture
+def database(tmp_path):
+    positions = pd.DataFrame({
+        'trade_id': [f"T{i:04d}" for i in range(250)],
+        'book': np.where(np.arange(250) % 2, 'FX', 'RATES'),
+        'pv': np.arange(250) * 1.5,
+    })
+    return create_sqlite_database(str(tmp_path / 'positions.sqlite'), {'positions': positions}), positions
+
+
+class CountingConnect:
+    """connect(connection_string) stand-in that counts the connections it opens"""
+
+    def __init__(self, path):
+        self.path = path
+        self.opened = []
+
+    def __call__(self, connection_string):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.opened.append(conn)
+        return conn
+
+
+def test_queries_reuse_one_pooled_connection(database):
+    path, _ = database
+    connect = CountingConnect(path)
+    pool = create_pool('Driver=stand-in', pool_size=4, connect=connect)
+    first = SQLServerHelper('Driver=stand-in', pool=pool)
+    second = SQLServerHelper('Driver=stand-in', pool=pool)
+    for helper in (first, second, first):
+        assert len(helper.execute_query('SELECT * FROM positions')) == 250
+    first.close()  # The pool belongs to the caller, not the helper
+    assert len(second.execute_query('SELECT COUNT(*) FROM positions')) == 1
+
+    assert len(connect.opened) == 1
+    assert pool.stats == {'created': 1, 'reused': 3, 'discarded': 0}
+    pool.close()
+
+
+def test_iter_query_streams_chunks_in_row_order(database):
+    path, positions = database
+    helper = SQLServerHelper('Driver=stand-in', connect=CountingConnect(path))
+    chunks = list(helper.iter_query('SELECT * FROM positions WHERE pv >= ? ORDER BY trade_id', [0], chunksize=100))
+    assert [len(chunk) for chunk in chunks] == [100, 100, 50]
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), positions)
+    pd.testing.assert_frame_equal(helper.execute_query('SELECT * FROM positions ORDER BY trade_id', chunksize=7),
+                                  positions)
+
+    empty = list(helper.iter_query('SELECT trade_id, pv FROM positions WHERE 1 = 0'))
+    assert len(empty) == 1 and empty[0].empty and list(empty[0].columns) == ['trade_id', 'pv']
+    helper.close()
+
+
+def test_abandoned_stream_returns_its_connection(database):
+    path, _ = database
+    connect = CountingConnect(path)
+    helper = SQLServerHelper('Driver=stand-in', connect=connect, pool_size=1)
+    stream = helper.iter_query('SELECT * FROM positions', chunksize=10)
+    next(stream)
+    stream.close()
+    assert len(helper.execute_query('SELECT * FROM positions')) == 250
+    assert len(connect.opened) == 1
+    helper.close()
+
+
+def test_dead_idle_connection_is_replaced(database):
+    path, _ = database
+    connect = CountingConnect(path)
+    helper = SQLServerHelper('Driver=stand-in', connect=connect)
+    helper.pool.health_check_interval = 0
+    helper.execute_query('SELECT 1')
+    connect.opened[0].close()
+    assert len(helper.execute_query('SELECT * FROM positions')) == 250
+    assert len(connect.opened) == 2
+    assert helper.pool.stats['discarded'] == 1
+    helper.close()
+
+
+def test_parallel_validations_keep_declaration_order(database):
+    path, positions = database
+    connect = CountingConnect(path)
+    helper = SQLServerHelper('Driver=stand-in', connect=connect, pool_size=2, max_parallel_queries=4)
+    source = positions.assign(pv=positions['pv'].where(positions.index != 3, -1.0))
+    queries = {
+        f"check_{i}": {'query': 'SELECT * FROM positions' + (' WHERE pv < 300' if i % 2 else ''),
+                       'key_columns': ['trade_id'], 'chunksize': 64}
+        for i in range(6)
+    }
+    results = helper.validate_data(source, queries)
+    assert results['validation_name'].tolist() == list(queries)
+    assert results['mismatch_count'].tolist() == [1, 51, 1, 51, 1, 51]
+    assert len(connect.opened) <= 2
+    helper.close()